@@ -0,0 +1,123 @@
+import cv2
+import numpy as np
+
+class AdaptiveInputSize:
+    """
+    Chooses the network input for each frame from the size of the target.
+
+    A far-away person squeezed from 1024 px to the network input becomes a
+    few pixels tall and is lost, but a larger input on every frame is
+    expensive. This policy uses:
+      - a small input when the target box is large (close person),
+      - the base input for a medium target,
+      - the base input on a crop around the last position when the target
+        is small (the crop is magnified instead of the whole frame),
+      - a batch of overlapping tiles over the whole frame when the target is
+        lost, which acts like a larger input only while searching.
+
+    It works with any follower that has a detect(images, input_size) method
+    (BoundedFollowerYoloV4, BoundedFollowerYoloV8, ColorFollowerSmooth).
+    """
+    def __init__(self, small_size=320, base_size=416,
+                 large_fraction=0.4, small_fraction=0.15,
+                 crop_scale=4.0, tile_grid=2, tile_overlap=0.2):
+        """
+        Args:
+            small_size: Input size used when the target is large (multiple of 32)
+            base_size: Default input size, also used for crops and tiles (multiple of 32)
+            large_fraction: Target height (fraction of the image) above which small_size is used
+            small_fraction: Target height (fraction of the image) below which a crop is used
+            crop_scale: Side of the crop around a small target, as a multiple of its height
+            tile_grid: Number of tiles per side when the target is lost (1 disables tiling)
+            tile_overlap: Overlap between neighbouring tiles, as a fraction of the tile size
+        """
+        self.small_size = small_size
+        self.base_size = base_size
+        self.large_fraction = large_fraction
+        self.small_fraction = small_fraction
+        self.crop_scale = crop_scale
+        self.tile_grid = tile_grid
+        self.tile_overlap = tile_overlap
+
+        self.last_box = None  # (x, y, w, h) of the target in the last frame
+        self.mode = "lost"
+
+        # Statistics
+        self.frames = 0
+        self.input_pixels = 0
+
+    @classmethod
+    def for_ultralytics(cls, **kwargs):
+        """Policy with the input sizes of the ultralytics models (640 px base)."""
+        return cls(**{"small_size": 416, "base_size": 640, **kwargs})
+
+    def tiles(self, width, height):
+        """Overlapping square-ish tiles covering the whole image."""
+        n = self.tile_grid
+        tile_w = int(width / (n - (n - 1) * self.tile_overlap))
+        tile_h = int(height / (n - (n - 1) * self.tile_overlap))
+        xs = np.linspace(0, width - tile_w, n).astype(int)
+        ys = np.linspace(0, height - tile_h, n).astype(int)
+        return [[int(x), int(y), tile_w, tile_h] for y in ys for x in xs]
+
+    def crop_around(self, box, width, height):
+        """Square crop centered on the box, crop_scale times its height."""
+        x, y, w, h = box
+        side = min(int(h * self.crop_scale), width, height)
+        cx, cy = x + w // 2, y + h // 2
+        x1 = min(max(0, cx - side // 2), width - side)
+        y1 = min(max(0, cy - side // 2), height - side)
+        return [x1, y1, side, side]
+
+    def plan(self, width, height):
+        """Return (regions, input_size) for the next frame, regions as [x, y, w, h]."""
+        full = [[0, 0, width, height]]
+        if self.last_box is None:
+            self.mode = "tiles" if self.tile_grid > 1 else "base"
+            return (self.tiles(width, height) if self.tile_grid > 1 else full), self.base_size
+
+        fraction = self.last_box[3] / height
+        if fraction > self.large_fraction:
+            self.mode = "small"
+            return full, self.small_size
+        if fraction < self.small_fraction:
+            self.mode = "crop"
+            return [self.crop_around(self.last_box, width, height)], self.base_size
+        self.mode = "base"
+        return full, self.base_size
+
+    def detect(self, detector, image, nms_threshold=0.4):
+        """
+        Run the detector on the planned regions of the image.
+
+        Returns:
+            tuple: (boxes, confidences) in full image coordinates, sorted by confidence
+        """
+        height, width = image.shape[:2]
+        regions, input_size = self.plan(width, height)
+        crops = [image[y:y + h, x:x + w] for (x, y, w, h) in regions]
+
+        boxes, confidences = [], []
+        for (rx, ry, _, _), (crop_boxes, crop_confidences) in zip(
+                regions, detector.detect(crops, input_size=input_size)):
+            boxes.extend([x + rx, y + ry, w, h] for (x, y, w, h) in crop_boxes)
+            confidences.extend(crop_confidences)
+
+        self.frames += 1
+        self.input_pixels += len(crops) * input_size ** 2
+
+        if len(regions) > 1 and boxes:
+            # The same person can be found in two overlapping tiles
+            indices = np.ravel(cv2.dnn.NMSBoxes(boxes, confidences, 0.0, nms_threshold))
+            return [boxes[i] for i in indices], [confidences[i] for i in indices]
+
+        order = np.argsort(confidences)[::-1]
+        return [boxes[i] for i in order], [confidences[i] for i in order]
+
+    def update(self, box):
+        """Record the target box (x, y, w, h) chosen by the follower, or None if it was lost."""
+        self.last_box = None if box is None else [int(v) for v in box]
+
+    def average_input_pixels(self):
+        """Average number of network input pixels per frame."""
+        return self.input_pixels / self.frames if self.frames else 0.0
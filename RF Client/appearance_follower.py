@@ -0,0 +1,120 @@
+from collections import deque
+import cv2
+import numpy as np
+from color_follower_smooth import ColorFollowerSmooth
+
+# Bins of the appearance signature: a 2D hue/saturation histogram plus a value histogram
+H_BINS, S_BINS, V_BINS = 16, 8, 8
+# Every ROI is resized to this patch before computing the histograms,
+# so the cost per box does not depend on how close the person is
+PATCH_SIZE = (24, 48)
+
+def appearance_signature(roi):
+    """
+    Return the L1-normalized HSV histogram signature of a person ROI.
+
+    Only the central part of the box (torso and legs, without the borders)
+    is used, to keep the background out of the signature.
+    """
+    h, w = roi.shape[:2]
+    if h < 4 or w < 4:
+        return None
+    core = roi[h // 6: h - h // 6, w // 5: w - w // 5]
+    patch = cv2.resize(core, PATCH_SIZE, interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(patch, cv2.COLOR_BGR2HSV)
+    hs = cv2.calcHist([hsv], [0, 1], None, [H_BINS, S_BINS], [0, 180, 0, 256])
+    v = cv2.calcHist([hsv], [2], None, [V_BINS], [0, 256])
+    signature = np.concatenate((hs.ravel(), v.ravel()))
+    return signature / (signature.sum() + 1e-6)
+
+class AppearanceFollower(ColorFollowerSmooth):
+    """
+    A lightweight re-identification follower, between ColorFollowerSmooth
+    (fixed green HSV range) and DeepSortFollower (MobileNet embedder).
+
+    The first lock uses the green_ratio scoring of ColorFollowerSmooth.
+    From then on, the target is identified by its HSV histogram signature:
+    a small rolling gallery of signatures is kept and every candidate box
+    is matched against all of them with one matrix product
+    (Bhattacharyya coefficient on the square roots of the histograms).
+    """
+    def __init__(self,
+                 model_path='yolo11n.pt',
+                 min_bound=0.5,
+                 max_bound=0.8,
+                 left_bound=0.4,
+                 right_bound=0.6,
+                 green_threshold=0.2,
+                 match_threshold=0.75,
+                 gallery_size=8,
+                 update_every=10,
+                 input_policy=None,
+                 buffers=None,
+                 model=None):
+        """
+        Args:
+            match_threshold: Minimum Bhattacharyya coefficient (0.0 to 1.0) for a box to be the target
+            gallery_size: Number of rolling signatures kept besides the first-lock signature
+            update_every: Add the matched signature to the gallery every N matched frames
+        """
+        super().__init__(model_path, min_bound, max_bound, left_bound, right_bound, green_threshold,
+                         input_policy, buffers, model)
+        self.match_threshold = match_threshold
+        self.update_every = update_every
+        # Square roots of the signatures, so matching is a plain dot product
+        self.anchor = None
+        self.gallery = deque(maxlen=gallery_size)
+        self.matched_frames = 0
+
+    def reset(self):
+        """Forget the target, the next frame will lock again on the greenest person."""
+        self.anchor = None
+        self.gallery.clear()
+        self.matched_frames = 0
+        self.prev_bbox = None
+
+    def gallery_matrix(self):
+        """Return the (G, D) matrix of gallery signatures (square roots)."""
+        return np.vstack((self.anchor, *self.gallery)) if self.gallery else self.anchor[None, :]
+
+    def select_box(self, img, xyxy):
+        """
+        Before the first lock, pick the box with the most green (parent behavior).
+        After it, pick the box whose signature best matches the gallery.
+        """
+        if self.anchor is None:
+            best_box, best_ratio = super().select_box(img, xyxy)
+            if best_box is not None and best_ratio >= self.green_threshold:
+                x1, y1, x2, y2 = best_box
+                signature = appearance_signature(img[y1:y2, x1:x2])
+                if signature is not None:
+                    self.anchor = np.sqrt(signature)
+                    print("[INFO] Target signature locked.")
+                    # Already matched, make sure score_threshold() accepts it
+                    return best_box, 1.0
+            return None, 0.0
+
+        H, W = img.shape[:2]
+        boxes = []
+        signatures = []
+        for (x1, y1, x2, y2) in self.clip_boxes(xyxy, W, H):
+            signature = appearance_signature(img[y1:y2, x1:x2])
+            if signature is not None:
+                boxes.append((x1, y1, x2, y2))
+                signatures.append(signature)
+        if not boxes:
+            return None, 0.0
+
+        # (N, D) @ (D, G) -> (N, G) similarities, best gallery entry for each candidate
+        scores = (np.sqrt(np.vstack(signatures)) @ self.gallery_matrix().T).max(axis=1)
+        best = int(np.argmax(scores))
+        best_score = float(scores[best])
+
+        if best_score >= self.match_threshold:
+            self.matched_frames += 1
+            if self.matched_frames % self.update_every == 0:
+                self.gallery.append(np.sqrt(signatures[best]))
+        return boxes[best], best_score
+
+    def score_threshold(self) -> float:
+        return self.match_threshold
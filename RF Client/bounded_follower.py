@@ -1,5 +1,6 @@
 import cv2
 from follower import Follower
+from control_geometry import follower_geometry
 
 class BoundedFollower(Follower):
     """
@@ -52,3 +53,16 @@ class BoundedFollower(Follower):
         cv2.rectangle(image, (max_rect_x, max_rect_y), 
                      (max_rect_x + max_rect_width, max_rect_y + max_rect_height), 
                      (0, 0, 255), 2)  # Red color
+
+    def check_bounds(self, result_image, width, height, x, y, w, h):
+        """
+        Compute the "horizontal|vertical" command for a detected person,
+        in the same format as the YOLO followers.
+
+        Args:
+            result_image: The image to draw the bound lines on, or None to skip drawing
+        """
+        geometry = follower_geometry(self, width, height)
+        if result_image is not None:
+            geometry.draw(result_image, target_y=y, vertical_bounds=False)
+        return geometry.command(x, y, w, h)
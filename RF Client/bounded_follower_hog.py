@@ -1,101 +1,202 @@
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
 from bounded_follower import BoundedFollower
+from frame_decoder import decode_image
 
 class BoundedFollowerHog(BoundedFollower):
     """
     A follower that detects a person in the image using HOG,
     draws a bounding box around them, and displays the result.
+
+    Instead of a dense detectMultiScale pyramid over the whole image, only
+    the pyramid levels where the followed person can appear are evaluated
+    (size band given by the bounds, or by the last detection), only around
+    the last detected box, and the levels run in parallel threads.
     """
-    def __init__(self, min_bound=0.5, max_bound=0.8):
+    # Height in pixels of a person inside the 64x128 HOG detection window
+    WINDOW_PERSON_HEIGHT = 96
+
+    def __init__(self, min_bound=0.5, max_bound=0.8, left_bound=0.4, right_bound=0.6,
+                 num_threads=4, search_margin=1.0, max_misses=3):
         """
         Initialize the HOG descriptor/person detector.
-        
+
         Args:
             min_bound: Minimum bound as a percentage of image size (0.0 to 1.0)
             max_bound: Maximum bound as a percentage of image size (0.0 to 1.0)
+            num_threads: Number of threads evaluating pyramid levels in parallel
+            search_margin: Search window around the last box, as a multiple of its size
+            max_misses: Frames without detection after which the whole image is searched again
         """
         # Call the parent class constructor
-        super().__init__(min_bound, max_bound)
-        
+        super().__init__(min_bound, max_bound, left_bound, right_bound)
+
         # Initialize the HOG descriptor/person detector
         self.hog = cv2.HOGDescriptor()
         self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
-        
+
         # Parameters for detection
         self.scale_factor = 1.05  # Smaller scale factor for better performance
         self.win_stride = (4, 4)  # Smaller stride for better performance
         self.padding = (8, 8)
-        
+        self.max_dimension = 400  # Limit the maximum dimension to 400 pixels
+
+        # Search-space pruning
+        self.search_margin = search_margin
+        self.max_misses = max_misses
+        self.last_box = None  # (x, y, w, h) in resized image coordinates
+        self.misses = 0
+        self.target_box = None  # (x, y, w, h) followed in the last frame, full resolution
+        self.target_confidence = None
+        # Own pool, so another follower's levels (e.g. a shadow's) never queue ahead of ours.
+        # Its workers are started by the thread calling processImage and inherit its priority,
+        # and they exit when the follower is garbage collected.
+        self.executor = ThreadPoolExecutor(max_workers=num_threads, thread_name_prefix="hog-level")
+
+    def height_band(self, height):
+        """
+        Return the (min, max) person height in pixels that can be followed.
+
+        With a previous detection the person cannot change size much between
+        two frames. Without one, the band is derived from the bounds: the robot
+        keeps the person roughly between min_bound and max_bound of the image.
+        """
+        if self.last_box is not None:
+            h = self.last_box[3]
+            return 0.7 * h, 1.4 * h
+        return 0.5 * self.min_bound * height, self.max_bound * height
+
+    def pyramid_scales(self, min_height, max_height, roi_size=None):
+        """
+        Return the image scales that map the height band onto the HOG window.
+        While searching without a previous detection a coarser step is used.
+
+        Args:
+            min_height: Smallest person height to detect, in pixels
+            max_height: Largest person height to detect, in pixels
+            roi_size: (width, height) of the searched region; the smallest scale is
+                      clamped so the region still holds one detection window, otherwise
+                      the level of the largest people would be skipped
+        """
+        step = self.scale_factor if self.last_box is not None else self.scale_factor ** 2
+        smallest = self.WINDOW_PERSON_HEIGHT / max_height
+        largest = min(1.0, self.WINDOW_PERSON_HEIGHT / max(min_height, 1.0))
+        if roi_size is not None:
+            win_w, win_h = self.hog.winSize
+            smallest = max(smallest, win_w / max(roi_size[0], 1), win_h / max(roi_size[1], 1))
+        if smallest >= largest:
+            # Band (or region) too small for several levels: the smallest usable one
+            return [smallest]
+        count = int(np.log(largest / smallest) / np.log(step)) + 1
+        return [largest / step ** i for i in range(count)]
+
+    def search_region(self, width, height):
+        """Return the (x, y, w, h) region to search, around the last box or the whole image."""
+        if self.last_box is None:
+            return 0, 0, width, height
+        x, y, w, h = self.last_box
+        mx, my = int(w * self.search_margin), int(h * self.search_margin * 0.5)
+        x1, y1 = max(0, x - mx), max(0, y - my)
+        x2, y2 = min(width, x + w + mx), min(height, y + h + my)
+        return x1, y1, x2 - x1, y2 - y1
+
+    def _detect_level(self, roi, scale):
+        """Run HOG on a single pyramid level and return boxes in ROI coordinates."""
+        win_w, win_h = self.hog.winSize
+        # Rounded, so the clamped smallest scale gives exactly one window and not one pixel less
+        level_w, level_h = round(roi.shape[1] * scale), round(roi.shape[0] * scale)
+        if level_w < win_w or level_h < win_h:
+            return [], []
+        level = roi if scale == 1.0 else cv2.resize(roi, (level_w, level_h), interpolation=cv2.INTER_AREA)
+        locations, weights = self.hog.detect(level, winStride=self.win_stride, padding=self.padding)
+        boxes = [[int(px / scale), int(py / scale), int(win_w / scale), int(win_h / scale)]
+                 for (px, py) in locations]
+        return boxes, [float(wt) for wt in np.ravel(weights)]
+
+    def detect(self, gray):
+        """Detect people on the pruned pyramid and return (boxes, weights) after NMS."""
+        height, width = gray.shape[:2]
+        rx, ry, rw, rh = self.search_region(width, height)
+        roi = gray[ry:ry + rh, rx:rx + rw]
+        scales = self.pyramid_scales(*self.height_band(height), roi_size=(rw, rh))
+
+        boxes, weights = [], []
+        for level_boxes, level_weights in self.executor.map(lambda s: self._detect_level(roi, s), scales):
+            boxes.extend([x + rx, y + ry, w, h] for (x, y, w, h) in level_boxes)
+            weights.extend(level_weights)
+
+        if not boxes:
+            return [], []
+        indices = cv2.dnn.NMSBoxes(boxes, weights, 0.0, 0.4)
+        return [boxes[i] for i in np.ravel(indices)], [weights[i] for i in np.ravel(indices)]
+
     def processImage(self, image_data):
         """
         Detect a person in the image, draw a bounding box, and display the result.
-        
+
         Args:
             image_data: The raw image data to process (numpy array of bytes)
-            
+
         Returns:
-            str: A message indicating the detection result
+            str: The "distance#X|distance#Y" command, or "None|None" if no person is found
         """
         # Decode the image data
-        image = cv2.imdecode(image_data, cv2.IMREAD_COLOR)
-        
+        image = decode_image(image_data)
+
+        self.target_box = None
+        self.target_confidence = None
         if image is None:
-            return "Failed to decode image"
-        
+            return "None|None"
+
         # Resize image for better performance (smaller image = faster processing)
         height, width = image.shape[:2]
-        max_dimension = 400  # Limit the maximum dimension to 400 pixels
-        
+
         # Only resize if the image is larger than max_dimension
-        if max(height, width) > max_dimension:
-            scale = max_dimension / max(height, width)
-            new_width = int(width * scale)
-            new_height = int(height * scale)
-            resized_image = cv2.resize(image, (new_width, new_height))
+        if max(height, width) > self.max_dimension:
+            scale = self.max_dimension / max(height, width)
+            resized_image = cv2.resize(image, (int(width * scale), int(height * scale)))
         else:
+            scale = 1.0
             resized_image = image
-            
+
         # Convert to grayscale for faster processing
         gray = cv2.cvtColor(resized_image, cv2.COLOR_BGR2GRAY)
-        
-        # Detect people in the image
-        boxes, weights = self.hog.detectMultiScale(
-            gray, 
-            winStride=self.win_stride,
-            padding=self.padding,
-            scale=self.scale_factor
-        )
-        
+
+        # Detect people in the pruned search space
+        boxes, weights = self.detect(gray)
+
         # Create a copy of the original image to draw on
         result_image = image.copy()
-        
-        # Draw bounding boxes around detected people
-        person_count = 0
-        for (x, y, w, h) in boxes:
-            # If we resized the image, scale the bounding box back to original size
-            if max(height, width) > max_dimension:
-                scale_back = max(height, width) / max_dimension
-                x = int(x * scale_back)
-                y = int(y * scale_back)
-                w = int(w * scale_back)
-                h = int(h * scale_back)
-            else:
-                # Convert to integers
-                x, y, w, h = int(x), int(y), int(w), int(h)
-            
-            # Draw the bounding box
-            cv2.rectangle(result_image, (x, y), (x + w, y + h), (0, 255, 0), 2)
-            person_count += 1
-        
+
         # Draw the boundary rectangles
         self.draw_bounds(result_image, width, height)
-        
+
+        command = "None|None"
+        if boxes:
+            # Follow the strongest detection
+            best = int(np.argmax(weights))
+            self.last_box = boxes[best]
+            self.misses = 0
+
+            # Scale the bounding box back to original size
+            x, y, w, h = (int(v / scale) for v in boxes[best])
+            x, y = max(0, x), max(0, y)
+            w, h = min(width - x, w), min(height - y, h)
+
+            cv2.rectangle(result_image, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            cv2.putText(result_image, f"Person: {weights[best]:.2f}", (x, y - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+            command = self.check_bounds(result_image, width, height, x, y, w, h)
+            self.target_box = (x, y, w, h)
+            self.target_confidence = weights[best]
+        else:
+            self.misses += 1
+            if self.misses >= self.max_misses:
+                # Lost the target, search the whole image and size band again
+                self.last_box = None
+
         # Display the result
         cv2.imshow("Bounded Follower", result_image)
-        
-        # Return a message with the detection result
-        if person_count > 0:
-            return f"Detected {person_count} person(s) in the image"
-        else:
-            return "No persons detected in the image"
+
+        return command
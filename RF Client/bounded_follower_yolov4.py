@@ -1,6 +1,9 @@
 import cv2
 import numpy as np
 import os
+from frame_buffers import shared_buffers
+from control_geometry import follower_geometry
+from frame_decoder import decode_image
 
 class BoundedFollowerYoloV4():
     """
@@ -14,7 +17,10 @@ class BoundedFollowerYoloV4():
                  min_bound=0.5,
                  max_bound=0.8,
                  left_bound=0.4,
-                 right_bound=0.6):
+                 right_bound=0.6,
+                 input_policy=None,
+                 buffers=None,
+                 tracks=None):
         """
         Initialize the YOLOv4-tiny detector.
         
@@ -24,6 +30,10 @@ class BoundedFollowerYoloV4():
             classes_path: Path to the COCO class names file
             min_bound: Minimum bound as a percentage of image size (0.0 to 1.0)
             max_bound: Maximum bound as a percentage of image size (0.0 to 1.0)
+            input_policy: Optional AdaptiveInputSize choosing the input size/tiles per frame
+            buffers: FrameBuffers arena for the per-frame arrays (shared arena by default)
+            tracks: Optional TrackStore; the same person is then followed across frames
+                    instead of the most confident detection of each frame
         """
         
         self.weights_path = weights_path
@@ -33,6 +43,12 @@ class BoundedFollowerYoloV4():
         self.max_bound = max_bound
         self.left_bound = left_bound
         self.right_bound = right_bound
+        self.input_policy = input_policy
+        self.buffers = buffers or shared_buffers
+        self.tracks = tracks
+        self.input_size = 416  # YOLOv4-tiny expects 416x416 images
+        self.target_box = None  # (x, y, w, h) followed in the last frame
+        self.target_confidence = None
         
         # Check if the required files exist
         self.model_ready = self._check_files()
@@ -93,70 +109,46 @@ class BoundedFollowerYoloV4():
         Returns:
             str: A message indicating the detection result
         """
+        self.target_box = None
+        self.target_confidence = None
+        
         # Check if the model is ready
         if not self.model_ready:
             return "ERROR: YOLOv4-tiny model files are missing. See console for details."
             
         # Decode the image data
-        image = cv2.imdecode(image_data, cv2.IMREAD_COLOR)
+        image = decode_image(image_data)
         
         if image is None:
             return "Failed to decode image"
         
         # Create a copy of the image to draw on
-        result_image = image.copy()
+        result_image = self.buffers.copy("result_image", image)
         
         # Get image dimensions
         height, width, _ = image.shape # height=1024, width=1024
         
-        # Prepare the image for YOLOv4-tiny
-        # YOLOv4-tiny expects 416x416 images
-        blob = cv2.dnn.blobFromImage(image, 1/255.0, (416, 416), swapRB=True, crop=False)
-        
-        # Set the input to the network
-        self.net.setInput(blob)
-        
-        # Run forward pass
-        outputs = self.net.forward(self.output_layers)
+        # Detect persons with YOLOv4-tiny
+        if self.input_policy is not None:
+            boxes, confidences = self.input_policy.detect(self, image)
+        else:
+            boxes, confidences = self.detect([image], input_size=self.input_size)[0]
+        indices = np.arange(len(boxes))
         
-        # Initialize lists for detected bounding boxes, confidences, and class IDs
-        boxes = []
-        confidences = []
-        class_ids = []
-        
-        # Process each output
-        for output in outputs:
-            for detection in output:
-                scores = detection[5:]
-                class_id = np.argmax(scores)
-                confidence = scores[class_id]
-                
-                # Filter for person class (class ID 0 in COCO dataset) with confidence > 0.5
-                if class_id == 0 and confidence > 0.5:
-                    # YOLO returns normalized coordinates
-                    center_x = int(detection[0] * width)
-                    center_y = int(detection[1] * height)
-                    w = int(detection[2] * width)
-                    h = int(detection[3] * height)
-                    
-                    # Calculate top-left corner coordinates
-                    x = int(center_x - w / 2)
-                    y = int(center_y - h / 2)
-                    
-                    boxes.append([x, y, w, h])
-                    confidences.append(float(confidence))
-                    class_ids.append(class_id)
-        
-        # Apply non-maximum suppression to remove overlapping bounding boxes
-        indices = cv2.dnn.NMSBoxes(boxes, confidences, 0.5, 0.4)
+        if self.tracks is not None:
+            # Only the detection continuing the target track is followed
+            track_ids = self.tracks.update(boxes, confidences)
+            target = self.tracks.target()
+            indices = np.flatnonzero(track_ids == target.track_id) if target is not None else indices[:0]
         
         # Draw bounding boxes for detected persons
         person_count = 0
         
         command = "None|None"
+        target_box = None
 
         if len(indices) > 0:
-            for i in indices.flatten():
+            for i in indices:
                 x, y, w, h = boxes[i]
                 
                 # Ensure coordinates are within image boundaries
@@ -181,57 +173,84 @@ class BoundedFollowerYoloV4():
                 person_count += 1
 
                 command = self.check_bounds(result_image, width, height, x, y, w, h)
+                target_box = (x, y, w, h)
+                self.target_confidence = confidences[i]
                 break
         
+        self.target_box = target_box
+        if self.input_policy is not None:
+            self.input_policy.update(target_box)
+        
         # Display the result
         cv2.imshow("YOLOv4 Follower", result_image)
         
         return command
     
-    def check_bounds(self, result_image, width, height, x, y, w, h):
-        horizontal_command = self.check_horizontal_bounds(result_image, width, height, x, w)
-        vertical_command = self.check_vertical_bounds(result_image, width, height, y)
-
-        # Combine horizontal and vertical commands
-        return f"{horizontal_command}|{vertical_command}"
+    def detect(self, images, input_size=416, conf_threshold=0.5, nms_threshold=0.4):
+        """
+        Run YOLOv4-tiny on a batch of images in a single forward pass.
         
-    def check_horizontal_bounds(self, result_image, width, height, x, w):
-        # Draw a vertical line at the width * self.left_bound
-        left_bound_x = int(width * self.left_bound)
-        cv2.line(result_image, (left_bound_x, 0), (left_bound_x, height), (255, 120, 0), 2)
-
-        # Draw a vertical line at the width * self.right_bound
-        right_bound_x = int(width * self.right_bound)
-        cv2.line(result_image, (right_bound_x, 0), (right_bound_x, height), (0, 120, 255), 2)
- 
-        # Get the point at the center of left and right bounds
-        desired_position = int((left_bound_x + right_bound_x) / 2)
-        current_position = x + int(w / 2)
-        return f"distance#{desired_position - current_position}"
-    
+        Args:
+            images: List of BGR images (they may have different sizes)
+            input_size: Network input size (multiple of 32)
+            conf_threshold: Minimum confidence for a person detection
+            nms_threshold: IoU threshold of the non-maximum suppression
+            
+        Returns:
+            list: For each image, a (boxes, confidences) tuple with the
+                  [x, y, w, h] person boxes in that image's pixel coordinates,
+                  after non-maximum suppression
+        """
+        blob = self.buffers.blob(images, input_size)
+        self.net.setInput(blob)
         
-    def check_vertical_bounds(self, result_image, width, height, y):
-        # Draw the minimum bound rectangle
-        min_rect_height = int(height * self.min_bound)
-        # Calculate the top-left and bottom-right coordinates to center the rectangle
-        min_rect_y = int((height - min_rect_height) / 2)
-        # Draw a horizontal line at the top of the minimum bound rectangle
-        cv2.line(result_image, (0, min_rect_y), (width, min_rect_y), (0, 255, 255), 2)
-        
-        # Draw the maximum bound rectangle
-        max_rect_height = int(height * self.max_bound)
-        # Calculate the top-left and bottom-right coordinates to center the rectangle
-        max_rect_y = int((height - max_rect_height) / 2)
-        # Draw a horizontal line at the top of the maximum bound rectangle
-        cv2.line(result_image, (0, max_rect_y), (width, max_rect_y), (0, 0, 255), 2)
-
-
-        # Draw a horizontal line at the middle of the minimum and maximum bounds
-        desired_position = int((min_rect_y + max_rect_y) / 2)
-        print(f"Desired movement position: {desired_position}")
-        # Draw a horizontal line at the top of the detected person
-        cv2.line(result_image, (0, y), (width, y), (255, 0, 0), 2)
-        # assign the top of the detected person to current_position
-        current_position = y
+        # Reuse the output arrays of the previous forward pass with the same batch and input size
+        key = ("yolo_outputs", len(images), input_size)
+        if key in self.buffers.buffers:
+            outputs = self.net.forward(self.output_layers, self.buffers.buffers[key])
+        else:
+            outputs = self.buffers.buffers[key] = list(self.net.forward(self.output_layers))
+        
+        # A batch of N images gives (N, rows, 85) outputs, a single image (rows, 85)
+        outputs = [output.reshape(len(images), -1, output.shape[-1]) for output in outputs]
+        
+        results = []
+        for n, image in enumerate(images):
+            height, width = image.shape[:2]
+            # Keep only the person rows of each output before concatenating them
+            kept = []
+            for output in outputs:
+                # Person score above the threshold, and person is the most likely class
+                candidates = output[n, output[n, :, 5] > conf_threshold]
+                kept.append(candidates[np.argmax(candidates[:, 5:], axis=1) == 0])
+            detections = np.concatenate(kept)
+            confidences = detections[:, 5]
+            
+            # YOLO returns normalized center coordinates
+            center_x = (detections[:, 0] * width).astype(int)
+            center_y = (detections[:, 1] * height).astype(int)
+            w = (detections[:, 2] * width).astype(int)
+            h = (detections[:, 3] * height).astype(int)
+            x = (center_x - w / 2).astype(int)
+            y = (center_y - h / 2).astype(int)
+            
+            boxes = np.stack((x, y, w, h), axis=1).tolist()
+            confidences = confidences.astype(float).tolist()
+            
+            # Apply non-maximum suppression to remove overlapping bounding boxes
+            indices = np.ravel(cv2.dnn.NMSBoxes(boxes, confidences, conf_threshold, nms_threshold)) if boxes else []
+            results.append(([boxes[i] for i in indices], [confidences[i] for i in indices]))
+        
+        return results
+    
+    def check_bounds(self, result_image, width, height, x, y, w, h):
+        """
+        Compute the "horizontal|vertical" command for the detected person.
 
-        return f"distance#{desired_position - current_position}"
\ No newline at end of file
+        Args:
+            result_image: The image to draw the bound lines on, or None to skip drawing
+        """
+        geometry = follower_geometry(self, width, height)
+        if result_image is not None:
+            geometry.draw(result_image, target_y=y)
+        return geometry.command(x, y, w, h)
@@ -0,0 +1,241 @@
+import time
+import cv2
+import numpy as np
+from bounded_follower import BoundedFollower
+from bounded_follower_hog import BoundedFollowerHog
+from frame_decoder import decode_image
+
+def box_iou(a, b):
+    """Intersection over union of two [x, y, w, h] boxes."""
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union > 0 else 0.0
+
+class CascadeFollower(BoundedFollower):
+    """
+    A two-stage follower for low-power machines.
+
+    A cheap stage proposes candidate regions (the tracked box, frame
+    differencing and a coarse HOG pass), then the YOLO verifier only runs on
+    those crops, batched in a single forward pass. The whole frame is still
+    verified every `full_frame_every` frames, or when no proposal is left.
+
+    The verifier is any follower with a detect(images, input_size) method
+    (BoundedFollowerYoloV4 or BoundedFollowerYoloV8).
+    """
+    STAGES = ("decode", "prepare", "tracked", "motion", "hog", "verify", "full_frame")
+
+    def __init__(self, verifier, min_bound=0.5, max_bound=0.8, left_bound=0.4, right_bound=0.6,
+                 proposals=("tracked", "motion", "hog"), full_frame_every=30,
+                 full_input_size=416, crop_input_size=224, max_proposals=4,
+                 crop_margin=0.3, motion_threshold=25, proposal_dimension=256):
+        """
+        Args:
+            verifier: Follower used to verify the proposals (e.g. BoundedFollowerYoloV4())
+            proposals: Proposal stages to use, any of "tracked", "motion" and "hog"
+            full_frame_every: Verify the whole frame every N frames
+            full_input_size: Network input size for the full-frame pass
+            crop_input_size: Network input size for each proposal crop (multiple of 32)
+            max_proposals: Maximum number of crops verified per frame
+            crop_margin: Context added around each proposal, as a fraction of its size
+            motion_threshold: Gray level difference counted as motion
+            proposal_dimension: Maximum dimension of the image used by the cheap stages
+        """
+        super().__init__(min_bound, max_bound, left_bound, right_bound)
+        self.verifier = verifier
+        self.proposals = proposals
+        self.full_frame_every = full_frame_every
+        self.full_input_size = full_input_size
+        self.crop_input_size = crop_input_size
+        self.max_proposals = max_proposals
+        self.crop_margin = crop_margin
+        self.motion_threshold = motion_threshold
+        self.proposal_dimension = proposal_dimension
+
+        # Coarse HOG: only its detect() is used, on a small image, with a large stride
+        self.hog = BoundedFollowerHog(min_bound, max_bound, left_bound, right_bound) if "hog" in proposals else None
+        if self.hog is not None:
+            self.hog.win_stride = (8, 8)
+            self.hog.scale_factor = 1.2
+
+        self.prev_gray = None
+        self.last_box = None  # Verified target box, full resolution
+        self.target_box = None  # Box followed in the last frame (None if not found)
+        self.target_confidence = None
+        self.frames_since_full = full_frame_every
+
+        # Statistics: cumulative seconds per stage and inference pixels
+        self.stage_time = dict.fromkeys(self.STAGES, 0.0)
+        self.frames = 0
+        self.full_frames = 0
+        self.inference_pixels = 0
+        self.full_frame_pixels = 0
+
+    def motion_proposals(self, gray, scale):
+        """Bounding boxes of the regions that changed since the previous frame."""
+        if self.prev_gray is None or self.prev_gray.shape != gray.shape:
+            return []
+        diff = cv2.absdiff(gray, self.prev_gray)
+        _, mask = cv2.threshold(diff, self.motion_threshold, 255, cv2.THRESH_BINARY)
+        mask = cv2.dilate(mask, None, iterations=2)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        min_area = 0.002 * gray.size
+        contours = sorted((c for c in contours if cv2.contourArea(c) > min_area),
+                          key=cv2.contourArea, reverse=True)
+        return [[int(v / scale) for v in cv2.boundingRect(c)] for c in contours[:self.max_proposals]]
+
+    def hog_proposals(self, gray, scale):
+        """People found by a coarse HOG pass, in full resolution coordinates."""
+        # The verified box prunes the HOG search region and size band, like in BoundedFollowerHog
+        self.hog.last_box = None if self.last_box is None else [int(v * scale) for v in self.last_box]
+        boxes, _ = self.hog.detect(gray)
+        return [[int(v / scale) for v in box] for box in boxes]
+
+    def square_crop(self, box, width, height):
+        """Expand a proposal to a square region with some context, clipped to the image."""
+        x, y, w, h = box
+        side = int(max(w, h) * (1 + 2 * self.crop_margin))
+        side = min(side, width, height)
+        cx, cy = x + w // 2, y + h // 2
+        x1 = min(max(0, cx - side // 2), width - side)
+        y1 = min(max(0, cy - side // 2), height - side)
+        return [x1, y1, side, side]
+
+    def propose(self, image):
+        """Return the square regions (full resolution) to verify in this frame."""
+        start = time.perf_counter()
+        height, width = image.shape[:2]
+        scale = min(1.0, self.proposal_dimension / max(height, width))
+        small = cv2.resize(image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        self.stage_time["prepare"] += time.perf_counter() - start
+
+        candidates = []
+        if "tracked" in self.proposals and self.last_box is not None:
+            start = time.perf_counter()
+            candidates.append(self.last_box)
+            self.stage_time["tracked"] += time.perf_counter() - start
+        if "motion" in self.proposals:
+            start = time.perf_counter()
+            candidates.extend(self.motion_proposals(gray, scale))
+            self.stage_time["motion"] += time.perf_counter() - start
+        if "hog" in self.proposals:
+            start = time.perf_counter()
+            candidates.extend(self.hog_proposals(gray, scale))
+            self.stage_time["hog"] += time.perf_counter() - start
+        self.prev_gray = gray
+
+        # Merge overlapping proposals, the earlier stages have priority
+        regions = []
+        for box in candidates:
+            region = self.square_crop(box, width, height)
+            if all(box_iou(region, other) < 0.5 for other in regions):
+                regions.append(region)
+            if len(regions) == self.max_proposals:
+                break
+        return regions
+
+    def verify_regions(self, image, regions, nms_threshold=0.4):
+        """
+        Run the verifier on all the crops in one batch, return boxes in full resolution.
+        Overlapping crops can see the same person, so NMS runs again across the crops.
+        """
+        crops = [image[y:y + h, x:x + w] for (x, y, w, h) in regions]
+        boxes, confidences = [], []
+        for (rx, ry, _, _), (crop_boxes, crop_confidences) in zip(
+                regions, self.verifier.detect(crops, input_size=self.crop_input_size)):
+            boxes.extend([x + rx, y + ry, w, h] for (x, y, w, h) in crop_boxes)
+            confidences.extend(crop_confidences)
+        self.inference_pixels += len(crops) * self.crop_input_size ** 2
+        if len(regions) > 1 and boxes:
+            indices = np.ravel(cv2.dnn.NMSBoxes(boxes, confidences, 0.0, nms_threshold))
+            boxes, confidences = [boxes[i] for i in indices], [confidences[i] for i in indices]
+        return boxes, confidences
+
+    def select_target(self, boxes, confidences):
+        """Prefer the box that continues the current track, else the most confident one."""
+        if self.last_box is not None:
+            overlaps = [box_iou(box, self.last_box) for box in boxes]
+            if max(overlaps) > 0.3:
+                return int(np.argmax(overlaps))
+        return int(np.argmax(confidences))
+
+    def processImage(self, image_data):
+        """
+        Propose regions, verify them with YOLO and return a command.
+
+        Args:
+            image_data: The raw image data to process (numpy array of bytes)
+
+        Returns:
+            str: The "distance#X|distance#Y" command, or "None|None" if no person is found
+        """
+        self.target_box = None
+        self.target_confidence = None
+        if not getattr(self.verifier, "model_ready", True):
+            return "ERROR: The cascade verifier model files are missing. See console for details."
+
+        start = time.perf_counter()
+        image = decode_image(image_data)
+        self.stage_time["decode"] += time.perf_counter() - start
+        if image is None:
+            return "None|None"
+
+        self.frames += 1
+        height, width = image.shape[:2]
+        self.full_frame_pixels += self.full_input_size ** 2
+
+        regions = self.propose(image)
+        boxes, confidences = [], []
+        if regions and self.frames_since_full < self.full_frame_every:
+            start = time.perf_counter()
+            boxes, confidences = self.verify_regions(image, regions)
+            self.stage_time["verify"] += time.perf_counter() - start
+            self.frames_since_full += 1
+
+        if not boxes:
+            # Periodic refresh, nothing proposed, or the proposals were rejected
+            start = time.perf_counter()
+            boxes, confidences = self.verifier.detect([image], input_size=self.full_input_size)[0]
+            self.stage_time["full_frame"] += time.perf_counter() - start
+            self.inference_pixels += self.full_input_size ** 2
+            self.full_frames += 1
+            self.frames_since_full = 0
+
+        result_image = image.copy()
+        self.draw_bounds(result_image, width, height)
+        for (x, y, w, h) in regions:
+            cv2.rectangle(result_image, (x, y), (x + w, y + h), (255, 0, 255), 1)
+
+        command = "None|None"
+        if boxes:
+            best = self.select_target(boxes, confidences)
+            x, y, w, h = boxes[best]
+            x, y = max(0, x), max(0, y)
+            w, h = min(width - x, w), min(height - y, h)
+            self.last_box = [x, y, w, h]
+            self.target_confidence = confidences[best]
+
+            cv2.rectangle(result_image, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            cv2.putText(result_image, f"Person: {confidences[best]:.2f}", (x, y - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+            command = self.check_bounds(result_image, width, height, x, y, w, h)
+        else:
+            self.last_box = None
+            self.target_confidence = None
+        self.target_box = None if self.last_box is None else tuple(self.last_box)
+
+        cv2.imshow("Cascade Follower", result_image)
+        return command
+
+    def report(self):
+        """Return a per-stage cost breakdown (average milliseconds per frame)."""
+        if self.frames == 0:
+            return "Cascade: no frames processed"
+        stages = ", ".join(f"{stage} {self.stage_time[stage] / self.frames * 1000:.1f}ms"
+                           for stage in self.STAGES)
+        return (f"Cascade: {self.frames} frames, {self.full_frames} full-frame passes, "
+                f"inference pixels {self.inference_pixels / self.full_frame_pixels * 100:.0f}% of full-frame; "
+                f"{stages}")
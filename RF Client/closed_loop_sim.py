@@ -0,0 +1,655 @@
+"""
+Closed-loop simulation of the robot without Unity.
+
+A Python model of RobotController (PID) and RobotPhysicsController follows a
+walking target. The camera of the robot is a pinhole model, and the frames are
+rendered with OpenCV when a follower needs images. The parameters are the
+values of the simulator scene (Assets/Scenes/SampleScene.unity), which
+override the defaults of the C# scripts.
+
+Two ways to close the loop:
+
+  - serve: a stand-in for the Unity TCP server (127.0.0.1:2737, same protocol),
+    so any client entry point can drive the simulated robot:
+
+        python closed_loop_sim.py serve --fps 10
+        python main.py --detector hog          # in another terminal
+
+    By default the server runs in lockstep: it sends a frame, waits for the
+    command, and applies it after the measured client latency (plus
+    --extra-latency) in simulated time, so it runs as fast as the client
+    allows. --realtime sends the frames on the wall clock like Unity does.
+
+  - sweep: the follower runs in-process in simulated time, much faster than
+    real time, over a grid of client latencies and frame rates:
+
+        python closed_loop_sim.py sweep --latencies 0 50 100 200 400 --fps 5 10 20 30
+        python closed_loop_sim.py sweep --follower hog --latencies 0 100 --fps 10
+
+    The "ideal" follower projects the target box exactly (optionally with pixel
+    noise), to isolate the effect of latency and frame rate; any follower name
+    of pareto_benchmark.py runs on rendered frames instead.
+
+The report gives, per configuration, the following distance error (against the
+distance where the controller stops), the bearing error, the fraction of time
+the target was visible and when it was first lost.
+
+The simulator knows the exact boxes, so it also writes annotated sequences for
+pareto_benchmark.py (frame_NNNNNN.jpg files and ground_truth.csv), either from
+the frames it serves (serve --record DIR) or driving the robot itself with the
+ideal follower:
+
+        python closed_loop_sim.py record recordings/sim1 --duration 30 --distractors 3
+"""
+import argparse
+import csv
+import math
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+import cv2
+import numpy as np
+from control_geometry import control_geometry
+
+def clamp(value, low, high):
+    return max(low, min(high, value))
+
+def lerp(a, b, t):
+    """Mathf.Lerp (t clamped to [0, 1])."""
+    return a + (b - a) * clamp(t, 0.0, 1.0)
+
+def move_towards(current, target, max_delta):
+    """Mathf.MoveTowards."""
+    if abs(target - current) <= max_delta:
+        return target
+    return current + math.copysign(max_delta, target - current)
+
+class RobotPhysicsModel:
+    """RobotPhysicsController.FixedUpdate: motor and steering lag, then the kinematic move."""
+    def __init__(self, max_rpm=12000.0, wheel_radius=0.03, max_speed=1.5, motor_acceleration=5.0,
+                 max_steering_angle=30.0, steering_speed=3.0, max_steering_command=1.0):
+        self.max_rpm = max_rpm
+        self.wheel_radius = wheel_radius
+        self.max_speed = max_speed
+        self.motor_acceleration = motor_acceleration
+        self.max_steering_angle = max_steering_angle
+        self.steering_speed = steering_speed
+        self.max_steering_command = max_steering_command
+        self.speed_command = 0.0
+        self.steering_command = 0.0
+        self.current_speed = 0.0
+        self.current_steering_angle = 0.0
+        # Pose on the ground plane: x, z in meters, yaw in degrees (0 = +z, positive turns right)
+        self.x = 0.0
+        self.z = 0.0
+        self.yaw = 0.0
+
+    def fixed_update(self, dt):
+        motor_input = clamp(self.speed_command / self.max_speed, -1.0, 1.0)
+        rpm = motor_input * self.max_rpm
+        linear_speed = (rpm / 60.0) * 2.0 * math.pi * self.wheel_radius
+        self.current_speed = lerp(self.current_speed, linear_speed, self.motor_acceleration * dt)
+
+        steering_input = clamp(self.steering_command / self.max_steering_command, -1.0, 1.0)
+        target_angle = steering_input * self.max_steering_angle
+        self.current_steering_angle = lerp(self.current_steering_angle, target_angle, self.steering_speed * dt)
+
+        # MoveRotation is applied at the physics step, so the move uses the previous rotation
+        heading = math.radians(self.yaw)
+        self.yaw += self.current_steering_angle * dt
+        self.x += math.sin(heading) * self.current_speed * dt
+        self.z += math.cos(heading) * self.current_speed * dt
+
+class RobotControllerModel:
+    """RobotController.ProcessCommand: the "rotation|movement" PID of the simulator."""
+    def __init__(self, physics, fixed_delta_time=0.02, pixel_to_unity_factor=0.01,
+                 desired_distance_movement=40, kp_movement=0.1, ki_movement=0.0, kd_movement=0.01,
+                 min_movement_distance=40, max_movement_distance=50,
+                 desired_distance_rotation=0, kp_rotation=0.6, ki_rotation=0.0, kd_rotation=0.01,
+                 min_rotation_distance=501, max_rotation_distance=521):
+        self.physics = physics
+        self.fixed_delta_time = fixed_delta_time
+        self.pixel_to_unity_factor = pixel_to_unity_factor
+        self.desired_distance_movement = desired_distance_movement
+        self.kp_movement, self.ki_movement, self.kd_movement = kp_movement, ki_movement, kd_movement
+        self.min_movement_distance, self.max_movement_distance = min_movement_distance, max_movement_distance
+        self.desired_distance_rotation = desired_distance_rotation
+        self.kp_rotation, self.ki_rotation, self.kd_rotation = kp_rotation, ki_rotation, kd_rotation
+        self.min_rotation_distance, self.max_rotation_distance = min_rotation_distance, max_rotation_distance
+        self.previous_error_movement = 0.0
+        self.integral_movement = 0.0
+        self.previous_error_rotation = 0.0
+        self.integral_rotation = 0.0
+
+    def process_command(self, command):
+        parts = command.split("|")
+        if len(parts) != 2:
+            return
+        self.process_movement_command(parts[1])
+        self.process_rotation_command(parts[0])
+
+    def process_movement_command(self, command):
+        if command.lower() == "none":
+            self.physics.speed_command = 0.0
+            return
+        parts = command.split("#")
+        if len(parts) != 2:
+            return
+        distance = int(parts[1])
+        if self.min_movement_distance <= distance <= self.max_movement_distance:
+            self.physics.speed_command = 0.0
+            return
+
+        dt = self.fixed_delta_time
+        error = (self.desired_distance_movement - distance) * self.pixel_to_unity_factor
+        abs_error = abs(error)
+        kp = self.kp_movement if abs_error > 20 else self.kp_movement * 0.4
+        kd = self.kd_movement * 1.2
+        max_limit = 1.0 if abs_error > 20 else 0.15
+
+        self.integral_movement += error * dt
+        derivative = (error - self.previous_error_movement) / dt
+        self.previous_error_movement = error
+
+        raw_output = kp * error + self.ki_movement * self.integral_movement + kd * derivative
+        clamped = clamp(raw_output, -max_limit, max_limit)
+        # Rate limit, per command received
+        self.physics.speed_command = move_towards(self.physics.speed_command, clamped, 0.3 * dt)
+
+    def process_rotation_command(self, command):
+        if command.lower() == "none":
+            self.physics.steering_command = 0.0
+            return
+        parts = command.split("#")
+        if len(parts) != 2:
+            return
+        distance = int(parts[1])
+        if self.min_rotation_distance <= distance <= self.max_rotation_distance:
+            self.physics.steering_command = 0.0
+            return
+
+        dt = self.fixed_delta_time
+        error = (self.desired_distance_rotation - distance) * self.pixel_to_unity_factor
+        self.integral_rotation += error * dt
+        derivative = (error - self.previous_error_rotation) / dt
+        self.previous_error_rotation = error
+        self.physics.steering_command = (self.kp_rotation * error + self.ki_rotation * self.integral_rotation
+                                         + self.kd_rotation * derivative)
+
+class Walker:
+    """A person walking on the ground plane with smooth random turns and pauses."""
+    def __init__(self, x, z, heading, speed, rng, max_turn_rate=40.0, pause_probability=0.1,
+                 shirt=(0, 200, 0)):
+        self.x, self.z, self.heading = x, z, heading
+        self.speed = speed
+        self.rng = rng
+        self.max_turn_rate = max_turn_rate
+        self.pause_probability = pause_probability
+        self.shirt = shirt
+        self.turn_rate = 0.0
+        self.walking = True
+        self.segment_left = 0.0
+
+    def update(self, dt):
+        self.segment_left -= dt
+        if self.segment_left <= 0:
+            # New segment of 1 to 4 seconds: straight, turning, or standing still
+            self.segment_left = self.rng.uniform(1.0, 4.0)
+            self.walking = self.rng.random() >= self.pause_probability
+            self.turn_rate = self.rng.uniform(-self.max_turn_rate, self.max_turn_rate) if self.rng.random() < 0.6 else 0.0
+        if self.walking:
+            self.heading += self.turn_rate * dt
+            heading = math.radians(self.heading)
+            self.x += math.sin(heading) * self.speed * dt
+            self.z += math.cos(heading) * self.speed * dt
+
+class Camera:
+    """Pinhole camera of the robot, looking forward (vertical field of view like Unity's Camera)."""
+    def __init__(self, width=1024, height=1024, field_of_view=60.0, camera_height=1.0,
+                 person_height=1.8, person_width=0.5):
+        self.width, self.height = width, height
+        self.focal = (height / 2) / math.tan(math.radians(field_of_view) / 2)
+        self.cx, self.cy = width / 2, height / 2
+        self.camera_height = camera_height
+        self.person_height = person_height
+        self.person_width = person_width
+
+    def to_camera(self, robot, x, z):
+        """(right, forward) coordinates of a ground point in the camera frame."""
+        dx, dz = x - robot[0], z - robot[1]
+        yaw = math.radians(robot[2])
+        return dx * math.cos(yaw) - dz * math.sin(yaw), dx * math.sin(yaw) + dz * math.cos(yaw)
+
+    def person_box(self, robot, x, z):
+        """[x, y, w, h] pixel box of a person standing at (x, z), or None if it is not in the image."""
+        right, forward = self.to_camera(robot, x, z)
+        if forward < 0.3:
+            return None
+        u = self.cx + self.focal * right / forward
+        top = self.cy - self.focal * (self.person_height - self.camera_height) / forward
+        bottom = self.cy + self.focal * self.camera_height / forward
+        w = self.focal * self.person_width / forward
+        box = [int(u - w / 2), int(top), int(w), int(bottom - top)]
+        # Visible if the box center is in the image (the followers need most of the body)
+        if not (0 <= u < self.width and top < self.height and bottom > 0):
+            return None
+        return box
+
+    def stop_distance(self, geometry, controller):
+        """Distance at which the movement command enters the controller's dead band."""
+        desired_top = geometry.desired_y - (controller.min_movement_distance + controller.max_movement_distance) / 2
+        return self.focal * (self.person_height - self.camera_height) / (self.cy - desired_top)
+
+    def render(self, robot, people):
+        """Draw a frame: sky, ground grid, and the people ((x, z, shirt color) tuples) from far to near."""
+        image = np.empty((self.height, self.width, 3), np.uint8)
+        horizon = int(self.cy)
+        image[:horizon] = (235, 206, 135)
+        image[horizon:] = (90, 110, 120)
+
+        # Ground grid lines every 2 m around the robot, so the ego-motion is visible
+        gx, gz = round(robot[0] / 2) * 2, round(robot[1] / 2) * 2
+        for offset in range(-20, 22, 2):
+            for line in (((gx + offset, gz - 20), (gx + offset, gz + 20)), ((gx - 20, gz + offset), (gx + 20, gz + offset))):
+                points = []
+                for s in np.linspace(0.0, 1.0, 41):
+                    x = line[0][0] + (line[1][0] - line[0][0]) * s
+                    z = line[0][1] + (line[1][1] - line[0][1]) * s
+                    right, forward = self.to_camera(robot, x, z)
+                    if forward > 0.3:
+                        points.append((int(self.cx + self.focal * right / forward),
+                                       int(self.cy + self.focal * self.camera_height / forward)))
+                    elif len(points) > 1:
+                        cv2.polylines(image, [np.array(points)], False, (70, 85, 95), 1)
+                        points = []
+                if len(points) > 1:
+                    cv2.polylines(image, [np.array(points)], False, (70, 85, 95), 1)
+
+        boxes = []
+        for x, z, shirt in people:
+            box = self.person_box(robot, x, z)
+            if box is not None:
+                boxes.append((self.to_camera(robot, x, z)[1], box, shirt))
+        for _, (x, y, w, h), shirt in sorted(boxes, key=lambda b: -b[0]):
+            head = max(1, h // 8)
+            cv2.ellipse(image, (x + w // 2, y + head), (max(1, w // 4), head), 0, 0, 360, (140, 170, 220), -1)
+            cv2.rectangle(image, (x, y + 2 * head), (x + w, y + h * 11 // 20), shirt, -1)
+            cv2.rectangle(image, (x + w // 8, y + h * 11 // 20), (x + w // 2 - 1, y + h), (90, 50, 30), -1)
+            cv2.rectangle(image, (x + w // 2 + 1, y + h * 11 // 20), (x + w - w // 8, y + h), (90, 50, 30), -1)
+        return image
+
+class Simulation:
+    """The robot, the target and optional distractors, stepped at the physics rate of the scene."""
+    def __init__(self, seed=0, target_speed=1.0, distractors=0, fixed_delta_time=0.02,
+                 bounds=(0.5, 0.8, 0.4, 0.6), camera=None):
+        self.dt = fixed_delta_time
+        self.camera = camera or Camera()
+        self.physics = RobotPhysicsModel()
+        self.controller = RobotControllerModel(self.physics, fixed_delta_time)
+        self.geometry = control_geometry(self.camera.width, self.camera.height, *bounds)
+        self.desired_distance = self.camera.stop_distance(self.geometry, self.controller)
+        rng = np.random.default_rng(seed)
+        self.target = Walker(0.0, self.desired_distance + 0.5, 0.0, target_speed, rng)
+        self.people = [self.target] + [
+            Walker(rng.uniform(-6, 6), rng.uniform(2, 12), rng.uniform(0, 360), rng.uniform(0.6, 1.4), rng,
+                   shirt=(60, 60, 180))
+            for _ in range(distractors)]
+        self.time = 0.0
+        self.steps = 0
+        self.warmup = 2.0
+        self.distance_errors = []
+        self.bearing_errors = []
+        self.visible = []
+        self.lost_at = None
+
+    def robot(self):
+        return (self.physics.x, self.physics.z, self.physics.yaw)
+
+    def snapshot(self):
+        """State needed to render or observe the scene at this instant."""
+        return self.robot(), [(p.x, p.z) for p in self.people]
+
+    def step(self):
+        """One FixedUpdate of the robot and the people, then the metrics."""
+        self.physics.fixed_update(self.dt)
+        # The target starts walking after one second
+        for person in self.people:
+            if self.time >= 1.0 or person is not self.target:
+                person.update(self.dt)
+        self.steps += 1
+        self.time = self.steps * self.dt
+
+        robot = self.robot()
+        visible = self.camera.person_box(robot, self.target.x, self.target.z) is not None
+        if self.time >= self.warmup:
+            dx, dz = self.target.x - robot[0], self.target.z - robot[1]
+            bearing = math.degrees(math.atan2(dx, dz)) - robot[2]
+            self.bearing_errors.append(abs((bearing + 180) % 360 - 180))
+            self.distance_errors.append(abs(math.hypot(dx, dz) - self.desired_distance))
+            self.visible.append(visible)
+            if not visible and self.lost_at is None:
+                self.lost_at = self.time
+
+    def advance_to(self, t):
+        while self.time + self.dt / 2 <= t:
+            self.step()
+
+    def observe(self, snapshot, pixel_noise=0.0, rng=None):
+        """The ideal follower: the command of the exact target box (optionally with pixel noise)."""
+        robot, positions = snapshot
+        box = self.camera.person_box(robot, *positions[0])
+        if box is None:
+            return "None|None"
+        if pixel_noise > 0:
+            box = [int(round(v + rng.normal(0, pixel_noise))) for v in box]
+        return self.geometry.command(*box)
+
+    def ground_truth(self, snapshot):
+        """(person_id, [x, y, w, h], is_target) of every person in the image, boxes clipped to it."""
+        robot, positions = snapshot
+        people = []
+        for person_id, (x, z) in enumerate(positions):
+            box = self.camera.person_box(robot, x, z)
+            if box is None:
+                continue
+            x1, y1 = max(0, box[0]), max(0, box[1])
+            x2, y2 = min(self.camera.width, box[0] + box[2]), min(self.camera.height, box[1] + box[3])
+            if x2 > x1 and y2 > y1:
+                people.append((person_id, [x1, y1, x2 - x1, y2 - y1], person_id == 0))
+        return people
+
+    def render(self, snapshot):
+        robot, positions = snapshot
+        return self.camera.render(robot, [(x, z, person.shirt) for person, (x, z) in zip(self.people, positions)])
+
+    def report(self):
+        """Tracking metrics after the warm-up."""
+        distance = np.array(self.distance_errors or [math.nan])
+        bearing = np.array(self.bearing_errors or [math.nan])
+        return {
+            "distance_error_m": float(distance.mean()),
+            "distance_error_p95_m": float(np.percentile(distance, 95)),
+            "bearing_error_deg": float(bearing.mean()),
+            "bearing_error_p95_deg": float(np.percentile(bearing, 95)),
+            "visible": float(np.mean(self.visible)) if self.visible else math.nan,
+            "lost_at_s": self.lost_at,
+        }
+
+class SequenceRecorder:
+    """
+    Writes the frames and their exact boxes as a pareto_benchmark.py sequence:
+    DIR/frame_NNNNNN.jpg (numbered like main.py --record) and DIR/ground_truth.csv
+    with the columns frame,person_id,x,y,w,h,target (the target is person 0).
+    """
+    def __init__(self, path, sim, quality=75):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.sim = sim
+        self.quality = quality
+        self.file = open(os.path.join(path, "ground_truth.csv"), "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(["frame", "person_id", "x", "y", "w", "h", "target"])
+        self.count = 0
+
+    def write(self, snapshot, data=None):
+        """Save one frame (its JPEG bytes if already encoded) and its ground truth."""
+        if data is None:
+            data = cv2.imencode(".jpg", self.sim.render(snapshot), [cv2.IMWRITE_JPEG_QUALITY, self.quality])[1]
+        data.tofile(os.path.join(self.path, f"frame_{self.count:06d}.jpg"))
+        for person_id, (x, y, w, h), target in self.sim.ground_truth(snapshot):
+            self.writer.writerow([self.count, person_id, x, y, w, h, int(target)])
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+def run_closed_loop(fps, latency, duration=60.0, follower=None, policy="latest", pixel_noise=0.0,
+                    seed=0, target_speed=1.0, distractors=0, record=None):
+    """
+    Run one closed loop in simulated time.
+
+    Frames are captured at `fps`. The client processes one frame at a time: a
+    frame's command is applied `latency` seconds after the client starts on it
+    (plus the measured processing time when `follower` is a real follower).
+    With policy "latest", the client takes the newest frame when it is free;
+    with "queue", it processes every frame in order (the socket backlog of a
+    serial client). With `record` (a directory), every captured frame is saved
+    with its ground truth (SequenceRecorder).
+
+    Returns:
+        dict: the metrics of Simulation.report(), plus the frames processed and the wall time
+    """
+    sim = Simulation(seed=seed, target_speed=target_speed, distractors=distractors)
+    recorder = SequenceRecorder(record, sim) if record else None
+    rng = np.random.default_rng(seed + 1)
+    period = 1.0 / fps
+    next_capture = 0.0
+    frames = []  # (capture time, snapshot) not processed yet
+    pending = None  # (apply time, command)
+    processed = 0
+    wall_start = time.perf_counter()
+
+    while sim.time < duration:
+        while next_capture <= sim.time + 1e-9:
+            frames.append((next_capture, sim.snapshot()))
+            if recorder is not None:
+                recorder.write(frames[-1][1])
+            next_capture += period
+        if pending is not None and sim.time + 1e-9 >= pending[0]:
+            sim.controller.process_command(pending[1])
+            pending = None
+        if pending is None and frames:
+            if policy == "latest":
+                _, snapshot = frames[-1]
+                frames.clear()
+            else:
+                _, snapshot = frames.pop(0)
+            if follower is None:
+                command, elapsed = sim.observe(snapshot, pixel_noise, rng), 0.0
+            else:
+                image = sim.render(snapshot)
+                start = time.perf_counter()
+                command = follower.processImage(image)
+                elapsed = time.perf_counter() - start
+            pending = (sim.time + latency + elapsed, command)
+            processed += 1
+        sim.step()
+
+    if recorder is not None:
+        recorder.close()
+    result = sim.report()
+    result["frames"] = processed
+    result["wall_s"] = time.perf_counter() - wall_start
+    result["desired_distance_m"] = sim.desired_distance
+    return result
+
+def _read_commands(connection, commands):
+    """Reader thread of the server: (arrival time, command) of every command of the client."""
+    try:
+        while True:
+            size_data = connection.recv(4, socket.MSG_WAITALL)
+            if len(size_data) < 4:
+                break
+            size = struct.unpack("I", size_data)[0]
+            data = connection.recv(size, socket.MSG_WAITALL) if size else b""
+            commands.put((time.perf_counter(), data.decode("utf-8")))
+    except OSError:
+        pass
+    commands.put(None)
+
+def serve(port=2737, fps=10.0, duration=60.0, realtime=False, extra_latency=0.0, seed=0,
+          target_speed=1.0, distractors=0, quality=75, record=None):
+    """
+    Stand-in for the Unity server: sends rendered frames and applies the client's commands.
+    With `record` (a directory), the frames sent are saved with their ground truth.
+    """
+    sim = Simulation(seed=seed, target_speed=target_speed, distractors=distractors)
+    recorder = SequenceRecorder(record, sim, quality) if record else None
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("127.0.0.1", port))
+    server.listen(1)
+    print(f"Simulated server on 127.0.0.1:{port} ({'real time' if realtime else 'lockstep'}, {fps} FPS), "
+          f"follow distance {sim.desired_distance:.2f} m. Waiting for a client...")
+    connection, _ = server.accept()
+    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    commands = queue.Queue()
+    threading.Thread(target=_read_commands, args=(connection, commands), daemon=True).start()
+    period = 1.0 / fps
+    latencies = []
+    wall_start = time.perf_counter()
+
+    def send_frame():
+        snapshot = sim.snapshot()
+        data = cv2.imencode(".jpg", sim.render(snapshot), [cv2.IMWRITE_JPEG_QUALITY, quality])[1]
+        if recorder is not None:
+            recorder.write(snapshot, data)
+        connection.sendall(struct.pack("I", len(data)) + data.tobytes())
+        return time.perf_counter()
+
+    try:
+        if realtime:
+            next_frame = 0.0
+            while sim.time < duration:
+                now = time.perf_counter() - wall_start
+                while True:
+                    try:
+                        item = commands.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        raise ConnectionError
+                    sim.advance_to(item[0] - wall_start)
+                    sim.controller.process_command(item[1])
+                sim.advance_to(now)
+                if now >= next_frame:
+                    send_frame()
+                    next_frame += period
+                time.sleep(0.001)
+        else:
+            capture = 0.0
+            while sim.time < duration:
+                sim.advance_to(capture)
+                sent = send_frame()
+                item = commands.get(timeout=30)
+                if item is None:
+                    raise ConnectionError
+                latency = item[0] - sent + extra_latency
+                latencies.append(latency)
+                sim.advance_to(capture + latency)
+                sim.controller.process_command(item[1])
+                # The next frame is the first one captured once the client is free
+                capture = max(capture + period, math.ceil(sim.time / period - 1e-9) * period)
+    except (ConnectionError, OSError, queue.Empty):
+        print("Client disconnected")
+    finally:
+        connection.close()
+        server.close()
+        if recorder is not None:
+            recorder.close()
+
+    result = sim.report()
+    wall = time.perf_counter() - wall_start
+    print(f"Simulated {sim.time:.1f} s in {wall:.1f} s ({sim.time / wall:.1f}x real time)")
+    if latencies:
+        print(f"Client latency: {np.mean(latencies) * 1000:.1f} ms mean, {np.percentile(latencies, 95) * 1000:.1f} ms p95")
+    print(format_result(result))
+    return result
+
+def format_result(result):
+    lost = f"{result['lost_at_s']:.1f} s" if result["lost_at_s"] is not None else "never"
+    return (f"distance error {result['distance_error_m']:.2f} m (p95 {result['distance_error_p95_m']:.2f}), "
+            f"bearing error {result['bearing_error_deg']:.1f} deg (p95 {result['bearing_error_p95_deg']:.1f}), "
+            f"visible {result['visible'] * 100:.0f}%, lost at {lost}")
+
+def sweep(latencies, fps_values, duration, follower_name="ideal", policy="latest", pixel_noise=0.0,
+          seeds=(0,), target_speed=1.0, distractors=0):
+    """Run the closed loop for every latency and frame rate, averaged over the seeds."""
+    follower = None
+    if follower_name != "ideal":
+        from pareto_benchmark import build
+        cv2.imshow = lambda *args, **kwargs: None
+
+    print(f"{'latency ms':>10} {'fps':>5} {'dist err m':>10} {'bearing deg':>11} {'p95 deg':>8} "
+          f"{'visible':>8} {'lost at s':>9} {'speed-up':>9}")
+    results = []
+    for latency_ms in latencies:
+        for fps in fps_values:
+            runs = []
+            for seed in seeds:
+                if follower_name != "ideal":
+                    # New follower per run, so no tracking state leaks between runs
+                    follower = build(follower_name, {})
+                runs.append(run_closed_loop(fps, latency_ms / 1000, duration, follower, policy, pixel_noise,
+                                            seed, target_speed, distractors))
+            lost = [r["lost_at_s"] for r in runs if r["lost_at_s"] is not None]
+            row = {
+                "latency_ms": latency_ms, "fps": fps,
+                "distance_error_m": np.mean([r["distance_error_m"] for r in runs]),
+                "bearing_error_deg": np.mean([r["bearing_error_deg"] for r in runs]),
+                "bearing_error_p95_deg": np.mean([r["bearing_error_p95_deg"] for r in runs]),
+                "visible": np.mean([r["visible"] for r in runs]),
+                "lost_at_s": min(lost) if lost else None,
+                "speed_up": duration * len(runs) / sum(r["wall_s"] for r in runs),
+            }
+            results.append(row)
+            lost_text = f"{row['lost_at_s']:.1f}" if row["lost_at_s"] is not None else "-"
+            print(f"{latency_ms:10.0f} {fps:5.0f} {row['distance_error_m']:10.2f} {row['bearing_error_deg']:11.1f} "
+                  f"{row['bearing_error_p95_deg']:8.1f} {row['visible'] * 100:7.0f}% {lost_text:>9} "
+                  f"{row['speed_up']:8.0f}x")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Closed-loop simulation of the robot without Unity")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Serve simulated frames over the simulator's TCP protocol")
+    serve_parser.add_argument("--port", type=int, default=2737)
+    serve_parser.add_argument("--fps", type=float, default=10.0, help="Frame rate (the Unity server sends 10 FPS)")
+    serve_parser.add_argument("--realtime", action="store_true",
+                              help="Send frames on the wall clock instead of waiting for each command")
+    serve_parser.add_argument("--extra-latency", type=float, default=0.0, metavar="SECONDS",
+                              help="Latency added to the measured client latency (lockstep)")
+    serve_parser.add_argument("--record", default=None, metavar="DIR",
+                              help="Save the frames sent and their ground truth (pareto_benchmark.py sequence)")
+
+    record_parser = subparsers.add_parser("record", help="Write an annotated sequence, driving the robot with the ideal follower")
+    record_parser.add_argument("path", metavar="DIR")
+    record_parser.add_argument("--fps", type=float, default=10.0)
+    record_parser.add_argument("--latency", type=float, default=0.1, metavar="SECONDS",
+                               help="Latency of the ideal follower driving the robot")
+
+    sweep_parser = subparsers.add_parser("sweep", help="Tracking error versus latency and frame rate, in simulated time")
+    sweep_parser.add_argument("--latencies", type=float, nargs="+", default=[0, 50, 100, 200, 400], metavar="MS")
+    sweep_parser.add_argument("--fps", type=float, nargs="+", default=[5, 10, 20, 30])
+    sweep_parser.add_argument("--follower", default="ideal",
+                              help='"ideal" (exact box) or a follower name of pareto_benchmark.py')
+    sweep_parser.add_argument("--policy", choices=["latest", "queue"], default="latest",
+                              help="The client takes the newest frame, or every frame in order")
+    sweep_parser.add_argument("--pixel-noise", type=float, default=0.0, help="Box noise of the ideal follower (pixels)")
+    sweep_parser.add_argument("--seeds", type=int, default=3, help="Number of target paths averaged")
+
+    for sub in (serve_parser, sweep_parser, record_parser):
+        sub.add_argument("--duration", type=float, default=60.0, help="Simulated seconds")
+        sub.add_argument("--target-speed", type=float, default=1.0, help="Walking speed of the target (m/s)")
+        sub.add_argument("--distractors", type=int, default=0, help="Other people walking around")
+    for sub in (serve_parser, record_parser):
+        sub.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.mode == "serve":
+        serve(args.port, args.fps, args.duration, args.realtime, args.extra_latency, args.seed,
+              args.target_speed, args.distractors, record=args.record)
+    elif args.mode == "record":
+        result = run_closed_loop(args.fps, args.latency, args.duration, seed=args.seed,
+                                 target_speed=args.target_speed, distractors=args.distractors, record=args.path)
+        print(f"Recorded {args.path}: {format_result(result)}")
+    else:
+        sweep(args.latencies, args.fps, args.duration, args.follower, args.policy, args.pixel_noise,
+              tuple(range(args.seeds)), args.target_speed, args.distractors)
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import cv2
 import numpy as np
 from ultralytics import YOLO
+from frame_decoder import decode_image
+from control_geometry import follower_geometry
 
 def green_ratio(roi):
     """Returnează procentul de pixeli verzi în ROI."""
@@ -21,10 +23,12 @@ class ColorFollowerYoloV8:
         self.left_bound, self.right_bound = left_bound, right_bound
         self.prev_bbox = None
         self.green_threshold = green_threshold
+        self.target_box = None
         print("YOLO + ColorFollower inițializat.")
 
     def processImage(self, image_data):
-        img = cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        img = decode_image(image_data)
+        self.target_box = None
         if img is None:
             return "None|None"
         vis = img.copy(); H, W, _ = img.shape
@@ -61,23 +65,13 @@ class ColorFollowerYoloV8:
 
         # 5) Comandă PID
         cmd = self.check_bounds(vis, W, H, x1, y1, w, h)
+        self.target_box = (x1, y1, w, h)
         cv2.imshow("Follower", vis)
         return cmd
 
     def check_bounds(self, img, W, H, x, y, w, h):
-        return f"{self.check_horizontal(img,W,H,x,w)}|{self.check_vertical(img,W,H,y)}"
-
-    def check_horizontal(self, img, W, H, x, w):
-        lb = int(W*self.left_bound); rb = int(W*self.right_bound)
-        cv2.line(img,(lb,0),(lb,H),(255,120,0),2)
-        cv2.line(img,(rb,0),(rb,H),(0,120,255),2)
-        desired=(lb+rb)//2; current=x+w//2
-        return f"distance#{desired-current}"
-
-    def check_vertical(self, img, W, H, y):
-        min_y=(H-int(H*self.min_bound))//2
-        max_y=(H-int(H*self.max_bound))//2
-        cv2.line(img,(0,min_y),(W,min_y),(0,255,255),2)
-        cv2.line(img,(0,max_y),(W,max_y),(0,0,255),2)
-        desired=(min_y+max_y)//2
-        return f"distance#{desired-y}"
+        # Geometria benzilor e comuna tuturor followerilor (control_geometry); img None = fara desen
+        geometry = follower_geometry(self, W, H)
+        if img is not None:
+            geometry.draw(img)
+        return geometry.command(x, y, w, h)
@@ -1,16 +1,25 @@
 import cv2
 import numpy as np
-from ultralytics import YOLO
+from frame_buffers import shared_buffers
+from frame_decoder import decode_image
+from control_geometry import follower_geometry
 
-def green_ratio(roi):
+# Interval HSV pentru verde
+GREEN_LOWER = np.array([40, 50, 50])
+GREEN_UPPER = np.array([80, 255, 255])
+
+def green_ratio(roi, buffers=None):
     """Returneaza procentul de pixeli verzi in ROI (Region of Interest).
-    (ROI este o portiune a imaginii care contine o persoana detectata.)"""
+    (ROI este o portiune a imaginii care contine o persoana detectata.)
+    Cu buffers (FrameBuffers), HSV-ul si masca sunt scrise in buffere refolosite."""
     # folosesc HSV pentru ca separa mai bine nunanta verde de variatiile de lumina si intensitate spre deosebire de RGB
-    hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV) 
-    # Interval HSV pentru verde 
-    lower = np.array([40, 50, 50])
-    upper = np.array([80, 255, 255])
-    mask = cv2.inRange(hsv, lower, upper) # o imagine monocromatica cu 1 pentru verde si 0 pentru restul
+    if buffers is None:
+        hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
+        mask = cv2.inRange(hsv, GREEN_LOWER, GREEN_UPPER) # o imagine monocromatica cu 1 pentru verde si 0 pentru restul
+    else:
+        h, w = roi.shape[:2]
+        hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV, dst=buffers.scratch("hsv", (h, w, 3)))
+        mask = cv2.inRange(hsv, GREEN_LOWER, GREEN_UPPER, dst=buffers.scratch("mask", (h, w)))
     
     return mask.sum() / (mask.size + 1e-6) # evit diviziunea la 0
 
@@ -25,8 +34,15 @@ class ColorFollowerSmooth:
                  max_bound=0.8, # are inaltimea 80% din imagine
                  left_bound=0.4,
                  right_bound=0.6,
-                 green_threshold=0.2): # valoare mai mica -> mai tolerant; valoare mai mare -> necesita o suprafata mai consistenta de verde
-        self.model = YOLO(model_path)
+                 green_threshold=0.2, # valoare mai mica -> mai tolerant; valoare mai mare -> necesita o suprafata mai consistenta de verde
+                 input_policy=None, # optional AdaptiveInputSize: dimensiunea intrarii / tile-uri in functie de tinta
+                 buffers=None, # FrameBuffers pentru array-urile refolosite de la un cadru la altul
+                 model=None): # model YOLO deja incarcat (sau un inlocuitor cu aceeasi interfata, ex. in teste)
+        if model is None:
+            # Import aici: green_ratio si buffer-ele se pot folosi (si testa) fara ultralytics
+            from ultralytics import YOLO
+            model = YOLO(model_path)
+        self.model = model
         self.min_bound = min_bound
         self.max_bound = max_bound
         self.left_bound = left_bound
@@ -34,26 +50,36 @@ class ColorFollowerSmooth:
         self.green_threshold = green_threshold
         # Bounding-box precedent cu verde
         self.prev_bbox = None
+        self.input_policy = input_policy
+        self.buffers = buffers or shared_buffers
+        self.input_size = 640
+        # Cutia urmarita in ultimul cadru (x, y, w, h), sau None
+        self.target_box = None
         print("YOLO + ColorFollowerSmooth inițializat.")
 
     def processImage(self, image_data: bytes) -> str:
         print("Model YOLO încărcat:")
         print(self.model.yaml.get('version'))
         # Decodare JPEG in matrice BGR
-        img = cv2.imdecode(
-            np.frombuffer(image_data, dtype=np.uint8),
-            cv2.IMREAD_COLOR
-        )
+        img = decode_image(image_data)
+        self.target_box = None
         if img is None:
             return "None|None"
-        vis = img.copy() # pentru vizualizare, desenez bounding box uri, text, etc
+        vis = self.buffers.copy("vis", img) # pentru vizualizare, desenez bounding box uri, text, etc
         H, W, _ = img.shape
 
         # 1) Detectie YOLO de persoane
         # face predictia, pentru clasa 0 care reprezinta clasa person
         # intoarce o lista de obiecte Results, dar eu trimit o singura imagine. Deci lista va avea un singur element
-        res = self.model(img, classes=[0], verbose=False)[0]
-        if not res.boxes:
+        if self.input_policy is not None:
+            boxes, _ = self.input_policy.detect(self, img)
+            xyxy = np.array([[x, y, x + w, y + h] for (x, y, w, h) in boxes], dtype=int).reshape(-1, 4)
+        else:
+            res = self.model(img, classes=[0], imgsz=self.input_size, verbose=False)[0]
+            xyxy = res.boxes.xyxy.cpu().numpy().astype(int) # coordonate (x1, y1, x2, y2) pentru fiecare box
+
+        if len(xyxy) == 0:
+            self.update_policy(None)
             # Fara cutii YOLO: daca avem prev_bbox, continuam; altfel neutr.
             if self.prev_bbox is None:
                 cv2.imshow("Follower", vis)
@@ -61,25 +87,16 @@ class ColorFollowerSmooth:
             else:
                 best_box = self.prev_bbox
         else:
-            # 2) Calcul green_ratio pentru fiecare box
-            xyxy = res.boxes.xyxy.cpu().numpy().astype(int) # coordonate (x1, y1, x2, y2) pentru fiecare box
-            best_ratio = 0.0
-            best_box = None
-            for (x1, y1, x2, y2) in xyxy:
-                # Crop ROI valid
-                x1_, y1_ = max(x1, 0), max(y1, 0)
-                x2_, y2_ = min(x2, W), min(y2, H)
-                roi = img[y1_:y2_, x1_:x2_]
-                ratio = green_ratio(roi)
-                if ratio > best_ratio:
-                    best_ratio = ratio
-                    best_box = (x1_, y1_, x2_, y2_)
+            # 2) Scor pentru fiecare box (green_ratio)
+            best_box, best_score = self.select_box(img, xyxy)
 
-            # 3) Smoothing: daca nu gasim verde, folosim prev_bbox
-            if best_box is not None and best_ratio >= self.green_threshold:
+            # 3) Smoothing: daca nu gasim tinta, folosim prev_bbox
+            if best_box is not None and best_score >= self.score_threshold():
                 # validam si actualizam prev_bbox
                 self.prev_bbox = best_box
+                self.update_policy(best_box)
             else:
+                self.update_policy(None)
                 if self.prev_bbox is None:
                     # nici cutie precedentă, nor nici verde
                     cv2.imshow("Follower", vis)
@@ -101,27 +118,64 @@ class ColorFollowerSmooth:
 
         # 5) Calculul distantei (dx|dy)
         command = self.check_bounds(vis, W, H, x1, y1, w, h)
+        self.target_box = (x1, y1, w, h)
         cv2.imshow("Follower", vis)
         return command
 
-    def check_bounds(self, img, W, H, x, y, w, h) -> str:
-        h_cmd = self.check_horizontal(img, W, H, x, w)
-        v_cmd = self.check_vertical(img, W, H, y)
-        return f"{h_cmd}|{v_cmd}"
+    def detect(self, images, input_size=640, conf_threshold=0.25):
+        """
+        Detectie YOLO pe un lot de imagini (folosita de AdaptiveInputSize).
+        Intoarce, pentru fiecare imagine, (boxes, confidences) cu boxe [x, y, w, h].
+        """
+        results = self.model(images, classes=[0], imgsz=input_size, conf=conf_threshold, verbose=False)
+        detections = []
+        for result in results:
+            xyxy = result.boxes.xyxy.cpu().numpy().astype(int)
+            boxes = [[x1, y1, x2 - x1, y2 - y1] for (x1, y1, x2, y2) in xyxy.tolist()]
+            detections.append((boxes, result.boxes.conf.cpu().numpy().tolist()))
+        return detections
 
-    def check_horizontal(self, img, W, H, x, w) -> str:
-        lb = int(W * self.left_bound)
-        rb = int(W * self.right_bound)
-        cv2.line(img, (lb, 0), (lb, H), (255, 120, 0), 2)
-        cv2.line(img, (rb, 0), (rb, H), (0, 120, 255), 2)
-        desired = (lb + rb) // 2
-        current = x + w // 2
-        return f"distance#{desired - current}"
+    def update_policy(self, box):
+        """Transmite politicii de intrare cutia (x1, y1, x2, y2) a tintei, sau None daca e pierduta."""
+        if self.input_policy is None:
+            return
+        if box is None:
+            self.input_policy.update(None)
+        else:
+            x1, y1, x2, y2 = box
+            self.input_policy.update((x1, y1, x2 - x1, y2 - y1))
+
+    def clip_boxes(self, xyxy, W, H):
+        """Limiteaza cutiile (N, 4) la marginile imaginii."""
+        clipped = self.buffers.scratch("boxes", xyxy.shape, xyxy.dtype)
+        np.clip(xyxy[:, 0::2], 0, W, out=clipped[:, 0::2])
+        np.clip(xyxy[:, 1::2], 0, H, out=clipped[:, 1::2])
+        return clipped
+
+    def select_box(self, img, xyxy):
+        """
+        Alege cutia cu cel mai mare green_ratio.
+        Intoarce (best_box, best_score); best_box e None daca nu exista candidati.
+        Subclasele pot suprascrie aceasta metoda pentru alt tip de scor.
+        """
+        H, W = img.shape[:2]
+        best_score = 0.0
+        best_box = None
+        for (x1, y1, x2, y2) in self.clip_boxes(xyxy, W, H):
+            roi = img[y1:y2, x1:x2]
+            ratio = green_ratio(roi, self.buffers)
+            if ratio > best_score:
+                best_score = ratio
+                best_box = (x1, y1, x2, y2)
+        return best_box, best_score
 
-    def check_vertical(self, img, W, H, y) -> str:
-        min_y = (H - int(H * self.min_bound)) // 2
-        max_y = (H - int(H * self.max_bound)) // 2
-        cv2.line(img, (0, min_y), (W, min_y), (0, 255, 255), 2)
-        cv2.line(img, (0, max_y), (W, max_y), (0, 0, 255), 2)
-        desired = (min_y + max_y) // 2
-        return f"distance#{desired - y}"
+    def score_threshold(self) -> float:
+        """Scorul minim pentru a accepta cutia aleasa de select_box."""
+        return self.green_threshold
+
+    def check_bounds(self, img, W, H, x, y, w, h) -> str:
+        # Geometria benzilor e comuna tuturor followerilor (control_geometry); img None = fara desen
+        geometry = follower_geometry(self, W, H)
+        if img is not None:
+            geometry.draw(img)
+        return geometry.command(x, y, w, h)
@@ -0,0 +1,112 @@
+import struct
+import threading
+import time
+from collections import deque
+import numpy as np
+from telemetry import parse_command
+
+def format_command(dx, dy):
+    """Build a "distance#X|distance#Y" command, "None" for a missing distance."""
+    horizontal = "None" if dx is None else f"distance#{int(round(dx))}"
+    vertical = "None" if dy is None else f"distance#{int(round(dy))}"
+    return f"{horizontal}|{vertical}"
+
+class CommandScheduler:
+    """
+    Sends the commands to the simulator at a fixed rate, on its own thread,
+    from the latest target state reported by the detection loop.
+
+    Detection then runs as fast as it can and only calls update(); the robot's
+    PID receives evenly spaced commands whatever the inference time. Between
+    two detections the distances are either held or extrapolated with the
+    velocity measured between the last two detections (for at most
+    `max_prediction` seconds). When no detection arrived for `max_age`
+    seconds, "None|None" is sent so the robot stops.
+    """
+    def __init__(self, sock, rate=20.0, predict=True, max_prediction=0.2, max_age=0.5):
+        """
+        Args:
+            sock: Connected socket of the simulator
+            rate: Commands sent per second
+            predict: Extrapolate the distances between detections instead of holding them
+            max_prediction: Longest extrapolation in seconds
+            max_age: Seconds without a detection before the command becomes "None|None"
+        """
+        self.sock = sock
+        self.period = 1.0 / rate
+        self.predict = predict
+        self.max_prediction = max_prediction
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        # (time, dx, dy) of the last two detections
+        self.last = None
+        self.previous = None
+        self.running = False
+        self.thread = None
+        self.closed = False
+        self.sent = 0
+        # Send times of the last commands, for the rate and jitter report
+        self.send_times = deque(maxlen=1200)
+
+    def update(self, command, timestamp=None):
+        """Report the command computed from a frame (timestamp: when the frame was received)."""
+        dx, dy = parse_command(command)
+        observation = (timestamp if timestamp is not None else time.perf_counter(), dx, dy)
+        with self.lock:
+            self.previous, self.last = self.last, observation
+
+    def current_command(self, now):
+        """The command to send at time `now` (perf_counter seconds)."""
+        with self.lock:
+            last, previous = self.last, self.previous
+        if last is None or now - last[0] > self.max_age:
+            return "None|None"
+        t, dx, dy = last
+        if self.predict and previous is not None and t > previous[0]:
+            horizon = min(now - t, self.max_prediction)
+            elapsed = t - previous[0]
+            if dx is not None and previous[1] is not None:
+                dx += (dx - previous[1]) / elapsed * horizon
+            if dy is not None and previous[2] is not None:
+                dy += (dy - previous[2]) / elapsed * horizon
+        return format_command(dx, dy)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        next_tick = time.perf_counter()
+        while self.running:
+            now = time.perf_counter()
+            command = self.current_command(now).encode("utf-8")
+            try:
+                self.sock.sendall(struct.pack("I", len(command)) + command)
+            except OSError:
+                self.closed = True
+                break
+            self.sent += 1
+            self.send_times.append(now)
+            # Absolute schedule, so the rate does not drift with the send time
+            next_tick += self.period
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.perf_counter()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+
+    def report(self):
+        """Command rate and interval jitter of the last commands sent."""
+        if len(self.send_times) < 2:
+            return f"Command scheduler: {self.sent} commands sent"
+        intervals = np.diff(np.array(self.send_times)) * 1000
+        return (f"Command scheduler: {self.sent} commands, "
+                f"{1000 / intervals.mean():.1f} Hz (interval {intervals.mean():.1f} ms, "
+                f"jitter {intervals.std():.2f} ms, max {intervals.max():.1f} ms)")
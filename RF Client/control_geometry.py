@@ -0,0 +1,90 @@
+from functools import lru_cache
+import cv2
+import numpy as np
+
+# Drawing of the bound lines, turned off when nothing is displayed (main.py --headless)
+drawing_enabled = True
+
+class ControlGeometry:
+    """
+    Pixel positions of the bounds for one resolution, and the command
+    computation shared by all the followers.
+
+    The horizontal error is the distance between the middle of the left and
+    right bounds and the center of the box; the vertical error is the distance
+    between the middle of the min and max bound lines and the top of the box.
+    Everything is rounded like the original check_bounds methods (int()
+    truncation), so the commands are the same.
+    """
+    def __init__(self, width, height, min_bound, max_bound, left_bound, right_bound):
+        """
+        Args:
+            width: The width of the image
+            height: The height of the image
+            min_bound: Minimum bound as a percentage of image size (0.0 to 1.0)
+            max_bound: Maximum bound as a percentage of image size (0.0 to 1.0)
+            left_bound: Left bound as a percentage of image width (0.0 to 1.0)
+            right_bound: Right bound as a percentage of image width (0.0 to 1.0)
+        """
+        self.width = width
+        self.height = height
+        self.left_x = int(width * left_bound)
+        self.right_x = int(width * right_bound)
+        self.min_y = int((height - int(height * min_bound)) / 2)
+        self.max_y = int((height - int(height * max_bound)) / 2)
+        self.desired_x = int((self.left_x + self.right_x) / 2)
+        self.desired_y = int((self.min_y + self.max_y) / 2)
+
+    def command(self, x, y, w, h):
+        """The "distance#X|distance#Y" command for one [x, y, w, h] box."""
+        return f"distance#{self.desired_x - (x + int(w / 2))}|distance#{self.desired_y - y}"
+
+    def errors(self, boxes):
+        """
+        Horizontal and vertical errors of many boxes in one call.
+
+        Args:
+            boxes: (N, 4) array or list of [x, y, w, h] boxes
+
+        Returns:
+            (N, 2) int64 array of (horizontal, vertical) errors in pixels
+        """
+        boxes = np.asarray(boxes).reshape(-1, 4)
+        # astype truncates toward zero like int()
+        x = boxes[:, 0].astype(np.int64)
+        y = boxes[:, 1].astype(np.int64)
+        center = x + (boxes[:, 2] / 2).astype(np.int64)
+        return np.stack((self.desired_x - center, self.desired_y - y), axis=1)
+
+    def commands(self, boxes):
+        """The commands of many boxes (e.g. every tracked person, or one box per stream)."""
+        return [f"distance#{dx}|distance#{dy}" for dx, dy in self.errors(boxes).tolist()]
+
+    def draw(self, image, target_y=None, vertical_bounds=True):
+        """
+        Draw the bound lines on the image (optional, does not change the commands).
+
+        Args:
+            image: The image to draw on
+            target_y: Top of the target box, drawn as a line if given
+            vertical_bounds: Draw the min and max bound lines
+        """
+        if not drawing_enabled:
+            return
+        cv2.line(image, (self.left_x, 0), (self.left_x, self.height), (255, 120, 0), 2)
+        cv2.line(image, (self.right_x, 0), (self.right_x, self.height), (0, 120, 255), 2)
+        if vertical_bounds:
+            cv2.line(image, (0, self.min_y), (self.width, self.min_y), (0, 255, 255), 2)
+            cv2.line(image, (0, self.max_y), (self.width, self.max_y), (0, 0, 255), 2)
+        if target_y is not None:
+            cv2.line(image, (0, target_y), (self.width, target_y), (255, 0, 0), 2)
+
+@lru_cache(maxsize=64)
+def control_geometry(width, height, min_bound, max_bound, left_bound, right_bound):
+    """The shared ControlGeometry of a resolution and bounds (computed once)."""
+    return ControlGeometry(width, height, min_bound, max_bound, left_bound, right_bound)
+
+def follower_geometry(follower, width, height):
+    """The ControlGeometry of a follower's bounds at this resolution."""
+    return control_geometry(width, height, follower.min_bound, follower.max_bound,
+                            follower.left_bound, follower.right_bound)
@@ -2,6 +2,8 @@ import cv2
 import numpy as np
 from ultralytics import YOLO
 from deep_sort_realtime.deepsort_tracker import DeepSort
+from frame_decoder import decode_image
+from control_geometry import follower_geometry
 
 class DeepSortFollower:
     """
@@ -13,12 +15,15 @@ class DeepSortFollower:
                  min_bound=0.5,
                  max_bound=0.8,
                  left_bound=0.4,
-                 right_bound=0.6):
+                 right_bound=0.6,
+                 max_age=30,
+                 nn_budget=70,
+                 multi_target=False): # True: deseneaza toate persoanele urmarite, nu doar pana la tinta
         # Încarcă YOLOv8
         self.model = YOLO(model_path)
         # Initializează DeepSORT (folosește re-ID model intern)
-        self.tracker = DeepSort(max_age=30,
-                                nn_budget=70,
+        self.tracker = DeepSort(max_age=max_age,
+                                nn_budget=nn_budget,
                                 embedder="mobilenet",  # mobilenet sau tf_efficientnet_lite
                                 half=False,
                                 nms_max_overlap=1.0)
@@ -27,11 +32,15 @@ class DeepSortFollower:
         self.left_bound, self.right_bound = left_bound, right_bound
         # ID-ul track-ului țintă
         self.target_track_id = None
+        self.multi_target = multi_target
+        # Cutia țintei în ultimul cadru (x, y, w, h), sau None
+        self.target_box = None
         print("YOLOv8 + DeepSORT inițializat cu succes.")
 
     def processImage(self, image_data: bytes) -> str:
         # Decode JPEG în BGR
-        img = cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        img = decode_image(image_data)
+        self.target_box = None
         if img is None:
             return "None|None"
         vis = img.copy()
@@ -51,52 +60,37 @@ class DeepSortFollower:
         tracks = self.tracker.update_tracks(dets, frame=img)
 
         command = "None|None"
-        # 3) ia fiecare track activ
-        for track in tracks:
-            if not track.is_confirmed():
-                continue
-            tid = track.track_id
-            x1,y1,w,h = track.to_ltwh()    # left, top, width, height
-            x1, y1, w, h = int(x1), int(y1), int(w), int(h)
-            x2, y2 = x1+w, y1+h
+        # 3) indexăm track-urile confirmate după ID, ca ținta să fie găsită în O(1)
+        confirmed = {track.track_id: track for track in tracks if track.is_confirmed()}
 
-            # Desenează cutia și ID-ul
-            cv2.rectangle(vis, (x1,y1), (x2,y2), (0,255,0), 2)
+        # 4) la prima detecție salvează-ţi propriul ID
+        if self.target_track_id is None and confirmed:
+            self.target_track_id = next(iter(confirmed))
+            print(f"[INFO] Ținta ta are now track ID: {self.target_track_id}")
+
+        # Desenează cutiile și ID-urile (cu multi_target ale tuturor persoanelor)
+        for tid, track in confirmed.items():
+            x1, y1, w, h = (int(v) for v in track.to_ltwh())    # left, top, width, height
+            cv2.rectangle(vis, (x1,y1), (x1+w,y1+h), (0,255,0), 2)
             cv2.putText(vis, f"ID {tid}", (x1, y1-10),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0), 2)
+            if not self.multi_target and tid == self.target_track_id:
+                break  # ca inainte: nu ne intereseaza celelalte track-uri
 
-            # 4) la prima detecție salvează-ţi propriul ID
-            if self.target_track_id is None:
-                self.target_track_id = tid
-                print(f"[INFO] Ținta ta are now track ID: {tid}")
-
-            # 5) dacă e track-ul tău, calculează comanda
-            if tid == self.target_track_id:
-                command = self.check_bounds(vis, W, H, x1, y1, w, h)
-                break  # nu ne interesează celelalte track-uri
+        # 5) dacă track-ul tău e prezent, calculează comanda
+        target = confirmed.get(self.target_track_id)
+        if target is not None:
+            x1, y1, w, h = (int(v) for v in target.to_ltwh())
+            command = self.check_bounds(vis, W, H, x1, y1, w, h)
+            self.target_box = (x1, y1, w, h)
 
         # 6) afișăm și trimitem comanda
         cv2.imshow("YOLOv8 + DeepSORT", vis)
         return command
 
     def check_bounds(self, img, W, H, x, y, w, h) -> str:
-        h_cmd = self.check_horizontal(img, W, H, x, w)
-        v_cmd = self.check_vertical(img, W, H, y)
-        return f"{h_cmd}|{v_cmd}"
-
-    def check_horizontal(self, img, W, H, x, w) -> str:
-        lb = int(W * self.left_bound)
-        rb = int(W * self.right_bound)
-        cv2.line(img, (lb,0), (lb,H), (255,120,0), 2)
-        cv2.line(img, (rb,0), (rb,H), (0,120,255), 2)
-        desired = (lb+rb)//2
-        current = x + w//2
-        return f"distance#{desired-current}"
-
-    def check_vertical(self, img, W, H, y) -> str:
-        min_y = (H - int(H*self.min_bound))//2
-        max_y = (H - int(H*self.max_bound))//2
-        cv2.line(img, (0,min_y), (W,min_y), (0,255,255), 2)
-        cv2.line(img, (0,max_y), (W,max_y), (0,0,255), 2)
-        desired = (min_y+max_y)//2
-        return f"distance#{desired-y}"
+        # Geometria benzilor e comuna tuturor followerilor (control_geometry); img None = fara desen
+        geometry = follower_geometry(self, W, H)
+        if img is not None:
+            geometry.draw(img)
+        return geometry.command(x, y, w, h)
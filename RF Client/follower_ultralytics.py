@@ -2,6 +2,8 @@ import cv2
 import numpy as np
 # Importăm clasa YOLO din biblioteca ultralytics
 from ultralytics import YOLO
+from frame_decoder import decode_image
+from control_geometry import follower_geometry
 
 class BoundedFollowerYoloV8():
     """
@@ -13,7 +15,8 @@ class BoundedFollowerYoloV8():
                  min_bound=0.5,
                  max_bound=0.8,
                  left_bound=0.4,
-                 right_bound=0.6):
+                 right_bound=0.6,
+                 input_policy=None):
         """
         Inițializează detectorul YOLOv11.
         Biblioteca ultralytics va descărca automat 'yolo11n.pt' la prima rulare.
@@ -26,6 +29,12 @@ class BoundedFollowerYoloV8():
         self.max_bound = max_bound
         self.left_bound = left_bound
         self.right_bound = right_bound
+        # Politică opțională de dimensiune a intrării (AdaptiveInputSize.for_ultralytics())
+        self.input_policy = input_policy
+        self.input_size = 640
+        # Cutia urmărită în ultimul cadru (x, y, w, h), sau None
+        self.target_box = None
+        self.target_confidence = None
         
         print("Modelul YOLOv8 a fost încărcat cu succes.")
 
@@ -34,8 +43,10 @@ class BoundedFollowerYoloV8():
         Procesează imaginea, detectează persoane și returnează o comandă.
         """
         # Decodează datele imaginii primite de la server
-        image = cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        image = decode_image(image_data)
         
+        self.target_box = None
+        self.target_confidence = None
         if image is None:
             return "None|None" # Returnează o comandă neutră în caz de eroare
 
@@ -43,25 +54,23 @@ class BoundedFollowerYoloV8():
         result_image = image.copy()
         height, width, _ = result_image.shape
 
-        # 2. Rularea detecției - o singură linie de cod!
-        # 'classes=[0]' -> îi spunem să caute DOAR persoane (clasa 0 în COCO)
-        # 'verbose=False' -> nu afișează informații de debug în consolă
-        results = self.model(image, classes=[0], verbose=False)
+        # 2. Rularea detecției
+        # Fără politică: întreaga imagine la 640 px (ca înainte); cu politică:
+        # intrare mică/mare, decupaj în jurul țintei sau tile-uri, după caz
+        if self.input_policy is not None:
+            boxes, confidences = self.input_policy.detect(self, image)
+        else:
+            boxes, confidences = self.detect([image], input_size=self.input_size)[0]
 
         command = "None|None"
+        target_box = None
 
-        # 3. Procesarea rezultatelor - mult mai simplu!
-        # Rezultatele sunt deja filtrate și sortate
-        if results and len(results[0].boxes) > 0:
+        # 3. Procesarea rezultatelor - sunt deja filtrate și sortate după încredere
+        if boxes:
             # Luăm prima persoană detectată (cea cu cea mai mare încredere)
-            box = results[0].boxes[0]
-            
-            # Extragem coordonatele (x1, y1, x2, y2)
-            x1, y1, x2, y2 = [int(coord) for coord in box.xyxy[0]]
-            w, h = x2 - x1, y2 - y1
-            
-            # Extragem încrederea
-            confidence = box.conf[0]
+            x1, y1, w, h = boxes[0]
+            x2, y2 = x1 + w, y1 + h
+            confidence = confidences[0]
             
             # --- Vizualizare (Desenare pe imagine) ---
             # Desenează chenarul în jurul persoanei
@@ -73,50 +82,38 @@ class BoundedFollowerYoloV8():
             
             # Generează comanda bazată pe poziția persoanei
             command = self.check_bounds(result_image, width, height, x1, y1, w, h)
+            target_box = (x1, y1, w, h)
+            self.target_confidence = confidence
+
+        self.target_box = target_box
+        if self.input_policy is not None:
+            self.input_policy.update(target_box)
         
         # Afișează imaginea rezultată
         cv2.imshow("YOLOv8 Follower", result_image)
         
         return command
 
-    def check_bounds(self, result_image, width, height, x, y, w, h):
+    def detect(self, images, input_size=640, conf_threshold=0.25):
         """
-        Combină comenzile orizontale și verticale.
+        Rulează detecția pe un lot de imagini (o singură trecere prin rețea).
+        Întoarce, pentru fiecare imagine, (boxes, confidences) cu boxele
+        [x, y, w, h] în coordonatele imaginii, ordonate după încredere.
         """
-        horizontal_command = self.check_horizontal_bounds(result_image, width, height, x, w)
-        vertical_command = self.check_vertical_bounds(result_image, width, height, y)
-        return f"{horizontal_command}|{vertical_command}"
+        results = self.model(images, classes=[0], imgsz=input_size, conf=conf_threshold, verbose=False)
+        detections = []
+        for result in results:
+            xyxy = result.boxes.xyxy.cpu().numpy().astype(int)
+            boxes = [[x1, y1, x2 - x1, y2 - y1] for (x1, y1, x2, y2) in xyxy.tolist()]
+            detections.append((boxes, result.boxes.conf.cpu().numpy().tolist()))
+        return detections
 
-    def check_horizontal_bounds(self, result_image, width, height, x, w):
-        """
-        Calculează comanda de mișcare orizontală ('stânga'/'dreapta').
-        (Acest cod este identic cu cel original, deoarece logica de control nu s-a schimbat)
-        """
-        left_bound_x = int(width * self.left_bound)
-        right_bound_x = int(width * self.right_bound)
-        
-        cv2.line(result_image, (left_bound_x, 0), (left_bound_x, height), (255, 120, 0), 2)
-        cv2.line(result_image, (right_bound_x, 0), (right_bound_x, height), (0, 120, 255), 2)
- 
-        desired_position = int((left_bound_x + right_bound_x) / 2)
-        current_position = x + int(w / 2)
-        
-        return f"distance#{desired_position - current_position}"
-
-    def check_vertical_bounds(self, result_image, width, height, y):
+    def check_bounds(self, result_image, width, height, x, y, w, h):
         """
-        Calculează comanda de mișcare verticală ('înainte'/'înapoi').
-        (Acest cod este identic cu cel original)
+        Combină comenzile orizontale și verticale (geometria comună din control_geometry).
+        Cu result_image None, liniile nu mai sunt desenate.
         """
-        min_rect_height = int(height * self.min_bound)
-        min_rect_y = int((height - min_rect_height) / 2)
-        cv2.line(result_image, (0, min_rect_y), (width, min_rect_y), (0, 255, 255), 2)
-        
-        max_rect_height = int(height * self.max_bound)
-        max_rect_y = int((height - max_rect_height) / 2)
-        cv2.line(result_image, (0, max_rect_y), (width, max_rect_y), (0, 0, 255), 2)
-
-        desired_position = int((min_rect_y + max_rect_y) / 2)
-        current_position = y
-        
-        return f"distance#{desired_position - current_position}"
\ No newline at end of file
+        geometry = follower_geometry(self, width, height)
+        if result_image is not None:
+            geometry.draw(result_image)
+        return geometry.command(x, y, w, h)
@@ -0,0 +1,174 @@
+import socket
+import tracemalloc
+import cv2
+import numpy as np
+
+class FrameBuffers:
+    """
+    Preallocated arrays reused from one frame to the next.
+
+    The client loop and the followers take their working arrays from here
+    (receive buffer, drawing copy, network blob, HSV and mask scratch, box
+    arrays) and pass them to cv2 through the dst= parameters, so after the
+    first frames of a given resolution the loop no longer allocates large
+    arrays. The only exception is cv2.imdecode, whose Python binding cannot
+    decode into an existing array.
+
+    The buffers are overwritten by the next frame: a result that must outlive
+    the frame has to be copied. A single arena must not be shared by followers
+    running in different threads.
+    """
+    def __init__(self):
+        self.buffers = {}
+
+    def get(self, name, shape, dtype=np.uint8):
+        """Return the buffer with this name, shape and dtype (contents undefined)."""
+        key = (name, tuple(shape), np.dtype(dtype))
+        buffer = self.buffers.get(key)
+        if buffer is None:
+            buffer = self.buffers[key] = np.empty(shape, dtype)
+        return buffer
+
+    def scratch(self, name, shape, dtype=np.uint8):
+        """
+        Return a contiguous array of the given shape backed by a growable buffer.
+        Used for arrays whose size changes every frame (e.g. one per detected box).
+        """
+        size = int(np.prod(shape))
+        key = (name, np.dtype(dtype))
+        buffer = self.buffers.get(key)
+        if buffer is None or buffer.size < size:
+            buffer = self.buffers[key] = np.empty(size, dtype)
+        return buffer[:size].reshape(shape)
+
+    def copy(self, name, image):
+        """Copy the image into the buffer with this name and return it."""
+        buffer = self.get(name, image.shape, image.dtype)
+        np.copyto(buffer, image)
+        return buffer
+
+    def blob(self, images, size, scale=1/255.0, swap_rb=True):
+        """
+        Equivalent of cv2.dnn.blobFromImages(images, scale, (size, size), swapRB=swap_rb, crop=False)
+        written into a reused (N, 3, size, size) float32 buffer.
+        """
+        blob = self.get("blob", (len(images), 3, size, size), np.float32)
+        resized = self.get("blob_resized", (size, size, 3))
+        for n, image in enumerate(images):
+            cv2.resize(image, (size, size), dst=resized)
+            channels = resized[:, :, ::-1] if swap_rb else resized
+            np.multiply(channels.transpose(2, 0, 1), np.float32(scale), out=blob[n], dtype=np.float32)
+        return blob
+
+    def receive(self, sock, size):
+        """
+        Read exactly `size` bytes from the socket into a reused buffer.
+
+        Returns:
+            A uint8 numpy view of the received bytes, or None if the connection closed.
+        """
+        buffer = self.scratch("receive", (size,))
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            count = sock.recv_into(view[received:], size - received)
+            if count == 0:
+                return None
+            received += count
+        return buffer
+
+# Arena shared by main.py and the followers of the main thread
+shared_buffers = FrameBuffers()
+
+def steady_state_allocations(process, frames=20, warmup=5):
+    """
+    Run `process()` `warmup` times, then measure the allocations of the next `frames` calls.
+
+    tracemalloc sees the Python objects and the numpy arrays, including the
+    arrays that cv2 returns. It does not see OpenCV's native allocations (the
+    temporary cv::Mat inside a function, the DNN's internal blobs and layer
+    outputs), so a flat result shows that the loop creates no large Python or
+    numpy arrays, not that OpenCV itself allocates nothing.
+
+    Returns:
+        tuple: (largest per-frame peak of transient allocations, growth of the
+                retained memory over all the frames), in bytes
+    """
+    for _ in range(warmup):
+        process()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    largest_peak = 0
+    for _ in range(frames):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        process()
+        largest_peak = max(largest_peak, tracemalloc.get_traced_memory()[1] - before)
+    growth = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    return largest_peak, growth
+
+def buffer_paths_allocations(size=1024, frames=20, warmup=5):
+    """
+    Steady-state allocations of the buffer paths that need no model weights, on
+    synthetic frames: receive() from a socket, green_ratio() with dst= buffers on
+    a person-sized ROI, and blob(). The frame is decoded once beforehand, since
+    the JPEG decode is the known exception.
+
+    Returns:
+        tuple: (largest per-frame peak, retained growth) in bytes, see steady_state_allocations()
+    """
+    from color_follower_smooth import green_ratio
+
+    buffers = FrameBuffers()
+    y, x = np.mgrid[0:size, 0:size]
+    frame = np.dstack((x % 256, y % 256, (x + y) % 256)).astype(np.uint8)
+    frame[size // 4:size * 3 // 4, size // 4:size * 3 // 4] = (40, 180, 40)
+    image_data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 75])[1].tobytes()
+    image = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_COLOR)
+    roi = image[size // 4:size * 3 // 4, size // 4:size * 3 // 4]
+    sender, receiver = socket.socketpair()
+    sender.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 2 * len(image_data))
+    receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 2 * len(image_data))
+
+    def process():
+        sender.sendall(image_data)
+        buffers.receive(receiver, len(image_data))
+        green_ratio(roi, buffers)
+        buffers.blob([image], 416)
+
+    try:
+        return steady_state_allocations(process, frames, warmup)
+    finally:
+        sender.close()
+        receiver.close()
+
+if __name__ == "__main__":
+    # Steady-state allocation checks on synthetic 1024x1024 frames. The buffer paths
+    # run without any model; with the YOLOv4-tiny weights present, the whole follower
+    # is checked too: after warm-up, its only large allocation must be the JPEG decode.
+    import sys
+    from bounded_follower_yolov4 import BoundedFollowerYoloV4
+
+    slack = 64 * 1024
+    largest_peak, growth = buffer_paths_allocations()
+    # numpy's fixed 8192-element iteration buffer (mask.sum()) is allowed; the
+    # smallest per-frame array (the 512x512 mask) is 256 KiB
+    ok = largest_peak <= 2 * slack and growth <= slack
+    print(f"Buffer paths: largest per-frame peak {largest_peak / 1024:.0f} KiB, "
+          f"retained growth {growth / 1024:.0f} KiB: {'OK' if ok else 'FAIL'}")
+
+    follower = BoundedFollowerYoloV4()
+    if follower.model_ready:
+        frame = np.random.randint(0, 255, (1024, 1024, 3), np.uint8)
+        image_data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 75])[1]
+        largest_peak, growth = steady_state_allocations(lambda: follower.processImage(image_data))
+        decode_size = frame.nbytes
+        follower_ok = largest_peak <= decode_size + slack and growth <= slack
+        print(f"YOLOv4-tiny follower: largest per-frame peak {largest_peak / 1024:.0f} KiB "
+              f"(JPEG decode: {decode_size / 1024:.0f} KiB), retained growth {growth / 1024:.0f} KiB: "
+              f"{'OK' if follower_ok else 'FAIL'}")
+        ok = ok and follower_ok
+    else:
+        print("YOLOv4-tiny follower: skipped (model files missing)")
+    sys.exit(0 if ok else 1)
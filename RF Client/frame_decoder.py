@@ -0,0 +1,249 @@
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+def decode_image(image_data):
+    """
+    Decode the JPEG bytes of a frame into a BGR image.
+    An image that was already decoded (by a DecodePipeline) is returned as is,
+    and None (a frame that failed to decode) stays None.
+    """
+    if image_data is None or (isinstance(image_data, np.ndarray) and image_data.ndim == 3):
+        return image_data
+    return cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+class DecodePipeline:
+    """
+    Receives the frames of the simulator on a background thread and decodes
+    them on a small thread pool (cv2.imdecode releases the GIL), so frame N+1
+    is decoded while the follower runs inference on frame N.
+
+    Frames are always returned in order. With latest_only (latest frame wins),
+    a frame that is older than a newer received frame is dropped before it is
+    decoded, and a decoded frame is dropped when a newer one is already decoded,
+    so the follower always works on the most recent image.
+
+    Each frame is received into its own buffer, since decoding and inference
+    now overlap with the reception of the next frames. At most `max_backlog`
+    frames wait for a decode slot; beyond that the oldest are dropped, so a
+    follower that never catches up does not grow the queue without bound.
+
+    next() returns image=None for a frame that could not be decoded.
+    """
+    def __init__(self, sock, workers=2, latest_only=False, prefetch=None, max_backlog=None):
+        """
+        Args:
+            sock: Connected socket of the simulator (4-byte size + JPEG frames)
+            workers: Number of decode threads
+            latest_only: Drop the frames that became obsolete instead of queueing them
+            prefetch: Maximum number of frames decoded ahead of the follower (default: workers)
+            max_backlog: Maximum number of received frames waiting to be decoded (default: 4 * prefetch)
+        """
+        self.sock = sock
+        self.latest_only = latest_only
+        self.prefetch = prefetch or workers
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decode")
+        self.condition = threading.Condition()
+        self.received = deque(maxlen=max_backlog or 4 * self.prefetch)  # (index, data) not submitted for decoding yet
+        self.decoding = deque()  # (index, data, future) in frame order
+        self.closed = False
+        self.stopping = False
+        self.frame_count = 0
+        self.dropped = 0
+        self.receiver = threading.Thread(target=self._receive_loop, daemon=True)
+        self.receiver.start()
+
+    def _receive_exactly(self, size):
+        data = bytearray(size)
+        view = memoryview(data)
+        received = 0
+        while received < size:
+            count = self.sock.recv_into(view[received:], size - received)
+            if count == 0:
+                return None
+            received += count
+        return data
+
+    def _receive_loop(self):
+        try:
+            while True:
+                size_data = self._receive_exactly(4)
+                if size_data is None:
+                    break
+                data = self._receive_exactly(struct.unpack("I", size_data)[0])
+                if data is None:
+                    break
+                with self.condition:
+                    if self.stopping:
+                        break
+                    if len(self.received) == self.received.maxlen:
+                        # The oldest waiting frame is pushed out
+                        self.dropped += 1
+                    self.received.append((self.frame_count, np.frombuffer(data, dtype=np.uint8)))
+                    self.frame_count += 1
+                    if self.latest_only:
+                        # Not decoded yet and already obsolete
+                        while len(self.received) > 1:
+                            self.received.popleft()
+                            self.dropped += 1
+                    self._dispatch()
+        except OSError:
+            pass
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def _dispatch(self):
+        """Start decoding received frames while fewer than `prefetch` are decoding or waiting (lock held)."""
+        while not self.stopping and self.received and len(self.decoding) < self.prefetch:
+            index, data = self.received.popleft()
+            future = self.pool.submit(cv2.imdecode, data, cv2.IMREAD_COLOR)
+            future.add_done_callback(self._notify)
+            self.decoding.append((index, data, future))
+
+    def _notify(self, future):
+        with self.condition:
+            self.condition.notify_all()
+
+    def next(self):
+        """
+        Return the next frame as an (index, jpeg_data, image) tuple, waiting
+        for it if needed, or None once the connection is closed.
+        """
+        with self.condition:
+            while not self.decoding and not (self.closed and not self.received):
+                self.condition.wait()
+            if not self.decoding:
+                return None
+            if self.latest_only:
+                # Skip the decoded frames that a newer decoded frame makes obsolete
+                newest_done = max((k for k, (_, _, f) in enumerate(self.decoding) if f.done()), default=0)
+                for _ in range(newest_done):
+                    self.decoding.popleft()
+                    self.dropped += 1
+            index, data, future = self.decoding.popleft()
+            self._dispatch()
+        return index, data, future.result()
+
+    def close(self):
+        # No submit can follow the shutdown: _dispatch checks the flag under the same lock
+        with self.condition:
+            self.stopping = True
+            self.received.clear()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+def _stand_in_server(port, frames, fps, duration, send_times, ready):
+    """Send the encoded frames at a fixed rate for `duration` seconds, and read the commands back."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("127.0.0.1", port))
+    server.listen(1)
+    ready.set()
+    connection, _ = server.accept()
+    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def drain():
+        try:
+            while connection.recv(4096):
+                pass
+        except OSError:
+            pass
+    threading.Thread(target=drain, daemon=True).start()
+
+    start = time.perf_counter()
+    index = 0
+    while time.perf_counter() - start < duration:
+        data = frames[index % len(frames)]
+        send_times.append(time.perf_counter())
+        connection.sendall(struct.pack("I", len(data)) + data)
+        index += 1
+        time.sleep(max(0.0, start + index / fps - time.perf_counter()))
+    # shutdown() wakes up the drain thread and sends the end of stream to the client
+    connection.shutdown(socket.SHUT_RDWR)
+    connection.close()
+    server.close()
+
+def _run_client(port, mode, process, send_times):
+    """Follow the stand-in server with serial decoding, the decode pipeline, or the pipeline with latest-frame-wins."""
+    from frame_buffers import FrameBuffers
+    client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    client.connect(("127.0.0.1", port))
+    latencies = []
+    start = time.perf_counter()
+
+    if mode == "serial":
+        buffers = FrameBuffers()
+        while True:
+            size_data = buffers.receive(client, 4)
+            if size_data is None:
+                break
+            image_data = buffers.receive(client, struct.unpack("I", size_data.tobytes())[0])
+            if image_data is None:
+                break
+            index = len(latencies)
+            process(decode_image(image_data))
+            latencies.append(time.perf_counter() - send_times[index])
+        dropped = 0
+    else:
+        pipeline = DecodePipeline(client, workers=2, latest_only=(mode == "latest"))
+        while True:
+            frame = pipeline.next()
+            if frame is None:
+                break
+            index, _, image = frame
+            process(image)
+            latencies.append(time.perf_counter() - send_times[index])
+        pipeline.close()
+        dropped = pipeline.dropped
+
+    elapsed = time.perf_counter() - start
+    client.close()
+    latencies = np.array(latencies) * 1000
+    return len(latencies) / elapsed, float(np.mean(latencies)), float(np.percentile(latencies, 95)), dropped
+
+if __name__ == "__main__":
+    # Serial decode versus the decode pipeline, against a local stand-in of the
+    # simulator's TCP server sending 1024x1024 quality-75 JPEG frames.
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Decode pipeline benchmark with a stand-in server")
+    parser.add_argument("--follower", choices=["stand-in", "hog"], default="stand-in",
+                        help="Work done per frame: a fixed OpenCV workload, or the HOG follower")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per run")
+    parser.add_argument("--port", type=int, default=2747)
+    args = parser.parse_args()
+
+    cv2.imshow = lambda *a, **k: None
+    if args.follower == "hog":
+        from bounded_follower_hog import BoundedFollowerHog
+        process = BoundedFollowerHog().processImage
+    else:
+        def process(image):
+            cv2.GaussianBlur(cv2.resize(image, (416, 416)), (31, 31), 0)
+            cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:1024, 0:1024]
+    frames = []
+    for shift in range(8):
+        image = np.dstack(((x + 8 * shift) // 4 % 256, y // 4 % 256, (x + y) // 8 % 256)).astype(np.uint8)
+        image = cv2.GaussianBlur(cv2.add(image, rng.integers(0, 20, image.shape, dtype=np.uint8)), (5, 5), 0)
+        frames.append(cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 75])[1].tobytes())
+
+    print(f"{'fps':>4} {'mode':>8} {'processed/s':>12} {'latency ms':>11} {'p95 ms':>8} {'dropped':>8}")
+    for fps in (30, 60):
+        for mode in ("serial", "pipeline", "latest"):
+            send_times = []
+            ready = threading.Event()
+            server = threading.Thread(target=_stand_in_server,
+                                      args=(args.port, frames, fps, args.duration, send_times, ready), daemon=True)
+            server.start()
+            ready.wait()
+            rate, latency, p95, dropped = _run_client(args.port, mode, process, send_times)
+            server.join()
+            print(f"{fps:4d} {mode:>8} {rate:12.1f} {latency:11.1f} {p95:8.1f} {dropped:8d}")
@@ -0,0 +1,207 @@
+import cProfile
+import io
+import os
+import pstats
+import signal
+import socket
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+class FrameProfiler:
+    """
+    On-demand profiling of a live follower.
+
+    Once installed, nothing is changed until a capture is requested, so the
+    cost while disabled is zero. A capture is requested with SIGUSR1 (where
+    available) or by sending a UDP datagram to the local control port:
+
+        profile [frames] [cprofile|sampling] [alloc]
+
+    e.g. `echo "profile 200 sampling alloc" | nc -u -w0 127.0.0.1 2738`.
+
+    The follower's processImage is then wrapped for the next N frames and
+    restored afterwards. The results are written to the output directory:
+      - cprofile: a .prof file (snakeviz, pstats) and a text report,
+      - sampling: a collapsed-stack file (flamegraph.pl, speedscope),
+      - alloc: the top allocating lines of the hot loop (tracemalloc).
+    """
+    def __init__(self, follower, output_dir="profiles", port=2738,
+                 default_frames=100, sample_interval=0.002):
+        """
+        Args:
+            follower: The follower whose processImage is profiled
+            output_dir: Directory where the reports are written
+            port: Local UDP control port (None to disable the control socket)
+            default_frames: Number of frames captured when not specified
+            sample_interval: Seconds between two stack samples in sampling mode
+        """
+        self.follower = follower
+        self.output_dir = output_dir
+        self.port = port
+        self.default_frames = default_frames
+        self.sample_interval = sample_interval
+        self.lock = threading.Lock()
+        self.capturing = False
+
+    def install(self):
+        """Register the signal handler and start the control socket thread."""
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.request())
+        if self.port is not None:
+            threading.Thread(target=self._control_loop, daemon=True).start()
+        return self
+
+    def _control_loop(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.bind(("127.0.0.1", self.port))
+        except OSError as e:
+            # e.g. another client already listens on this port: profiling stays available through SIGUSR1
+            print(f"[profiler] Control port {self.port} unavailable ({e}), use SIGUSR1 or another --profile-port")
+            sock.close()
+            return
+        print(f"[profiler] Listening on udp://127.0.0.1:{self.port}")
+        while True:
+            data, _ = sock.recvfrom(256)
+            words = data.decode("utf-8", errors="ignore").split()
+            if not words or words[0] != "profile":
+                continue
+            frames = next((int(w) for w in words[1:] if w.isdigit()), self.default_frames)
+            mode = "sampling" if "sampling" in words else "cprofile"
+            self.request(frames, mode, "alloc" in words)
+
+    def request(self, frames=None, mode="cprofile", allocations=True):
+        """Profile the next `frames` calls of processImage."""
+        with self.lock:
+            if self.capturing:
+                return False
+            self.capturing = True
+        capture = _Capture(self, frames or self.default_frames, mode, allocations)
+        # Instance attribute shadows the class method until the capture is over
+        self.follower.processImage = capture.process_image
+        print(f"[profiler] Capturing {capture.frames} frames ({mode}{', alloc' if allocations else ''})")
+        return True
+
+    def _finish(self, capture):
+        del self.follower.processImage
+        paths = capture.dump(self.output_dir)
+        print("[profiler] Wrote " + ", ".join(paths))
+        with self.lock:
+            self.capturing = False
+
+class _Capture:
+    """State of one profiling capture over N frames."""
+    def __init__(self, profiler, frames, mode, allocations):
+        self.profiler = profiler
+        self.frames = frames
+        self.mode = mode
+        self.allocations = allocations
+        self.process = type(profiler.follower).processImage.__get__(profiler.follower)
+        self.count = 0
+        self.elapsed = 0.0
+        self.profile = None
+        self.stacks = Counter()
+        self.sampler = None
+        self.sampling = False
+        self.in_frame = False  # processImage is running, the sampler records only then
+        self.alloc_start = None
+        self.alloc_end = None
+        self.alloc_peak = 0
+
+    def start(self):
+        if self.allocations:
+            tracemalloc.start(25)
+            self.alloc_start = tracemalloc.take_snapshot()
+        if self.mode == "cprofile":
+            self.profile = cProfile.Profile()
+        else:
+            self.sampling = True
+            self.sampler = threading.Thread(target=self._sample, args=(threading.get_ident(),), daemon=True)
+            self.sampler.start()
+
+    def stop(self):
+        if self.sampler is not None:
+            self.sampling = False
+            self.sampler.join()
+        if self.allocations:
+            self.alloc_end = tracemalloc.take_snapshot()
+            self.alloc_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    def process_image(self, image_data):
+        if self.count == 0:
+            self.start()
+        start = time.perf_counter()
+        if self.profile is not None:
+            command = self.profile.runcall(self.process, image_data)
+        else:
+            self.in_frame = True
+            try:
+                command = self.process(image_data)
+            finally:
+                self.in_frame = False
+        self.elapsed += time.perf_counter() - start
+        self.count += 1
+        if self.count >= self.frames:
+            self.stop()
+            self.profiler._finish(self)
+        return command
+
+    def _sample(self, thread_id):
+        """
+        Sample the stack of the profiled thread until the capture ends, only while
+        it is inside processImage (not while the main loop waits on the socket).
+        """
+        while self.sampling:
+            if not self.in_frame:
+                time.sleep(self.profiler.sample_interval)
+                continue
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            in_process_image = False
+            while frame is not None:
+                code = frame.f_code
+                in_process_image |= code is _Capture.process_image.__code__
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            # The frame may have ended between the flag check and the sample
+            if stack and in_process_image:
+                self.stacks[";".join(reversed(stack))] += 1
+            time.sleep(self.profiler.sample_interval)
+
+    def dump(self, output_dir):
+        """Write the reports and return their paths."""
+        os.makedirs(output_dir, exist_ok=True)
+        prefix = os.path.join(output_dir, time.strftime("profile_%Y%m%d_%H%M%S"))
+        summary = f"{self.count} frames, {self.elapsed / self.count * 1000:.1f} ms/frame average\n\n"
+        paths = []
+
+        if self.profile is not None:
+            self.profile.dump_stats(prefix + ".prof")
+            text = io.StringIO()
+            pstats.Stats(self.profile, stream=text).sort_stats("cumulative").print_stats(40)
+            with open(prefix + "_cprofile.txt", "w") as f:
+                f.write(summary + text.getvalue())
+            paths += [prefix + ".prof", prefix + "_cprofile.txt"]
+        else:
+            with open(prefix + ".collapsed", "w") as f:
+                for stack, count in self.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            paths.append(prefix + ".collapsed")
+
+        if self.allocations:
+            with open(prefix + "_alloc.txt", "w") as f:
+                f.write(summary)
+                f.write(f"Peak traced memory: {self.alloc_peak / 1024 / 1024:.1f} MiB\n\n")
+                f.write("Top allocating lines during the capture (net size):\n")
+                for stat in self.alloc_end.compare_to(self.alloc_start, "lineno")[:25]:
+                    f.write(f"{stat}\n")
+                f.write("\nLargest live allocations at the end of the capture (with traceback):\n")
+                for stat in self.alloc_end.statistics("traceback")[:5]:
+                    f.write(f"{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+                    f.write("\n".join(stat.traceback.format()) + "\n\n")
+            paths.append(prefix + "_alloc.txt")
+        return paths
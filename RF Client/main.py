@@ -1,25 +1,74 @@
 # venv\Scripts\activate.bat
 
+import os
 import socket
 import numpy as np
 import cv2
 import struct
+import time
 import sys
 import argparse
 from bounded_follower_hog import BoundedFollowerHog
 from bounded_follower_yolov4 import BoundedFollowerYoloV4
+from cascade_follower import CascadeFollower
+from adaptive_input import AdaptiveInputSize
+from scene_change_gate import SceneChangeGate
+from frame_profiler import FrameProfiler
+from frame_buffers import shared_buffers
+from telemetry import TelemetryPublisher
+from track_store import TrackStore
+from frame_decoder import DecodePipeline
+from command_scheduler import CommandScheduler
+from frame_decoder import decode_image
+from shadow_followers import ShadowFollowers
+import control_geometry
 
 print("Client started")
 
 # Parse command-line arguments
 parser = argparse.ArgumentParser(description='Follower Simulator Client')
-parser.add_argument('--detector', type=str, default='yolov4', choices=['hog', 'yolov4'],
-                    help='Person detector to use (hog or yolov4)')
+parser.add_argument('--detector', type=str, default='yolov4', choices=['hog', 'yolov4', 'cascade'],
+                    help='Person detector to use (hog, yolov4, or cascade: HOG/motion proposals verified by YOLOv4-tiny)')
 parser.add_argument('--min-bound', type=float, default=0.5,
                     help='Minimum bound as a percentage of image size (0.0 to 1.0)')
 parser.add_argument('--max-bound', type=float, default=0.8,
                     help='Maximum bound as a percentage of image size (0.0 to 1.0)')
+parser.add_argument('--adaptive-input', action='store_true',
+                    help='Choose the YOLOv4-tiny input size per frame from the target size (tiles when the target is lost)')
+parser.add_argument('--scene-gate', type=float, default=None, metavar='THRESHOLD',
+                    help='Skip inference on frames whose mean absolute difference is below THRESHOLD')
+parser.add_argument('--refresh-every', type=int, default=15,
+                    help='Force inference at least every N frames when --scene-gate is used')
+parser.add_argument('--profile-port', type=int, default=2738,
+                    help='Local UDP port accepting "profile [frames] [cprofile|sampling] [alloc]" requests (0 to disable)')
+parser.add_argument('--record', type=str, default=None, metavar='DIR',
+                    help='Save every received frame as DIR/frame_NNNNNN.jpg (for pareto_benchmark.py)')
+parser.add_argument('--telemetry', type=str, default=None, metavar='TARGET',
+                    help='Publish per-frame telemetry to udp://host:port or ring:path (see telemetry_viewer.py)')
+parser.add_argument('--headless', action='store_true',
+                    help='Do not open the follower windows (use telemetry_viewer.py instead)')
+parser.add_argument('--multi-target', action='store_true',
+                    help='Track every person (YOLOv4-tiny) and keep following the same one')
+parser.add_argument('--decode-workers', type=int, default=0,
+                    help='Receive and decode frames on N background threads, ahead of the follower (0: in the loop)')
+parser.add_argument('--latest-frame', action='store_true',
+                    help='With --decode-workers, drop the frames that became obsolete instead of queueing them')
+parser.add_argument('--command-rate', type=float, default=0,
+                    help='Send commands at this fixed rate (Hz) from the latest detection, on a separate thread (0: one command per frame)')
+parser.add_argument('--hold-commands', action='store_true',
+                    help='With --command-rate, repeat the last detection instead of extrapolating it')
+parser.add_argument('--shadow', nargs='+', default=[], metavar='FOLLOWER',
+                    help='Shadow followers run on the same frames and logged, never sent (e.g. hog "yolov4:input_size=320")')
+parser.add_argument('--shadow-mode', choices=['thread', 'process'], default='thread',
+                    help='Run the shadow followers on threads (zero-copy frames) or processes (shared memory)')
+parser.add_argument('--shadow-log', type=str, default='shadow_log.csv',
+                    help='CSV file with the commands and latencies of the primary and shadow followers')
 args = parser.parse_args()
+if args.adaptive_input and args.detector != 'yolov4':
+    # Only the YOLOv4-tiny follower of this client takes an input policy (see main_yolov11n.py for the others)
+    parser.error('--adaptive-input requires --detector yolov4')
+if args.multi_target and args.detector != 'yolov4':
+    parser.error('--multi-target requires --detector yolov4')
 
 # For backward compatibility with the old command-line argument format
 if len(sys.argv) > 1 and sys.argv[1].lower() in ['hog', 'yolov4']:
@@ -29,55 +78,158 @@ if len(sys.argv) > 1 and sys.argv[1].lower() in ['hog', 'yolov4']:
 if args.detector == "yolov4":
     print(f"Using YOLOv4-tiny for person detection (bounds: {args.min_bound}, {args.max_bound})")
     # follower = BoundedFollowerYoloV4(min_bound=args.min_bound, max_bound=args.max_bound)
-    follower = BoundedFollowerYoloV4()
+    input_policy = AdaptiveInputSize() if args.adaptive_input else None
+    tracks = TrackStore() if args.multi_target else None
+    follower = BoundedFollowerYoloV4(input_policy=input_policy, tracks=tracks)
+elif args.detector == "cascade":
+    print(f"Using HOG/motion proposals verified by YOLOv4-tiny (bounds: {args.min_bound}, {args.max_bound})")
+    follower = CascadeFollower(BoundedFollowerYoloV4(), min_bound=args.min_bound, max_bound=args.max_bound)
 else:
     print(f"Using HOG for person detection (bounds: {args.min_bound}, {args.max_bound})")
     follower = BoundedFollowerHog(min_bound=args.min_bound, max_bound=args.max_bound)
 
+if args.headless:
+    # The followers draw with cv2.imshow; turn it off so display never runs on the control path
+    cv2.imshow = lambda *args, **kwargs: None
+    control_geometry.drawing_enabled = False
+
+# The detector itself, before any wrapper (target_box / target_confidence for telemetry)
+detector = follower
+
+if args.scene_gate is not None:
+    print(f"Using scene change gate (threshold: {args.scene_gate}, refresh every {args.refresh_every} frames)")
+    follower = SceneChangeGate(follower, threshold=args.scene_gate, refresh_every=args.refresh_every)
+
+shadows = ShadowFollowers(args.shadow, args.shadow_mode, args.shadow_log) if args.shadow else None
+
+# On-demand profiling (SIGUSR1 or the control port), no cost until requested
+FrameProfiler(follower, port=args.profile_port or None).install()
+
+if args.record:
+    os.makedirs(args.record, exist_ok=True)
+frame_index = 0
+telemetry = TelemetryPublisher(args.telemetry) if args.telemetry else None
+
 client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 client.connect(("127.0.0.1", 2737))
 
 print("Connected to server")
 
-while True:
-    # Check for key press to exit
-    key = cv2.waitKey(1) & 0xFF
-    if key == ord('q') or key == 27:  # 27 is the ASCII value for Escape key
-        break
-
-    # read the image from server
-    size_data = client.recv(4)
-    
-    if not size_data:
-        print("Connection closed by server")
-        break
+scheduler = None
+if args.command_rate > 0:
+    print(f"Sending commands at {args.command_rate} Hz")
+    scheduler = CommandScheduler(client, rate=args.command_rate, predict=not args.hold_commands).start()
 
-    size = struct.unpack("I", size_data)[0]
+pipeline = DecodePipeline(client, workers=args.decode_workers, latest_only=args.latest_frame) if args.decode_workers > 0 else None
 
-    image_data = b""
-    while len(image_data) < size:
-        packet = client.recv(size - len(image_data))
-        if not packet:
-            print("No more data received")
+try:
+    while True:
+        # Check for key press to exit
+        key = cv2.waitKey(1) & 0xFF
+        if key == ord('q') or key == 27:  # 27 is the ASCII value for Escape key
             break
-        image_data += packet
 
-    if len(image_data) != size:
-        print(f"Error: expected {size} bytes but received {len(image_data)} bytes")
-        continue
+        if pipeline is not None:
+            # Frames already received and decoded in the background (in order)
+            frame_start = time.perf_counter()
+            frame = pipeline.next()
+            if frame is None:
+                print("Connection closed by server")
+                break
+            frame_index, image_data, image = frame
+            frame_index += 1
+        else:
+            # read the image from server
+            size_data = client.recv(4)
+            frame_start = time.perf_counter()
+        
+            if not size_data:
+                print("Connection closed by server")
+                break
+
+            size = struct.unpack("I", size_data)[0]
 
-    image = np.frombuffer(image_data, dtype=np.uint8)
+            # Read the image into a reused buffer (no per-frame allocation)
+            image = image_data = shared_buffers.receive(client, size)
+            if image is None:
+                print("No more data received")
+                break
+            frame_index += 1
     
-    # get the command from the follower
-    command = follower.processImage(image)
-    # print(command)
+        if args.record:
+            image_data.tofile(os.path.join(args.record, f"frame_{frame_index - 1:06d}.jpg"))
+
+        if shadows is not None and pipeline is None:
+            # Decode once here, the shadows get views of the same frame
+            decoded = decode_image(image_data)
+            image = decoded if decoded is not None else image_data
+
+        # get the command from the follower
+        if shadows is not None and image is not None and image is not image_data:
+            shadows.submit(frame_index - 1, image)
+        # Timed after the hand-off, so the primary's logged latency is its own processing only
+        process_start = time.perf_counter()
+        if image is None:
+            # The frame could not be decoded: stop the robot and wait for the next one
+            command = "None|None"
+        else:
+            command = follower.processImage(image)
+        if shadows is not None:
+            shadows.record_primary(frame_index - 1, command, (time.perf_counter() - process_start) * 1000)
+        # print(command)
     
-    # send the command to the server
-    command = command.encode('utf-8')
-    command_size = struct.pack("I", len(command))
-    client.sendall(command_size)
-    client.sendall(command)
+        # send the command to the server
+        send_start = time.perf_counter()
+        if scheduler is not None:
+            # The scheduler thread sends it at its own fixed rate
+            scheduler.update(command, frame_start)
+            if scheduler.closed:
+                print("Connection closed by server")
+                break
+        else:
+            command_bytes = command.encode('utf-8')
+            command_size = struct.pack("I", len(command_bytes))
+            try:
+                client.sendall(command_size)
+                client.sendall(command_bytes)
+            except OSError:
+                print("Connection closed by server")
+                break
+
+        if telemetry is not None:
+            frame_end = time.perf_counter()
+            telemetry.publish(frame_index - 1, command,
+                              box=getattr(detector, "target_box", None),
+                              confidence=getattr(detector, "target_confidence", None),
+                              timings={"receive_ms": (process_start - frame_start) * 1000,
+                                       "process_ms": (send_start - process_start) * 1000,
+                                       "send_ms": (frame_end - send_start) * 1000,
+                                       "total_ms": (frame_end - frame_start) * 1000})
+except KeyboardInterrupt:
+    # Ctrl-C (the only way to stop a --headless run): still clean up and print the reports
+    print("Interrupted")
+
+
+if isinstance(follower, SceneChangeGate):
+    print(follower.report())
+    follower = follower.follower
+if isinstance(follower, CascadeFollower):
+    print(follower.report())
+
+if shadows is not None:
+    print(shadows.close())
+
+if scheduler is not None:
+    scheduler.stop()
+    print(scheduler.report())
+
+if pipeline is not None:
+    print(f"Decode pipeline: {pipeline.frame_count} frames received, {pipeline.dropped} dropped")
+    pipeline.close()
 
+if telemetry is not None:
+    print(f"Telemetry: {telemetry.sent} records sent, {telemetry.dropped} dropped")
+    telemetry.close()
 
 print("Closing connection")
 client.close()
@@ -4,19 +4,48 @@ import socket
 import numpy as np
 import cv2
 import struct
+import time
 import argparse
 # Importăm noua noastră clasă de follower
 from follower_ultralytics import BoundedFollowerYoloV8
 # from follower_deepsort import DeepSortFollower
 from color_follower import ColorFollowerYoloV8
 from color_follower_smooth import ColorFollowerSmooth
+from frame_profiler import FrameProfiler
+from frame_buffers import shared_buffers
+from frame_decoder import decode_image
+from adaptive_input import AdaptiveInputSize
+from shadow_followers import ShadowFollowers
+# from appearance_follower import AppearanceFollower
 print("Client Ultralytics (YOLOv8) pornit")
 
+# Argumente: followeri "shadow" care ruleaza pe aceleasi cadre, doar pentru comparatie
+parser = argparse.ArgumentParser(description='Client Ultralytics')
+parser.add_argument('--shadow', nargs='+', default=[], metavar='FOLLOWER',
+                    help='Followeri shadow, rulati pe aceleasi cadre si logati, niciodata trimisi (ex: yolov8 appearance)')
+parser.add_argument('--shadow-mode', choices=['thread', 'process'], default='thread',
+                    help='Followerii shadow ruleaza pe thread-uri (cadre fara copiere) sau procese (memorie partajata)')
+parser.add_argument('--shadow-log', type=str, default='shadow_log.csv',
+                    help='Fisier CSV cu comenzile si latentele followerului principal si ale celor shadow')
+parser.add_argument('--profile-port', type=int, default=2738,
+                    help='Port UDP local pentru cereri "profile [cadre] [cprofile|sampling] [alloc]" (0 dezactiveaza)')
+parser.add_argument('--adaptive-input', action='store_true',
+                    help='Dimensiunea intrarii YOLO aleasa pe fiecare cadru dupa marimea tintei (tile-uri cand tinta e pierduta)')
+args = parser.parse_args()
+
 
 # follower = DeepSortFollower(min_bound=args.min_bound, max_bound=args.max_bound)
 # follower = BoundedFollowerYoloV8(min_bound=args.min_bound, max_bound=args.max_bound)
 # follower = ColorFollowerYoloV8(min_bound=args.min_bound, max_bound=args.max_bound)
-follower = ColorFollowerSmooth()
+# follower = AppearanceFollower()
+# Politica de intrare adaptiva (dimensiunile modelelor ultralytics, baza 640 px)
+input_policy = AdaptiveInputSize.for_ultralytics() if args.adaptive_input else None
+follower = ColorFollowerSmooth(input_policy=input_policy)
+
+shadows = ShadowFollowers(args.shadow, args.shadow_mode, args.shadow_log) if args.shadow else None
+
+# Profilare la cerere (SIGUSR1 sau "profile [cadre] [cprofile|sampling] [alloc]" pe udp://127.0.0.1:--profile-port)
+FrameProfiler(follower, port=args.profile_port or None).install()
 
 try:
     client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -26,7 +55,7 @@ except socket.error as e:
     print(f"Eroare la conectare: {e}")
     exit()
 
-
+frame_index = -1
 while True:
     key = cv2.waitKey(1) & 0xFF
     if key == ord('q') or key == 27:  # 27 este codul ASCII pentru tasta Escape
@@ -41,19 +70,25 @@ while True:
 
         size = struct.unpack("I", size_data)[0]
 
-        image_data = b""
-        while len(image_data) < size:
-            packet = client.recv(size - len(image_data))
-            if not packet:
-                break
-            image_data += packet
+        # Citeste imaginea intr-un buffer refolosit (fara alocari la fiecare cadru)
+        image_data = shared_buffers.receive(client, size)
+        if image_data is None:
+            print("Conexiune închisă de server")
+            break
 
-        if len(image_data) != size:
-            print(f"Eroare: se așteptau {size} octeți, dar s-au primit {len(image_data)} octeți")
-            continue
+        frame_index += 1
+        if shadows is not None:
+            # Decodam o singura data, followerii shadow primesc acelasi cadru (fara copiere)
+            image = decode_image(image_data)
+            if image is not None:
+                shadows.submit(frame_index, image)
+                image_data = image
 
         # Obtine comanda de la follower
+        start = time.perf_counter()
         command = follower.processImage(image_data)
+        if shadows is not None:
+            shadows.record_primary(frame_index, command, (time.perf_counter() - start) * 1000)
         
         # Trimite comanda catre server
         command_bytes = command.encode('utf-8')
@@ -68,6 +103,9 @@ while True:
         print(f"A apărut o eroare neașteptată: {e}")
         break
 
+if shadows is not None:
+    print(shadows.close())
+
 print("Închidere conexiune")
 client.close()
 cv2.destroyAllWindows()
\ No newline at end of file
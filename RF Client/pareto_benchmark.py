@@ -0,0 +1,238 @@
+"""
+Accuracy versus latency sweep of the followers over recorded sequences.
+
+A sequence is a directory with the JPEG frames sent by the simulator
+(frame_000000.jpg, frame_000001.jpg, ..., as written by `main.py --record DIR`)
+and a ground_truth.csv file with one line per visible person and frame:
+
+    frame,person_id,x,y,w,h,target
+
+where `target` is 1 for the person the robot should follow. Each follower is
+run over every combination of its settings grid; the tracking accuracy (IoU
+with the target, ID switches) is measured with the latency and CPU time, and
+the Pareto-optimal configurations are reported.
+
+    python pareto_benchmark.py recordings/seq1 --followers hog yolov4 --output sweep.csv
+    python pareto_benchmark.py recordings/seq1 --grid grid.json --min-iou 0.6 --max-id-switches 0
+"""
+import argparse
+import csv
+import glob
+import importlib
+import inspect
+import itertools
+import json
+import os
+import time
+import cv2
+import numpy as np
+
+# Settings swept by default, per follower. Names are constructor arguments
+# or attributes of the follower.
+DEFAULT_GRIDS = {
+    "hog": {"win_stride": [[4, 4], [8, 8]], "scale_factor": [1.05, 1.1, 1.2]},
+    "yolov4": {"input_size": [320, 416, 608]},
+    "cascade": {"crop_input_size": [160, 224, 320], "full_frame_every": [10, 30]},
+    "yolov8": {"input_size": [320, 480, 640]},
+    "color_smooth": {"green_threshold": [0.1, 0.2, 0.3], "input_size": [416, 640]},
+    "appearance": {"match_threshold": [0.6, 0.75, 0.9], "input_size": [416, 640]},
+    "deepsort": {"nn_budget": [20, 70], "max_age": [10, 30]},
+}
+
+# Follower name -> (module, class)
+FOLLOWERS = {
+    "hog": ("bounded_follower_hog", "BoundedFollowerHog"),
+    "yolov4": ("bounded_follower_yolov4", "BoundedFollowerYoloV4"),
+    "cascade": ("cascade_follower", "CascadeFollower"),
+    "yolov8": ("follower_ultralytics", "BoundedFollowerYoloV8"),
+    "color_smooth": ("color_follower_smooth", "ColorFollowerSmooth"),
+    "appearance": ("appearance_follower", "AppearanceFollower"),
+    "deepsort": ("follower_deepsort", "DeepSortFollower"),
+}
+
+def follower_class(name):
+    """Import the follower class lazily (ultralytics is only needed for its followers)."""
+    module, cls = FOLLOWERS[name]
+    return getattr(importlib.import_module(module), cls)
+
+def build(name, settings, buffers=None):
+    """
+    Create a follower with the settings: constructor arguments first, attributes for the rest.
+    `buffers` is a FrameBuffers arena for the followers that take one (their own arena when
+    they run in another thread).
+    """
+    cls = follower_class(name)
+    accepted = inspect.signature(cls.__init__).parameters
+    kwargs = {k: v for k, v in settings.items() if k in accepted}
+    if buffers is not None and "buffers" in accepted:
+        kwargs["buffers"] = buffers
+    if name == "cascade":
+        follower = cls(follower_class("yolov4")(buffers=buffers), **kwargs)
+    else:
+        follower = cls(**kwargs)
+    for key, value in settings.items():
+        if key not in accepted:
+            if not hasattr(follower, key):
+                raise ValueError(f"{name} has no setting named {key}")
+            setattr(follower, key, tuple(value) if isinstance(value, list) else value)
+    return follower
+
+def load_sequence(path):
+    """
+    Load a recorded sequence.
+
+    Returns:
+        tuple: (frames, ground_truth) where frames is a list of encoded JPEG
+               arrays and ground_truth maps a frame index to a list of
+               (person_id, [x, y, w, h], is_target)
+    """
+    files = sorted(glob.glob(os.path.join(path, "frame_*.jpg")))
+    frames = [np.fromfile(f, dtype=np.uint8) for f in files]
+    ground_truth = {}
+    with open(os.path.join(path, "ground_truth.csv")) as f:
+        for row in csv.DictReader(f):
+            box = [int(float(row[k])) for k in ("x", "y", "w", "h")]
+            ground_truth.setdefault(int(row["frame"]), []).append(
+                (row["person_id"], box, row.get("target", "0") == "1"))
+    return frames, ground_truth
+
+def iou(a, b):
+    """Intersection over union of two [x, y, w, h] boxes."""
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union > 0 else 0.0
+
+def evaluate(follower, frames, ground_truth, show=False):
+    """
+    Run the follower over the sequence.
+
+    Returns:
+        dict: mean IoU with the target (0 for missed frames), success rate
+              (IoU >= 0.5), ID switches (the followed box changes from one
+              ground-truth person to another), latency and CPU per frame
+    """
+    ious, latencies, cpu_times = [], [], []
+    id_switches = 0
+    wrong_target = 0
+    previous_id = None
+
+    for index, image_data in enumerate(frames):
+        wall, cpu = time.perf_counter(), time.process_time()
+        follower.processImage(image_data)
+        latencies.append(time.perf_counter() - wall)
+        cpu_times.append(time.process_time() - cpu)
+        if show:
+            cv2.waitKey(1)
+
+        people = ground_truth.get(index, [])
+        target = next((box for (_, box, is_target) in people if is_target), None)
+        predicted = follower.target_box
+
+        if target is not None:
+            ious.append(iou(predicted, target) if predicted is not None else 0.0)
+
+        if predicted is not None and people:
+            best_iou, person_id, is_target = max((iou(predicted, box), pid, t) for (pid, box, t) in people)
+            if best_iou >= 0.5:
+                if previous_id is not None and person_id != previous_id:
+                    id_switches += 1
+                wrong_target += not is_target
+                previous_id = person_id
+
+    ious = np.array(ious) if ious else np.zeros(1)
+    latencies = np.array(latencies) * 1000
+    return {
+        "mean_iou": float(ious.mean()),
+        "success": float((ious >= 0.5).mean()),
+        "id_switches": id_switches,
+        "wrong_target_frames": wrong_target,
+        "latency_ms": float(latencies.mean()),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+        "cpu_ms": float(np.mean(cpu_times) * 1000),
+    }
+
+def pareto_front(results):
+    """
+    Mark the configurations that no other configuration beats on all of
+    latency (lower), mean IoU (higher) and ID switches (lower).
+    """
+    def dominates(a, b):
+        no_worse = (a["latency_ms"] <= b["latency_ms"] and a["mean_iou"] >= b["mean_iou"]
+                    and a["id_switches"] <= b["id_switches"])
+        better = (a["latency_ms"] < b["latency_ms"] or a["mean_iou"] > b["mean_iou"]
+                  or a["id_switches"] < b["id_switches"])
+        return no_worse and better
+
+    for result in results:
+        result["pareto"] = not any(dominates(other, result) for other in results if other is not result)
+    return [r for r in results if r["pareto"]]
+
+def sweep(sequences, grids, show=False):
+    """Run every follower configuration of the grids over all the sequences."""
+    results = []
+    for name, grid in grids.items():
+        keys = list(grid)
+        for values in itertools.product(*(grid[k] for k in keys)):
+            settings = dict(zip(keys, values))
+            metrics = []
+            for frames, ground_truth in sequences:
+                # A new follower per sequence, so no tracking state leaks between them
+                metrics.append(evaluate(build(name, settings), frames, ground_truth, show))
+            result = {"follower": name, "settings": json.dumps(settings)}
+            result.update({k: float(np.mean([m[k] for m in metrics])) for k in metrics[0]})
+            results.append(result)
+            print(f"{name} {result['settings']}: IoU {result['mean_iou']:.3f}, "
+                  f"{result['id_switches']:.0f} ID switches, {result['latency_ms']:.1f} ms")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy versus latency sweep of the followers")
+    parser.add_argument("sequences", nargs="+", help="Recorded sequence directories")
+    parser.add_argument("--followers", nargs="+", default=["hog", "yolov4"], choices=sorted(FOLLOWERS),
+                        help="Followers to sweep with their default grids")
+    parser.add_argument("--grid", help='JSON file {"follower": {"setting": [values, ...]}} replacing --followers')
+    parser.add_argument("--output", default="pareto_results.csv", help="CSV file with all the results")
+    parser.add_argument("--min-iou", type=float, default=None, help="Required mean IoU for the recommendation")
+    parser.add_argument("--max-id-switches", type=float, default=None, help="Allowed ID switches for the recommendation")
+    parser.add_argument("--show", action="store_true", help="Keep the follower windows (slower)")
+    args = parser.parse_args()
+
+    if not args.show:
+        cv2.imshow = lambda *a, **k: None
+
+    if args.grid:
+        with open(args.grid) as f:
+            grids = json.load(f)
+    else:
+        grids = {name: DEFAULT_GRIDS[name] for name in args.followers}
+
+    sequences = [load_sequence(path) for path in args.sequences]
+    results = sweep(sequences, grids, args.show)
+    front = sorted(pareto_front(results), key=lambda r: r["latency_ms"])
+
+    with open(args.output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+
+    print("\nPareto-optimal configurations (fastest first):")
+    for r in front:
+        print(f"  {r['latency_ms']:7.1f} ms  IoU {r['mean_iou']:.3f}  success {r['success']:.2f}  "
+              f"ID switches {r['id_switches']:.0f}  CPU {r['cpu_ms']:.1f} ms  {r['follower']} {r['settings']}")
+
+    if args.min_iou is not None or args.max_id_switches is not None:
+        eligible = [r for r in front
+                    if (args.min_iou is None or r["mean_iou"] >= args.min_iou)
+                    and (args.max_id_switches is None or r["id_switches"] <= args.max_id_switches)]
+        if eligible:
+            r = eligible[0]
+            print(f"\nFastest configuration meeting the requirements: {r['follower']} {r['settings']} "
+                  f"({r['latency_ms']:.1f} ms, IoU {r['mean_iou']:.3f})")
+        else:
+            print("\nNo configuration meets the requirements.")
+    print(f"\nAll results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
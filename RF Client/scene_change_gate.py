@@ -0,0 +1,133 @@
+import time
+import cv2
+import numpy as np
+from follower import Follower
+
+class SceneChangeGate(Follower):
+    """
+    A pre-stage that sits in front of any follower and skips inference
+    when the frame has not changed since the last processed one.
+
+    The JPEG is decoded at 1/8 resolution in grayscale (cheap, the decoder
+    skips most of the IDCT work) and compared with the last processed
+    thumbnail. When the change is below the threshold the previous command
+    is returned without calling the wrapped follower.
+    """
+    # Default threshold of each method, they are not in the same unit
+    DEFAULT_THRESHOLDS = {"mad": 2.0, "blockhash": 0.05}
+
+    def __init__(self, follower, threshold=None, refresh_every=15, method="mad", block_size=8):
+        """
+        Initialize the scene change gate.
+
+        Args:
+            follower: The follower to run when the scene has changed
+            threshold: For "mad", the mean absolute difference (0-255) under which a
+                       frame is considered static (default 2.0). For "blockhash", the
+                       fraction of blocks (0.0 to 1.0) allowed to change (default 0.05).
+            refresh_every: Force a full inference at least every K frames
+            method: "mad" (mean absolute difference) or "blockhash"
+            block_size: Side of the blocks used by "blockhash", in thumbnail pixels
+        """
+        if method not in ("mad", "blockhash"):
+            raise ValueError(f"Unknown scene change method: {method}")
+
+        self.follower = follower
+        self.threshold = self.DEFAULT_THRESHOLDS[method] if threshold is None else threshold
+        self.refresh_every = refresh_every
+        self.method = method
+        self.block_size = block_size
+
+        self.prev_thumb = None
+        self.prev_hash = None
+        self.prev_command = "None|None"
+        self.frames_since_refresh = 0
+
+        # Statistics
+        self.frames = 0
+        self.skipped = 0
+        self.follower_cpu = 0.0
+        self.gate_cpu = 0.0
+
+    def _thumbnail(self, image_data):
+        """Decode the image at 1/8 scale in grayscale."""
+        if isinstance(image_data, np.ndarray) and image_data.ndim == 3:
+            # Already decoded by a DecodePipeline
+            h, w = image_data.shape[:2]
+            small = cv2.resize(image_data, (w // 8, h // 8), interpolation=cv2.INTER_AREA)
+            return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        buffer = np.frombuffer(image_data, dtype=np.uint8)
+        return cv2.imdecode(buffer, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+
+    def _block_hash(self, thumb):
+        """Average-hash of each block: one bit per block, above or below the frame mean."""
+        h, w = thumb.shape[:2]
+        bs = self.block_size
+        blocks = cv2.resize(thumb, (max(1, w // bs), max(1, h // bs)), interpolation=cv2.INTER_AREA)
+        return blocks > blocks.mean()
+
+    def _is_static(self, thumb):
+        """Return True if the thumbnail is close enough to the last processed one."""
+        if self.prev_thumb is None or thumb.shape != self.prev_thumb.shape:
+            return False
+
+        if self.method == "mad":
+            return cv2.norm(thumb, self.prev_thumb, cv2.NORM_L1) / thumb.size < self.threshold
+
+        changed = np.count_nonzero(self._block_hash(thumb) != self.prev_hash)
+        return changed / self.prev_hash.size <= self.threshold
+
+    def processImage(self, image_data):
+        """
+        Run the wrapped follower only if the scene changed or a refresh is due.
+
+        Args:
+            image_data: The raw image data to process (numpy array of bytes)
+
+        Returns:
+            str: The command of the wrapped follower (possibly reused)
+        """
+        self.frames += 1
+        gate_start = time.process_time()
+        thumb = self._thumbnail(image_data)
+
+        if (thumb is not None
+                and self.frames_since_refresh + 1 < self.refresh_every
+                and self._is_static(thumb)):
+            self.skipped += 1
+            self.frames_since_refresh += 1
+            self.gate_cpu += time.process_time() - gate_start
+            return self.prev_command
+
+        if thumb is not None:
+            self.prev_thumb = thumb
+            if self.method == "blockhash":
+                self.prev_hash = self._block_hash(thumb)
+        self.gate_cpu += time.process_time() - gate_start
+
+        follower_start = time.process_time()
+        self.prev_command = self.follower.processImage(image_data)
+        self.follower_cpu += time.process_time() - follower_start
+        self.frames_since_refresh = 0
+        return self.prev_command
+
+    def skip_rate(self):
+        """Fraction of frames for which inference was skipped."""
+        return self.skipped / self.frames if self.frames else 0.0
+
+    def cpu_saved(self):
+        """
+        Estimated CPU seconds saved: the average cost of a processed frame times
+        the number of skipped frames, minus the time spent in the gate itself.
+        """
+        processed = self.frames - self.skipped
+        if processed == 0:
+            return 0.0
+        return self.follower_cpu / processed * self.skipped - self.gate_cpu
+
+    def report(self):
+        """Return a one-line summary of the gate statistics."""
+        return (f"Scene gate: {self.skipped}/{self.frames} frames skipped "
+                f"({self.skip_rate() * 100:.1f}%), "
+                f"gate CPU {self.gate_cpu:.2f}s, "
+                f"estimated CPU saved {self.cpu_saved():.2f}s")
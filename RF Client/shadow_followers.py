@@ -0,0 +1,315 @@
+"""
+Shadow followers: evaluate other followers on the live feed without letting them drive the robot.
+
+The primary follower drives the robot as usual. Each shadow follower receives
+the same decoded frame, runs on its own worker thread (or process), and only
+has its command and latency logged. A shadow that is still busy when a new
+frame arrives skips that frame, so submitting a frame never waits for a shadow.
+
+In thread mode the shadows still share the GIL with the primary follower, so
+the Python parts of their work can delay it (OpenCV and numpy calls release
+the GIL). Only process mode keeps the shadows off the primary's path entirely.
+
+    python main.py --detector yolov4 --shadow hog cascade
+    python main_yolov11n.py --shadow yolov8 "appearance:match_threshold=0.8" --shadow-mode process
+"""
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import threading
+from multiprocessing import resource_tracker
+import time
+from multiprocessing import shared_memory
+import cv2
+import numpy as np
+from frame_buffers import FrameBuffers
+from pareto_benchmark import FOLLOWERS, build
+from telemetry import parse_command
+
+def parse_shadow_spec(spec):
+    """
+    Parse "name" or "name:setting=value,setting=value" (values in JSON, e.g. input_size=480).
+
+    Returns:
+        tuple: (label, follower name, settings dict)
+    """
+    name, _, options = spec.partition(":")
+    if name not in FOLLOWERS:
+        raise ValueError(f"Unknown follower {name!r}, choose from {', '.join(sorted(FOLLOWERS))}")
+    settings = {}
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        try:
+            settings[key] = json.loads(value)
+        except json.JSONDecodeError:
+            settings[key] = value
+    return spec, name, settings
+
+def _lower_priority():
+    """Lower the scheduling priority of the calling thread (Linux) or process, so the primary path keeps the CPU."""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+    except (AttributeError, OSError):
+        pass
+
+class _ShadowThread:
+    """A shadow follower on a worker thread, fed with read-only views of the primary's frames."""
+    def __init__(self, label, name, settings, results):
+        self.label = label
+        # Own arena: a FrameBuffers must not be shared between threads
+        self.follower = build(name, settings, buffers=FrameBuffers())
+        self.results = results
+        self.condition = threading.Condition()
+        self.pending = None
+        self.busy = False
+        self.running = True
+        self.skipped = 0
+        self.thread = threading.Thread(target=self._run, name=f"shadow-{name}", daemon=True)
+        self.thread.start()
+
+    def submit(self, frame_index, image):
+        with self.condition:
+            if self.busy or self.pending is not None:
+                self.skipped += 1
+                return
+            self.pending = (frame_index, image)
+            self.condition.notify()
+
+    def _run(self):
+        _lower_priority()
+        while True:
+            with self.condition:
+                while self.pending is None and self.running:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                (frame_index, image), self.pending = self.pending, None
+                self.busy = True
+            start = time.perf_counter()
+            try:
+                command = self.follower.processImage(image)
+            except Exception as e:
+                command = f"ERROR: {e}"
+            self.results.append((frame_index, self.label, command, (time.perf_counter() - start) * 1000))
+            with self.condition:
+                self.busy = False
+
+    def close(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join(timeout=5)
+
+def _attach_shared_memory(name):
+    """
+    Attach to the parent's shared memory block without registering it with the
+    resource tracker: the parent owns and unlinks the block. Before Python 3.13
+    (no track=False), a registration from the child would make the tracker warn
+    about a leak or unlink the block early; unregistering afterwards is not an
+    option either, since a spawned child shares the parent's tracker and would
+    remove the parent's own registration.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+def _shadow_process_main(name, settings, connection):
+    """Worker process: build the follower, then process the frames found in shared memory."""
+    cv2.imshow = lambda *args, **kwargs: None
+    cv2.waitKey = lambda *args, **kwargs: -1
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+    follower = build(name, settings)
+    connection.send("ready")
+    memory = None
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        frame_index, memory_name, shape = message
+        if memory is None or memory.name != memory_name:
+            if memory is not None:
+                memory.close()
+            memory = _attach_shared_memory(memory_name)
+        # View on the shared frame, no copy
+        image = np.ndarray(shape, dtype=np.uint8, buffer=memory.buf)
+        image.flags.writeable = False
+        start = time.perf_counter()
+        try:
+            command = follower.processImage(image)
+        except Exception as e:
+            command = f"ERROR: {e}"
+        connection.send((frame_index, command, (time.perf_counter() - start) * 1000))
+        del image
+    if memory is not None:
+        memory.close()
+
+class _ShadowProcess:
+    """
+    A shadow follower in its own process. A feeder thread writes the frame into
+    a shared memory block that the process maps as an array (one copy per
+    accepted frame, no pickling) and waits for the result, so neither the copy
+    nor the pipe is on the primary's path; frames arriving while the shadow is
+    busy are skipped.
+    """
+    def __init__(self, label, name, settings, results):
+        self.label = label
+        self.results = results
+        self.memory = None
+        self.condition = threading.Condition()
+        self.pending = None
+        self.busy = False
+        self.running = True
+        self.skipped = 0
+        context = multiprocessing.get_context("spawn")
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_shadow_process_main, args=(name, settings, child),
+                                       name=f"shadow-{name}", daemon=True)
+        # The client scripts run at module level: hide the main script from the spawned
+        # process, which would otherwise run it again as __mp_main__
+        main = sys.modules["__main__"]
+        main_file = main.__dict__.pop("__file__", None)
+        try:
+            self.process.start()
+        finally:
+            if main_file is not None:
+                main.__file__ = main_file
+        # Only the process holds the child end now, so recv() fails once the process is gone
+        child.close()
+        self.connection.recv()  # wait until the model is loaded
+        self.thread = threading.Thread(target=self._feed, name=f"shadow-feed-{name}", daemon=True)
+        self.thread.start()
+
+    def submit(self, frame_index, image):
+        with self.condition:
+            if self.busy or self.pending is not None:
+                self.skipped += 1
+                return
+            self.pending = (frame_index, image)
+            self.condition.notify()
+
+    def _feed(self):
+        _lower_priority()
+        while True:
+            with self.condition:
+                while self.pending is None and self.running:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                (frame_index, image), self.pending = self.pending, None
+                self.busy = True
+            if self.memory is None or self.memory.size < image.nbytes:
+                if self.memory is not None:
+                    self.memory.close()
+                    self.memory.unlink()
+                self.memory = shared_memory.SharedMemory(create=True, size=image.nbytes)
+            np.copyto(np.ndarray(image.shape, dtype=np.uint8, buffer=self.memory.buf), image)
+            try:
+                self.connection.send((frame_index, self.memory.name, image.shape))
+                frame_index, command, latency = self.connection.recv()
+            except (EOFError, OSError):
+                # The shadow process died: its frames are no longer processed
+                return
+            self.results.append((frame_index, self.label, command, latency))
+            with self.condition:
+                self.busy = False
+
+    def close(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        # Lets the frame in flight finish
+        self.thread.join(timeout=5)
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.thread.join(timeout=1)
+        if self.memory is not None and not self.thread.is_alive():
+            self.memory.close()
+            self.memory.unlink()
+
+class ShadowFollowers:
+    """
+    Runs shadow followers next to the primary follower and logs their
+    commands and latencies for comparison. Their commands are never sent.
+    """
+    def __init__(self, specs, mode="thread", log_path="shadow_log.csv"):
+        """
+        Args:
+            specs: Shadow follower specs, "name" or "name:setting=value,..." (see pareto_benchmark.FOLLOWERS)
+            mode: "thread" (zero-copy read-only views, shares the GIL with the primary)
+                or "process" (shared memory, no GIL contention)
+            log_path: CSV file with one line per processed frame and follower
+        """
+        self.log_path = log_path
+        self.results = []  # (frame_index, label, command, latency_ms), list.append is thread-safe
+        worker = _ShadowThread if mode == "thread" else _ShadowProcess
+        self.shadows = []
+        for spec in specs:
+            label, name, settings = parse_shadow_spec(spec)
+            print(f"[shadow] Starting {label} ({mode})")
+            self.shadows.append(worker(label, name, settings, self.results))
+
+        if mode == "thread":
+            # HighGUI windows only work from the main thread, and a shadow's window
+            # would replace the primary's one with the same name
+            show = cv2.imshow
+            main_thread = threading.main_thread()
+            cv2.imshow = lambda *args, **kwargs: (show(*args, **kwargs)
+                                                  if threading.current_thread() is main_thread else None)
+
+    def submit(self, frame_index, image):
+        """Hand the decoded frame to every shadow that is idle. Never waits."""
+        view = image.view()
+        view.flags.writeable = False
+        for shadow in self.shadows:
+            shadow.submit(frame_index, view)
+
+    def record_primary(self, frame_index, command, latency_ms):
+        self.results.append((frame_index, "primary", command, latency_ms))
+
+    def close(self):
+        """Stop the shadows, write the log and return the comparison report."""
+        for shadow in self.shadows:
+            shadow.close()
+        rows = sorted(self.results, key=lambda r: (r[0], r[1] != "primary"))
+        with open(self.log_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "follower", "command", "latency_ms"])
+            writer.writerows((frame, label, command, f"{latency:.2f}") for frame, label, command, latency in rows)
+        return self.report(rows)
+
+    def report(self, rows):
+        primary = {frame: parse_command(command) for frame, label, command, _ in rows if label == "primary"}
+        lines = [f"Shadow followers (log: {self.log_path}):"]
+        for label, skipped in [("primary", 0)] + [(s.label, s.skipped) for s in self.shadows]:
+            mine = [(frame, command, latency) for frame, l, command, latency in rows if l == label]
+            if not mine:
+                lines.append(f"  {label}: no frame processed")
+                continue
+            latencies = np.array([latency for _, _, latency in mine])
+            line = (f"  {label}: {len(mine)} frames ({skipped} skipped), "
+                    f"latency {latencies.mean():.1f} ms (p95 {np.percentile(latencies, 95):.1f} ms)")
+            if label != "primary":
+                # Agreement with the primary's command on the same frames
+                pairs = [(parse_command(command), primary[frame]) for frame, command, _ in mine if frame in primary]
+                same_target = [(a[0] is None) == (b[0] is None) for a, b in pairs]
+                dx = [abs(a[0] - b[0]) for a, b in pairs if a[0] is not None and b[0] is not None]
+                dy = [abs(a[1] - b[1]) for a, b in pairs if a[1] is not None and b[1] is not None]
+                line += f", same detection state {np.mean(same_target) * 100:.0f}%" if pairs else ""
+                line += f", |dx| {np.mean(dx):.0f} px, |dy| {np.mean(dy):.0f} px" if dx and dy else ""
+            lines.append(line)
+        return "\n".join(lines)
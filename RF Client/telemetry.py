@@ -0,0 +1,149 @@
+import math
+import mmap
+import socket
+import struct
+import time
+from collections import namedtuple
+
+# frame id, timestamp, target box (x, y, w, h, -1 if none), confidence,
+# horizontal and vertical distance (NO_DISTANCE if none),
+# receive / process / send / total timings in milliseconds
+RECORD = struct.Struct("<Id4hf2i4f")
+NO_DISTANCE = -2**31
+TelemetryRecord = namedtuple("TelemetryRecord", [
+    "frame_id", "timestamp", "box", "confidence", "dx", "dy",
+    "receive_ms", "process_ms", "send_ms", "total_ms"])
+
+# Ring buffer file: write count (uint64) followed by the record slots
+RING_HEADER = struct.Struct("<Q")
+
+def parse_command(command):
+    """Return the (dx, dy) distances of a "distance#X|distance#Y" command, None where missing."""
+    values = []
+    for part in command.split("|")[:2]:
+        _, _, value = part.partition("#")
+        values.append(int(value) if value.lstrip("-").isdigit() else None)
+    values += [None] * (2 - len(values))
+    return tuple(values)
+
+def pack_record(frame_id, command, box=None, confidence=None, timings=None):
+    """Encode one frame's telemetry as a fixed-size binary record."""
+    dx, dy = parse_command(command)
+    x, y, w, h = (int(v) for v in box) if box is not None else (-1, -1, -1, -1)
+    timings = timings or {}
+    return RECORD.pack(
+        frame_id & 0xFFFFFFFF, time.time(), x, y, w, h,
+        math.nan if confidence is None else float(confidence),
+        NO_DISTANCE if dx is None else dx, NO_DISTANCE if dy is None else dy,
+        *(timings.get(k, math.nan) for k in ("receive_ms", "process_ms", "send_ms", "total_ms")))
+
+def unpack_record(data):
+    """Decode a binary record into a TelemetryRecord."""
+    frame_id, timestamp, x, y, w, h, confidence, dx, dy, *timings = RECORD.unpack(data)
+    return TelemetryRecord(
+        frame_id, timestamp, None if w < 0 else (x, y, w, h), confidence,
+        None if dx == NO_DISTANCE else dx, None if dy == NO_DISTANCE else dy, *timings)
+
+class TelemetryPublisher:
+    """
+    Streams one compact record per frame, off the control path.
+
+    Targets:
+      - "udp://host:port": one datagram per record on a non-blocking socket,
+      - "ring:path[:slots]": a memory-mapped ring buffer file that a viewer polls.
+
+    Publishing never blocks and never raises: when the socket buffer is full,
+    or the send fails for any other reason, the record is dropped and counted. The ring buffer overwrites the oldest records.
+    """
+    def __init__(self, target):
+        self.target = target
+        self.dropped = 0
+        self.sent = 0
+        self.sock = None
+        self.ring = None
+
+        if target.startswith("udp://"):
+            host, port = target[len("udp://"):].rsplit(":", 1)
+            self.address = (host, int(port))
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.setblocking(False)
+        elif target.startswith("ring:"):
+            path, _, slots = target[len("ring:"):].partition(":")
+            self.slots = int(slots) if slots else 1024
+            size = RING_HEADER.size + self.slots * RECORD.size
+            with open(path, "wb") as f:
+                f.truncate(size)
+            self.file = open(path, "r+b")
+            self.ring = mmap.mmap(self.file.fileno(), size)
+            self.count = 0
+        else:
+            raise ValueError(f"Unknown telemetry target: {target}")
+
+    def publish(self, frame_id, command, box=None, confidence=None, timings=None):
+        """Publish the record of one frame. Never blocks, drops under backpressure."""
+        record = pack_record(frame_id, command, box, confidence, timings)
+        if self.sock is not None:
+            try:
+                self.sock.sendto(record, self.address)
+                self.sent += 1
+            except OSError:
+                # Full buffer, no listener, or any other send error (ENOBUFS, EMSGSIZE...):
+                # the record is dropped, the control loop goes on
+                self.dropped += 1
+        else:
+            offset = RING_HEADER.size + (self.count % self.slots) * RECORD.size
+            self.ring[offset:offset + RECORD.size] = record
+            self.count += 1
+            # The count is written last, so a reader never sees a half-written slot as new
+            self.ring[:RING_HEADER.size] = RING_HEADER.pack(self.count)
+            self.sent += 1
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+        if self.ring is not None:
+            self.ring.close()
+            self.file.close()
+
+class TelemetryReader:
+    """Reads the records of a TelemetryPublisher target (used by the viewer)."""
+    def __init__(self, target):
+        self.sock = None
+        if target.startswith("udp://"):
+            host, port = target[len("udp://"):].rsplit(":", 1)
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.bind((host, int(port)))
+            self.sock.settimeout(0.1)
+        elif target.startswith("ring:"):
+            path = target[len("ring:"):].partition(":")[0]
+            self.file = open(path, "rb")
+            self.ring = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.slots = (len(self.ring) - RING_HEADER.size) // RECORD.size
+            self.read_count = RING_HEADER.unpack(self.ring[:RING_HEADER.size])[0]
+        else:
+            raise ValueError(f"Unknown telemetry target: {target}")
+
+    def read(self):
+        """Return the records received since the last call (possibly empty)."""
+        if self.sock is not None:
+            records = []
+            try:
+                while True:
+                    data, _ = self.sock.recvfrom(RECORD.size)
+                    records.append(unpack_record(data))
+                    self.sock.setblocking(False)
+            except (BlockingIOError, socket.timeout):
+                self.sock.settimeout(0.1)
+            return records
+
+        count = RING_HEADER.unpack(self.ring[:RING_HEADER.size])[0]
+        # If the writer lapped us, skip to the oldest record still in the ring
+        start = max(self.read_count, count - self.slots)
+        records = []
+        for index in range(start, count):
+            offset = RING_HEADER.size + (index % self.slots) * RECORD.size
+            records.append(unpack_record(self.ring[offset:offset + RECORD.size]))
+        self.read_count = count
+        if not records:
+            time.sleep(0.01)
+        return records
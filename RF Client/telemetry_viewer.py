@@ -0,0 +1,72 @@
+"""
+Renders the follower overlays from the telemetry stream, in a separate process.
+
+The client only publishes compact telemetry records (see telemetry.py); this
+viewer draws the target box, the bounds and the commands over the frames
+recorded by `main.py --record DIR`, so visualization is off the control path.
+
+    python main.py --headless --record recordings/live --telemetry udp://127.0.0.1:2739
+    python telemetry_viewer.py udp://127.0.0.1:2739 --frames recordings/live
+"""
+import argparse
+import math
+import os
+import cv2
+import numpy as np
+from telemetry import TelemetryReader
+from control_geometry import control_geometry
+
+def draw_overlay(image, record, min_bound, max_bound, left_bound, right_bound):
+    """Draw the bounds, the target box and the telemetry text of one record."""
+    height, width = image.shape[:2]
+    control_geometry(width, height, min_bound, max_bound, left_bound, right_bound).draw(image)
+
+    if record.box is not None:
+        x, y, w, h = record.box
+        cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        if not math.isnan(record.confidence):
+            cv2.putText(image, f"Person: {record.confidence:.2f}", (x, y - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+
+    lines = [
+        f"frame {record.frame_id}  dx {record.dx}  dy {record.dy}",
+        f"receive {record.receive_ms:.1f} ms  process {record.process_ms:.1f} ms  "
+        f"send {record.send_ms:.1f} ms  total {record.total_ms:.1f} ms",
+    ]
+    for i, text in enumerate(lines):
+        cv2.putText(image, text, (10, 25 + 25 * i), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Follower telemetry viewer")
+    parser.add_argument("target", help="udp://host:port or ring:path, as given to main.py --telemetry")
+    parser.add_argument("--frames", default=None, help="Directory of the frames recorded by main.py --record")
+    parser.add_argument("--min-bound", type=float, default=0.5)
+    parser.add_argument("--max-bound", type=float, default=0.8)
+    parser.add_argument("--left-bound", type=float, default=0.4)
+    parser.add_argument("--right-bound", type=float, default=0.6)
+    args = parser.parse_args()
+
+    reader = TelemetryReader(args.target)
+    blank = np.zeros((1024, 1024, 3), np.uint8)
+
+    while True:
+        records = reader.read()
+        if records:
+            # Only the newest record is drawn, the viewer never falls behind the client
+            record = records[-1]
+            image = None
+            if args.frames:
+                image = cv2.imread(os.path.join(args.frames, f"frame_{record.frame_id:06d}.jpg"))
+            if image is None:
+                image = blank.copy()
+            draw_overlay(image, record, args.min_bound, args.max_bound, args.left_bound, args.right_bound)
+            cv2.imshow("Follower Telemetry", image)
+
+        key = cv2.waitKey(1) & 0xFF
+        if key == ord('q') or key == 27:
+            break
+
+    cv2.destroyAllWindows()
+
+if __name__ == "__main__":
+    main()
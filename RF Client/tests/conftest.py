@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The client modules are flat scripts in the parent directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,47 @@
+import numpy as np
+from adaptive_input import AdaptiveInputSize
+
+class StubDetector:
+    """Finds a person at (5, 5, 20, 40) in every image."""
+    def __init__(self):
+        self.calls = []
+
+    def detect(self, images, input_size):
+        self.calls.append(([image.shape[:2] for image in images], input_size))
+        return [([[5, 5, 20, 40]], [0.8]) for _ in images]
+
+def test_tiles_cover_the_image_with_overlap():
+    policy = AdaptiveInputSize(tile_grid=2, tile_overlap=0.2)
+    tiles = policy.tiles(1000, 1000)
+    assert len(tiles) == 4
+    assert tiles[0][:2] == [0, 0] and tiles[-1][0] + tiles[-1][2] == 1000
+    assert tiles[0][2] > 500
+
+def test_plan_follows_the_target_size():
+    policy = AdaptiveInputSize()
+    assert policy.plan(1024, 1024)[1] == policy.base_size and policy.mode == "tiles"
+    policy.update((400, 100, 300, 600))
+    assert policy.plan(1024, 1024) == ([[0, 0, 1024, 1024]], policy.small_size)
+    policy.update((500, 500, 30, 60))
+    regions, size = policy.plan(1024, 1024)
+    assert policy.mode == "crop" and size == policy.base_size
+    assert regions == [policy.crop_around((500, 500, 30, 60), 1024, 1024)]
+    policy.update((400, 300, 100, 300))
+    assert policy.plan(1024, 1024) == ([[0, 0, 1024, 1024]], policy.base_size)
+
+def test_crop_stays_inside_the_image():
+    policy = AdaptiveInputSize(crop_scale=4.0)
+    assert policy.crop_around((1000, 1000, 10, 20), 1024, 1024) == [944, 944, 80, 80]
+
+def test_detect_maps_tile_boxes_back_to_the_image():
+    policy = AdaptiveInputSize(tile_grid=2)
+    detector = StubDetector()
+    boxes, confidences = policy.detect(detector, np.zeros((1000, 1000, 3), np.uint8))
+    origins = {(x - 5, y - 5) for x, y, _, _ in boxes}
+    assert origins == {(t[0], t[1]) for t in policy.tiles(1000, 1000)}
+    assert detector.calls[0][1] == policy.base_size
+    assert policy.average_input_pixels() == 4 * policy.base_size ** 2
+
+def test_for_ultralytics_uses_the_640_base():
+    policy = AdaptiveInputSize.for_ultralytics(tile_grid=3)
+    assert (policy.small_size, policy.base_size, policy.tile_grid) == (416, 640, 3)
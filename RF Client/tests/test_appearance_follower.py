@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+import cv2
+import numpy as np
+import pytest
+from appearance_follower import AppearanceFollower, appearance_signature
+from frame_buffers import FrameBuffers
+
+def person(shirt, pants, size=(120, 50)):
+    h, w = size
+    roi = np.empty((h, w, 3), np.uint8)
+    roi[:h // 2] = shirt
+    roi[h // 2:] = pants
+    return roi
+
+class StubModel:
+    """Stands in for the YOLO model: returns fixed person boxes."""
+    yaml = {"version": "stub"}
+
+    def __init__(self, xyxy):
+        self.xyxy = np.asarray(xyxy, np.float32)
+
+    def __call__(self, image, **kwargs):
+        boxes = SimpleNamespace(xyxy=SimpleNamespace(cpu=lambda: SimpleNamespace(numpy=lambda: self.xyxy)))
+        return [SimpleNamespace(boxes=boxes)]
+
+def matcher(anchor_roi, match_threshold=0.75, update_every=2):
+    """An AppearanceFollower locked on anchor_roi (green shirt), with a stub model."""
+    follower = AppearanceFollower(match_threshold=match_threshold, gallery_size=3, update_every=update_every,
+                                  buffers=FrameBuffers(), model=StubModel(np.empty((0, 4))))
+    image = np.zeros(anchor_roi.shape, np.uint8)
+    image[:] = anchor_roi
+    h, w = anchor_roi.shape[:2]
+    # The first lock goes through the green_ratio scoring
+    box, score = follower.select_box(image, np.array([[0, 0, w, h]], int))
+    assert follower.anchor is not None and score == 1.0
+    return follower
+
+def test_signature_is_normalized_and_size_independent():
+    near = appearance_signature(person((0, 180, 0), (90, 40, 20), size=(300, 120)))
+    far = appearance_signature(person((0, 180, 0), (90, 40, 20), size=(60, 24)))
+    assert near.sum() == pytest.approx(1.0, abs=1e-4)
+    assert np.sqrt(near) @ np.sqrt(far) > 0.95
+
+def test_signature_of_a_tiny_box_is_none():
+    assert appearance_signature(np.zeros((3, 10, 3), np.uint8)) is None
+
+def test_the_box_matching_the_gallery_is_selected():
+    target = person((0, 180, 0), (90, 40, 20))
+    other = person((0, 0, 200), (200, 200, 200))
+    image = np.zeros((200, 200, 3), np.uint8)
+    image[0:120, 0:50] = other
+    image[0:120, 100:150] = target
+    follower = matcher(target)
+    box, score = follower.select_box(image, np.array([[0, 0, 50, 120], [100, 0, 150, 120]], int))
+    assert tuple(box) == (100, 0, 150, 120)
+    assert score > follower.match_threshold
+
+def test_gallery_grows_every_update_period():
+    target = person((0, 180, 0), (90, 40, 20))
+    image = np.zeros((200, 200, 3), np.uint8)
+    image[0:120, 100:150] = target
+    follower = matcher(target, update_every=2)
+    boxes = np.array([[100, 0, 150, 120]], int)
+    for _ in range(9):
+        follower.select_box(image, boxes)
+    assert follower.matched_frames == 9
+    # 4 updates, bounded by the gallery size
+    assert len(follower.gallery) == 3
+    assert follower.gallery_matrix().shape == (4, follower.anchor.size)
+
+def test_process_image_follows_the_matched_person(monkeypatch):
+    monkeypatch.setattr(cv2, "imshow", lambda *args, **kwargs: None)
+    target = person((0, 180, 0), (90, 40, 20))
+    other = person((0, 0, 200), (200, 200, 200))
+    image = np.zeros((400, 400, 3), np.uint8)
+    image[100:220, 20:70] = other
+    image[100:220, 300:350] = target
+    follower = AppearanceFollower(model=StubModel([[20, 100, 70, 220], [300, 100, 350, 220]]),
+                                  buffers=FrameBuffers())
+    command = follower.processImage(image)
+    assert follower.target_box == (300, 100, 50, 120)
+    assert command.startswith("distance#")
+    # Same person after the lock, even when it is listed first
+    follower.model = StubModel([[300, 100, 350, 220], [20, 100, 70, 220]])
+    follower.processImage(image)
+    assert follower.target_box == (300, 100, 50, 120)
@@ -0,0 +1,59 @@
+import os
+import numpy as np
+import pytest
+from bounded_follower_hog import BoundedFollowerHog
+from shadow_followers import _ShadowThread
+
+def test_smallest_level_holds_one_window_for_the_largest_people():
+    follower = BoundedFollowerHog(max_bound=0.8)
+    win_w, win_h = follower.hog.winSize
+    scales = follower.pyramid_scales(*follower.height_band(400), roi_size=(400, 400))
+    assert round(400 * min(scales)) >= win_h
+    # A close person: without the clamp, the smallest levels are shorter than the window
+    follower.last_box = (50, 50, 150, 300)
+    rx, ry, rw, rh = follower.search_region(400, 400)
+    unclamped = follower.pyramid_scales(*follower.height_band(400))
+    assert round(rh * min(unclamped)) < win_h
+    clamped = follower.pyramid_scales(*follower.height_band(400), roi_size=(rw, rh))
+    assert round(rh * min(clamped)) >= win_h
+
+def test_small_search_region_gets_an_upscaled_level():
+    follower = BoundedFollowerHog()
+    follower.last_box = (100, 100, 20, 40)
+    rx, ry, rw, rh = follower.search_region(400, 400)
+    scales = follower.pyramid_scales(*follower.height_band(400), roi_size=(rw, rh))
+    win_w, win_h = follower.hog.winSize
+    assert all(round(rw * s) >= win_w and round(rh * s) >= win_h for s in scales)
+
+def test_search_region_is_clipped_around_the_last_box():
+    follower = BoundedFollowerHog(search_margin=1.0)
+    assert follower.search_region(400, 300) == (0, 0, 400, 300)
+    follower.last_box = (10, 20, 50, 100)
+    assert follower.search_region(400, 300) == (0, 0, 110, 170)
+
+def test_height_band_follows_the_last_box():
+    follower = BoundedFollowerHog(min_bound=0.5, max_bound=0.8)
+    assert follower.height_band(400) == pytest.approx((100, 320))
+    follower.last_box = (0, 0, 50, 100)
+    assert follower.height_band(400) == pytest.approx((70, 140))
+
+def test_shadow_levels_run_on_their_own_lowered_pool():
+    primary = BoundedFollowerHog()
+    results = []
+    shadow = _ShadowThread("hog", "hog", {}, results)
+    try:
+        assert shadow.follower.executor is not primary.executor
+        shadow.submit(0, np.zeros((256, 256, 3), np.uint8))
+        for _ in range(500):
+            if results:
+                break
+            shadow.thread.join(timeout=0.01)
+        assert results
+        workers = list(shadow.follower.executor._threads)
+        assert workers
+        # Started from the shadow thread, the workers inherit its lowered priority
+        if hasattr(os, "getpriority"):
+            base = os.getpriority(os.PRIO_PROCESS, 0)
+            assert all(os.getpriority(os.PRIO_PROCESS, t.native_id) > base for t in workers)
+    finally:
+        shadow.close()
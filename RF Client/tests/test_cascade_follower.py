@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+import pytest
+from cascade_follower import CascadeFollower, box_iou
+
+@pytest.fixture(autouse=True)
+def no_window(monkeypatch):
+    monkeypatch.setattr(cv2, "imshow", lambda *args, **kwargs: None)
+
+class StubVerifier:
+    """Finds one person at the same position in every image it is given."""
+    model_ready = True
+
+    def __init__(self):
+        self.calls = []
+
+    def detect(self, images, input_size):
+        self.calls.append((len(images), input_size))
+        return [([[10, 10, 40, 80]], [0.9]) for _ in images]
+
+def test_box_iou():
+    assert box_iou([0, 0, 10, 10], [0, 0, 10, 10]) == 1.0
+    assert box_iou([0, 0, 10, 10], [20, 20, 5, 5]) == 0.0
+    assert box_iou([0, 0, 10, 10], [5, 0, 10, 10]) == pytest.approx(1 / 3)
+
+def test_missing_verifier_model_returns_an_error_command():
+    verifier = StubVerifier()
+    verifier.model_ready = False
+    command = CascadeFollower(verifier).processImage(np.zeros((64, 64, 3), np.uint8))
+    assert command.startswith("ERROR")
+    assert verifier.calls == []
+
+def test_overlapping_crops_give_one_box():
+    follower = CascadeFollower(StubVerifier())
+    image = np.zeros((512, 512, 3), np.uint8)
+    boxes, confidences = follower.verify_regions(image, [[0, 0, 200, 200], [4, 4, 200, 200]])
+    assert len(boxes) == 1 and confidences == [0.9]
+    # Separate crops keep their boxes
+    boxes, _ = follower.verify_regions(image, [[0, 0, 200, 200], [300, 300, 200, 200]])
+    assert len(boxes) == 2
+
+def test_verified_box_prunes_the_hog_stage():
+    follower = CascadeFollower(StubVerifier(), proposal_dimension=256)
+    image = np.zeros((512, 512, 3), np.uint8)
+    follower.processImage(image)
+    assert follower.last_box == [10, 10, 40, 80]
+    follower.processImage(image)
+    # The HOG stage works on the half-size proposal image
+    assert follower.hog.last_box == [5, 5, 20, 40]
+
+def test_full_frame_pass_when_nothing_is_proposed():
+    verifier = StubVerifier()
+    follower = CascadeFollower(verifier, proposals=("tracked",), full_frame_every=30)
+    image = np.zeros((512, 512, 3), np.uint8)
+    follower.processImage(image)
+    follower.processImage(image)
+    # First frame: nothing to propose, full frame; second: the tracked box is verified as a crop
+    assert verifier.calls == [(1, follower.full_input_size), (1, follower.crop_input_size)]
+    assert follower.full_frames == 1
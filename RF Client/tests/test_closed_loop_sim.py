@@ -0,0 +1,77 @@
+import math
+import pytest
+from closed_loop_sim import Camera, RobotControllerModel, RobotPhysicsModel, Simulation, move_towards
+
+def controller():
+    return RobotControllerModel(RobotPhysicsModel())
+
+def test_move_towards():
+    assert move_towards(0.0, 1.0, 0.25) == 0.25
+    assert move_towards(0.0, -1.0, 0.25) == -0.25
+    assert move_towards(0.9, 1.0, 0.25) == 1.0
+
+def test_movement_dead_band_and_none_stop_the_robot():
+    model = controller()
+    model.physics.speed_command = 0.1
+    model.process_command("distance#0|distance#45")
+    assert model.physics.speed_command == 0.0
+    model.physics.speed_command = 0.1
+    model.process_command("None|None")
+    assert model.physics.speed_command == 0.0 and model.physics.steering_command == 0.0
+    # Malformed commands are ignored, like in RobotController
+    model.physics.speed_command = 0.1
+    model.process_command("distance#0")
+    assert model.physics.speed_command == 0.1
+
+def test_movement_is_rate_limited_and_clamped():
+    model = controller()
+    # Person too far (top of the box below the desired line): drive forward
+    model.process_command("distance#511|distance#-1000")
+    assert model.physics.speed_command == pytest.approx(0.3 * 0.02)
+    for _ in range(100):
+        model.process_command("distance#511|distance#-1000")
+        assert model.physics.speed_command <= 0.15
+    assert model.physics.speed_command == pytest.approx(0.15)
+
+    model = controller()
+    model.process_command("distance#511|distance#100")
+    # kp * 0.4 * error + kd * 1.2 * derivative is clamped to -0.15, then limited to 0.3 * dt
+    assert model.physics.speed_command == pytest.approx(-0.3 * 0.02)
+    model.process_command("distance#511|distance#100")
+    assert model.physics.speed_command == pytest.approx(-0.012)
+
+def test_rotation_pd_and_dead_band():
+    model = controller()
+    model.process_command("distance#100|distance#45")
+    # error = (0 - 100) * 0.01, derivative = error / dt
+    assert model.physics.steering_command == pytest.approx(0.6 * -1.0 + 0.01 * -1.0 / 0.02)
+    model.process_command("distance#100|distance#45")
+    assert model.physics.steering_command == pytest.approx(-0.6)
+    model.process_command("distance#510|distance#45")
+    assert model.physics.steering_command == 0.0
+
+def test_physics_speed_and_heading():
+    physics = RobotPhysicsModel()
+    physics.speed_command = 0.15
+    for _ in range(500):
+        physics.fixed_update(0.02)
+    # 0.15 / max_speed of the 12000 rpm motor, 3 cm wheels
+    assert physics.current_speed == pytest.approx(0.1 * 12000 / 60 * 2 * math.pi * 0.03)
+    assert physics.x == pytest.approx(0.0) and physics.z > 0
+    physics.steering_command = 1.0
+    physics.fixed_update(0.02)
+    physics.fixed_update(0.02)
+    assert physics.yaw > 0 and physics.x > 0
+
+def test_stop_distance_is_in_the_dead_band():
+    sim = Simulation()
+    assert sim.desired_distance == pytest.approx(1.88, abs=0.01)
+    box = sim.camera.person_box((0.0, 0.0, 0.0), 0.0, sim.desired_distance)
+    distance = int(sim.geometry.command(*box).split("|")[1].split("#")[1])
+    assert 40 <= distance <= 50
+
+def test_person_box_outside_the_view():
+    camera = Camera()
+    assert camera.person_box((0.0, 0.0, 0.0), 0.0, -2.0) is None
+    assert camera.person_box((0.0, 0.0, 0.0), 10.0, 2.0) is None
+    assert camera.person_box((0.0, 0.0, 0.0), 0.0, 4.0) is not None
@@ -0,0 +1,48 @@
+import socket
+import struct
+from command_scheduler import CommandScheduler, format_command
+
+def test_format_command():
+    assert format_command(-12.6, 3.4) == "distance#-13|distance#3"
+    assert format_command(None, 5) == "None|distance#5"
+    assert format_command(None, None) == "None|None"
+
+def test_no_detection_stops_the_robot():
+    scheduler = CommandScheduler(None, max_age=0.5)
+    assert scheduler.current_command(0.0) == "None|None"
+    scheduler.update("distance#10|distance#20", timestamp=1.0)
+    assert scheduler.current_command(1.5) == "distance#10|distance#20"
+    assert scheduler.current_command(1.51) == "None|None"
+
+def test_extrapolation_from_the_last_two_detections():
+    scheduler = CommandScheduler(None, max_prediction=0.2)
+    scheduler.update("distance#100|distance#50", timestamp=1.0)
+    scheduler.update("distance#110|distance#40", timestamp=1.1)
+    assert scheduler.current_command(1.1) == "distance#110|distance#40"
+    assert scheduler.current_command(1.15) == "distance#115|distance#35"
+    # The extrapolation is capped at max_prediction
+    assert scheduler.current_command(1.4) == "distance#130|distance#20"
+
+def test_hold_without_prediction_or_previous_distance():
+    scheduler = CommandScheduler(None, predict=False)
+    scheduler.update("distance#100|distance#50", timestamp=1.0)
+    scheduler.update("distance#110|distance#40", timestamp=1.1)
+    assert scheduler.current_command(1.2) == "distance#110|distance#40"
+
+    scheduler = CommandScheduler(None)
+    scheduler.update("None|None", timestamp=1.0)
+    scheduler.update("distance#110|distance#40", timestamp=1.1)
+    assert scheduler.current_command(1.2) == "distance#110|distance#40"
+
+def test_commands_are_sent_with_the_size_prefix():
+    server, client = socket.socketpair()
+    scheduler = CommandScheduler(client, rate=100.0)
+    scheduler.update("distance#1|distance#2")
+    scheduler.start()
+    size = struct.unpack("I", server.recv(4, socket.MSG_WAITALL))[0]
+    command = server.recv(size, socket.MSG_WAITALL).decode("utf-8")
+    scheduler.stop()
+    server.close()
+    client.close()
+    assert command == "distance#1|distance#2"
+    assert scheduler.sent >= 1
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+import control_geometry
+from control_geometry import ControlGeometry, control_geometry as cached_geometry
+
+def check_bounds(width, height, min_bound, max_bound, left_bound, right_bound, x, y, w, h):
+    """The original BoundedFollower.check_bounds command, without the drawing."""
+    left_bound_x = int(width * left_bound)
+    right_bound_x = int(width * right_bound)
+    horizontal = int((left_bound_x + right_bound_x) / 2) - (x + int(w / 2))
+    min_rect_y = int((height - int(height * min_bound)) / 2)
+    max_rect_y = int((height - int(height * max_bound)) / 2)
+    vertical = int((min_rect_y + max_rect_y) / 2) - y
+    return f"distance#{horizontal}|distance#{vertical}"
+
+BOUNDS = [(0.5, 0.8, 0.4, 0.6), (0.45, 0.75, 0.35, 0.65), (0.33, 0.91, 0.1, 0.7)]
+SIZES = [(1024, 1024), (640, 480), (1023, 767)]
+
+@pytest.mark.parametrize("bounds", BOUNDS)
+@pytest.mark.parametrize("size", SIZES)
+def test_commands_match_check_bounds(size, bounds):
+    rng = np.random.default_rng(0)
+    boxes = np.column_stack((rng.integers(-50, size[0], 200), rng.integers(-50, size[1], 200),
+                             rng.integers(1, 301, 200), rng.integers(1, 601, 200)))
+    geometry = ControlGeometry(*size, *bounds)
+    expected = [check_bounds(*size, *bounds, *box) for box in boxes.tolist()]
+    assert [geometry.command(*box) for box in boxes.tolist()] == expected
+    assert geometry.commands(boxes) == expected
+    errors = geometry.errors(boxes)
+    assert errors.shape == (200, 2) and errors.dtype == np.int64
+
+def test_errors_accept_a_list_and_odd_widths():
+    geometry = ControlGeometry(1024, 1024, 0.5, 0.8, 0.4, 0.6)
+    assert geometry.errors([[500, 100, 21, 40]]).tolist() == [[511 - 510, geometry.desired_y - 100]]
+    assert geometry.errors([]).shape == (0, 2)
+
+def test_geometry_is_cached_per_resolution_and_bounds():
+    assert cached_geometry(1024, 1024, 0.5, 0.8, 0.4, 0.6) is cached_geometry(1024, 1024, 0.5, 0.8, 0.4, 0.6)
+    assert cached_geometry(1024, 1024, 0.5, 0.8, 0.4, 0.6) is not cached_geometry(640, 480, 0.5, 0.8, 0.4, 0.6)
+
+def test_draw_is_skipped_when_disabled(monkeypatch):
+    geometry = ControlGeometry(64, 64, 0.5, 0.8, 0.4, 0.6)
+    image = np.zeros((64, 64, 3), np.uint8)
+    geometry.draw(image, target_y=10)
+    assert image.any()
+    monkeypatch.setattr(control_geometry, "drawing_enabled", False)
+    image[:] = 0
+    geometry.draw(image, target_y=10)
+    assert not image.any()
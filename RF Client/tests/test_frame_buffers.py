@@ -0,0 +1,22 @@
+import numpy as np
+from frame_buffers import FrameBuffers, buffer_paths_allocations
+
+def test_get_reuses_the_same_buffer():
+    buffers = FrameBuffers()
+    first = buffers.get("image", (4, 4, 3))
+    assert buffers.get("image", (4, 4, 3)) is first
+    assert buffers.get("image", (8, 4, 3)) is not first
+
+def test_scratch_grows_and_returns_views():
+    buffers = FrameBuffers()
+    small = buffers.scratch("boxes", (2, 4), np.int32)
+    large = buffers.scratch("boxes", (10, 4), np.int32)
+    again = buffers.scratch("boxes", (3, 4), np.int32)
+    assert small.shape == (2, 4) and large.shape == (10, 4)
+    assert np.shares_memory(again, large)
+
+def test_buffer_paths_do_not_allocate_in_steady_state():
+    largest_peak, growth = buffer_paths_allocations(size=1024, frames=10, warmup=3)
+    # Only numpy's fixed iteration buffer (64 KiB) may show up; every per-frame array is at least 256 KiB
+    assert largest_peak <= 128 * 1024
+    assert growth <= 64 * 1024
@@ -0,0 +1,67 @@
+import socket
+import struct
+import threading
+import cv2
+import numpy as np
+from frame_decoder import DecodePipeline, decode_image
+
+def encoded_frame(value):
+    return cv2.imencode(".jpg", np.full((32, 32, 3), value, np.uint8))[1].tobytes()
+
+def send_frames(sock, frames):
+    for data in frames:
+        sock.sendall(struct.pack("I", len(data)) + data)
+    sock.shutdown(socket.SHUT_WR)
+
+def test_decode_image_passthrough():
+    image = np.zeros((4, 4, 3), np.uint8)
+    assert decode_image(image) is image
+    assert decode_image(None) is None
+    assert decode_image(np.frombuffer(encoded_frame(200), np.uint8)).shape == (32, 32, 3)
+
+def test_frames_come_back_in_order_and_corrupt_ones_as_none():
+    server, client = socket.socketpair()
+    frames = [encoded_frame(10 * i) for i in range(8)]
+    frames[3] = b"not a jpeg"
+    sender = threading.Thread(target=send_frames, args=(server, frames))
+    sender.start()
+    pipeline = DecodePipeline(client, workers=2, max_backlog=16)
+    received = []
+    while (frame := pipeline.next()) is not None:
+        received.append(frame)
+    sender.join()
+    pipeline.close()
+    server.close()
+    client.close()
+
+    assert [index for index, _, _ in received] == list(range(8))
+    assert received[3][2] is None
+    assert all(image is not None for i, _, image in received if i != 3)
+    assert bytes(received[5][1]) == frames[5]
+    assert pipeline.dropped == 0
+
+def test_backlog_drops_the_oldest_frames():
+    server, client = socket.socketpair()
+    pipeline = DecodePipeline(client, workers=1, prefetch=1, max_backlog=2)
+    send_frames(server, [encoded_frame(i) for i in range(10)])
+    pipeline.receiver.join(timeout=5)
+    assert len(pipeline.received) <= 2
+    indexes = []
+    while (frame := pipeline.next()) is not None:
+        indexes.append(frame[0])
+    assert indexes == sorted(indexes) and indexes[-1] == 9
+    assert pipeline.dropped == 10 - len(indexes)
+    pipeline.close()
+    server.close()
+    client.close()
+
+def test_close_stops_dispatching():
+    server, client = socket.socketpair()
+    pipeline = DecodePipeline(client, workers=1)
+    pipeline.close()
+    send_frames(server, [encoded_frame(0)] * 3)
+    pipeline.receiver.join(timeout=5)
+    assert not pipeline.decoding and not pipeline.received
+    assert pipeline.next() is None
+    server.close()
+    client.close()
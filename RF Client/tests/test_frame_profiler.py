@@ -0,0 +1,52 @@
+import os
+import socket
+import time
+from frame_profiler import FrameProfiler
+
+class CountingFollower:
+    def __init__(self):
+        self.frames = 0
+
+    def processImage(self, image_data):
+        self.frames += 1
+        return "None|None"
+
+class SlowFollower(CountingFollower):
+    def processImage(self, image_data):
+        time.sleep(0.05)
+        return super().processImage(image_data)
+
+def test_capture_wraps_then_restores_process_image(tmp_path):
+    follower = CountingFollower()
+    profiler = FrameProfiler(follower, output_dir=str(tmp_path), port=None, default_frames=3)
+    assert profiler.request(allocations=False)
+    assert not profiler.request()
+    assert "processImage" in vars(follower)
+    for _ in range(3):
+        assert follower.processImage(b"") == "None|None"
+    assert "processImage" not in vars(follower) and not profiler.capturing
+    assert follower.frames == 3
+    assert any(name.endswith("_cprofile.txt") for name in os.listdir(tmp_path))
+
+def test_busy_control_port_does_not_raise(capsys):
+    busy = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    busy.bind(("127.0.0.1", 0))
+    try:
+        FrameProfiler(CountingFollower(), port=busy.getsockname()[1])._control_loop()
+    finally:
+        busy.close()
+    assert "unavailable" in capsys.readouterr().out
+
+def test_sampling_skips_the_time_between_frames(tmp_path):
+    follower = SlowFollower()
+    profiler = FrameProfiler(follower, output_dir=str(tmp_path), port=None, default_frames=2,
+                             sample_interval=0.001)
+    profiler.request(mode="sampling", allocations=False)
+    capture = follower.processImage.__self__
+    follower.processImage(b"")
+    # Waiting on the socket between two frames
+    time.sleep(0.05)
+    follower.processImage(b"")
+    assert capture.stacks
+    # Every sample was taken inside processImage, none in the sleep between the frames
+    assert all(stack.rsplit(";", 1)[-1].startswith("processImage") for stack in capture.stacks)
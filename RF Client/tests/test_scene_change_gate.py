@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from scene_change_gate import SceneChangeGate
+
+class CountingFollower:
+    def __init__(self):
+        self.calls = []
+
+    def processImage(self, image_data):
+        self.calls.append(image_data)
+        return f"distance#{len(self.calls)}|distance#0"
+
+def frame(value, size=64):
+    return np.full((size, size, 3), value, np.uint8)
+
+def test_static_frames_run_the_follower_every_refresh_period():
+    follower = CountingFollower()
+    gate = SceneChangeGate(follower, threshold=2.0, refresh_every=5)
+    commands = [gate.processImage(frame(100)) for _ in range(11)]
+    # Frames 0, 5 and 10 run the follower; the others reuse the last command
+    assert len(follower.calls) == 3
+    assert commands[:5] == ["distance#1|distance#0"] * 5
+    assert commands[5] == "distance#2|distance#0"
+    assert gate.skipped == 8 and gate.frames == 11
+    assert gate.skip_rate() == pytest.approx(8 / 11)
+
+def test_changed_frame_resets_the_refresh_count():
+    follower = CountingFollower()
+    gate = SceneChangeGate(follower, threshold=2.0, refresh_every=5)
+    for value in (100, 100, 100, 200, 200, 200, 200, 200):
+        gate.processImage(frame(value))
+    # First frame, then the change at frame 3; frames 4-7 are within the refresh period
+    assert len(follower.calls) == 2
+    assert gate.frames_since_refresh == 4
+
+def test_blockhash_counts_changed_blocks():
+    follower = CountingFollower()
+    gate = SceneChangeGate(follower, threshold=0.1, refresh_every=100, method="blockhash")
+    # 256 px: 32 px thumbnail, 4x4 blocks
+    image = frame(0, size=256)
+    image[:, :128] = 255
+    gate.processImage(image)
+    gate.processImage(image.copy())
+    assert len(follower.calls) == 1
+    gate.processImage(image[:, ::-1].copy())
+    assert len(follower.calls) == 2
+
+def test_blockhash_default_threshold_is_a_block_fraction():
+    follower = CountingFollower()
+    gate = SceneChangeGate(follower, refresh_every=100, method="blockhash")
+    assert gate.threshold == SceneChangeGate.DEFAULT_THRESHOLDS["blockhash"] < 1.0
+    image = frame(0, size=256)
+    image[:, :128] = 255
+    gate.processImage(image)
+    # Sensor noise does not flip any block
+    noisy = np.clip(image.astype(int) + np.random.default_rng(0).integers(-3, 4, image.shape), 0, 255)
+    gate.processImage(noisy.astype(np.uint8))
+    assert len(follower.calls) == 1
+    # One block of the 4x4 grid changes: 1/16 of the blocks is above the default
+    moved = image.copy()
+    moved[:64, :64] = 0
+    gate.processImage(moved)
+    assert len(follower.calls) == 2
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        SceneChangeGate(CountingFollower(), method="ssim")
@@ -0,0 +1,29 @@
+from closed_loop_sim import SequenceRecorder, Simulation
+from pareto_benchmark import load_sequence
+
+def test_recorded_sequence_loads_in_the_benchmark(tmp_path):
+    sim = Simulation(seed=1, distractors=2)
+    recorder = SequenceRecorder(str(tmp_path), sim)
+    snapshots = []
+    for t in (0.0, 0.5, 1.0):
+        sim.advance_to(t)
+        snapshots.append(sim.snapshot())
+        recorder.write(snapshots[-1])
+    recorder.close()
+
+    frames, ground_truth = load_sequence(str(tmp_path))
+    assert len(frames) == 3
+    for index, snapshot in enumerate(snapshots):
+        expected = [(str(person_id), box, target) for person_id, box, target in sim.ground_truth(snapshot)]
+        assert ground_truth[index] == expected
+        assert [target for _, _, target in expected].count(True) == 1
+
+def test_ground_truth_boxes_are_clipped_to_the_image():
+    sim = Simulation()
+    width, height = sim.camera.width, sim.camera.height
+    # A person right in front of the camera is taller than the image
+    snapshot = (sim.robot(), [(0.0, 0.5)])
+    (person_id, (x, y, w, h), target), = sim.ground_truth(snapshot)
+    assert (person_id, target) == (0, True)
+    assert x >= 0 and y >= 0 and x + w <= width and y + h <= height
+    assert sim.camera.person_box(sim.robot(), 0.0, 0.5)[3] > height
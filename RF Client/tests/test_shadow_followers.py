@@ -0,0 +1,64 @@
+import csv
+from multiprocessing import shared_memory
+import cv2
+import numpy as np
+import pytest
+from shadow_followers import ShadowFollowers, _attach_shared_memory, parse_shadow_spec
+
+def test_parse_shadow_spec():
+    assert parse_shadow_spec("hog") == ("hog", "hog", {})
+    label, name, settings = parse_shadow_spec("appearance:match_threshold=0.8,mode=fast,")
+    assert (label, name) == ("appearance:match_threshold=0.8,mode=fast,", "appearance")
+    assert settings == {"match_threshold": 0.8, "mode": "fast"}
+    with pytest.raises(ValueError):
+        parse_shadow_spec("yolov99")
+
+def test_attached_memory_sees_the_parent_block():
+    memory = shared_memory.SharedMemory(create=True, size=16)
+    try:
+        memory.buf[:4] = b"test"
+        attached = _attach_shared_memory(memory.name)
+        assert bytes(attached.buf[:4]) == b"test"
+        attached.close()
+    finally:
+        memory.close()
+        memory.unlink()
+
+def test_thread_shadow_logs_its_commands(tmp_path, monkeypatch):
+    monkeypatch.setattr(cv2, "imshow", lambda *args, **kwargs: None)
+    log_path = tmp_path / "shadow_log.csv"
+    shadows = ShadowFollowers(["hog"], log_path=str(log_path))
+    image = np.zeros((128, 128, 3), np.uint8)
+    shadows.submit(0, image)
+    shadows.record_primary(0, "None|None", 5.0)
+    # Wait for the shadow to pick the frame up and finish it
+    shadow = shadows.shadows[0]
+    for _ in range(500):
+        if len(shadows.results) == 2:
+            break
+        shadow.thread.join(timeout=0.01)
+    report = shadows.close()
+
+    with open(log_path) as f:
+        rows = list(csv.DictReader(f))
+    assert [row["follower"] for row in rows] == ["primary", "hog"]
+    assert "hog: 1 frames" in report
+    assert image.flags.writeable
+
+def test_process_shadow_is_fed_off_the_primary_thread(tmp_path):
+    log_path = tmp_path / "shadow_log.csv"
+    shadows = ShadowFollowers(["hog"], mode="process", log_path=str(log_path))
+    shadow = shadows.shadows[0]
+    image = np.zeros((128, 128, 3), np.uint8)
+    shadows.submit(0, image)
+    for _ in range(1000):
+        if shadows.results:
+            break
+        shadow.thread.join(timeout=0.01)
+    # The feeder thread made the copy, the next frame is accepted again
+    assert shadows.results[0][:2] == (0, "hog")
+    assert shadow.memory is not None and shadow.memory.size >= image.nbytes
+    shadows.submit(1, image)
+    report = shadows.close()
+    assert not shadow.process.is_alive() and not shadow.thread.is_alive()
+    assert "hog: " in report
@@ -0,0 +1,47 @@
+import math
+import pytest
+from telemetry import (RECORD, TelemetryPublisher, TelemetryReader, pack_record, parse_command,
+                       unpack_record)
+
+def test_parse_command():
+    assert parse_command("distance#-12|distance#7") == (-12, 7)
+    assert parse_command("None|None") == (None, None)
+    assert parse_command("garbage") == (None, None)
+
+def test_record_round_trip():
+    timings = {"receive_ms": 1.5, "process_ms": 20.25, "send_ms": 0.5, "total_ms": 22.25}
+    data = pack_record(2**32 + 5, "distance#-120|distance#45", (10, 20, 30, 40), 0.75, timings)
+    assert len(data) == RECORD.size
+    record = unpack_record(data)
+    assert record.frame_id == 5
+    assert record.box == (10, 20, 30, 40)
+    assert record.confidence == 0.75
+    assert (record.dx, record.dy) == (-120, 45)
+    assert (record.receive_ms, record.process_ms, record.send_ms, record.total_ms) == (1.5, 20.25, 0.5, 22.25)
+
+def test_record_round_trip_without_target():
+    record = unpack_record(pack_record(1, "None|None"))
+    assert record.box is None and (record.dx, record.dy) == (None, None)
+    assert math.isnan(record.confidence) and math.isnan(record.total_ms)
+
+def test_ring_buffer_keeps_the_latest_records(tmp_path):
+    target = f"ring:{tmp_path / 'telemetry.bin'}:4"
+    publisher = TelemetryPublisher(target)
+    reader = TelemetryReader(target)
+    for frame_id in range(6):
+        publisher.publish(frame_id, "None|None")
+    assert [r.frame_id for r in reader.read()] == [2, 3, 4, 5]
+    publisher.publish(6, "distance#1|distance#2")
+    assert [(r.frame_id, r.dx, r.dy) for r in reader.read()] == [(6, 1, 2)]
+    publisher.close()
+
+def test_udp_publish_never_raises():
+    publisher = TelemetryPublisher("udp://127.0.0.1:9")
+    for frame_id in range(5):
+        publisher.publish(frame_id, "None|None")
+    assert publisher.sent + publisher.dropped == 5
+    publisher.close()
+
+def test_unknown_target():
+    with pytest.raises(ValueError):
+        TelemetryPublisher("tcp://127.0.0.1:1")
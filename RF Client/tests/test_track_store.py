@@ -0,0 +1,54 @@
+import numpy as np
+from track_store import TrackStore, box_iou_matrix
+
+def check_index(store):
+    """Every live row is indexed under its own id."""
+    assert len(store.index) == store.count
+    for track_id, row in store.index.items():
+        assert row < store.count and store.ids[row] == track_id
+
+def test_box_iou_matrix():
+    ious = box_iou_matrix([[0, 0, 10, 10], [0, 0, 0, 0]], [[0, 0, 10, 10], [5, 0, 10, 10], [20, 20, 5, 5]])
+    assert ious.shape == (2, 3)
+    np.testing.assert_allclose(ious[0], [1.0, 50 / 150, 0.0])
+    assert not ious[1].any()
+
+def test_update_keeps_ids_across_frames():
+    store = TrackStore()
+    first = store.update([[0, 0, 10, 20], [100, 0, 10, 20]], [0.9, 0.5])
+    second = store.update([[102, 1, 10, 20], [1, 0, 10, 20], [300, 0, 10, 20]], [0.5, 0.9, 0.7])
+    assert second.tolist() == [first[1], first[0], 3]
+    assert store.get(first[0]).hits == 2 and store.get(3).hits == 1
+    check_index(store)
+
+def test_swap_remove_keeps_the_index_valid():
+    store = TrackStore(max_misses=0)
+    store.update([[i * 100, 0, 10, 20] for i in range(5)], [0.5] * 5)
+    # Tracks 1 and 3 are missed and removed, the last rows move into their holes
+    store.update([[100, 0, 10, 20], [300, 0, 10, 20], [400, 0, 10, 20]], [0.5] * 3)
+    assert sorted(store.index) == [2, 4, 5]
+    assert store.count == 3
+    check_index(store)
+    assert store.get(5).box == (400, 0, 10, 20)
+    assert store.get(1) is None and 1 not in store
+
+def test_arrays_grow_past_the_capacity():
+    store = TrackStore(capacity=2)
+    ids = store.update([[i * 50, 0, 10, 20] for i in range(7)], [0.5] * 7)
+    assert ids.tolist() == list(range(1, 8))
+    assert len(store) == 7 and len(store.ids) >= 7
+    check_index(store)
+
+def test_target_persists_until_its_track_is_lost():
+    store = TrackStore(min_hits=2, max_misses=1)
+    store.update([[0, 0, 10, 20], [100, 0, 10, 20]], [0.6, 0.9])
+    assert store.target() is None
+    store.update([[0, 0, 10, 20], [100, 0, 10, 20]], [0.6, 0.9])
+    assert store.target().track_id == 2
+    # A more confident person does not steal the target
+    store.update([[0, 0, 10, 20], [100, 0, 10, 20]], [0.99, 0.4])
+    assert store.target().track_id == 2
+    store.update([[0, 0, 10, 20]], [0.99])
+    assert store.target().track_id == 2
+    store.update([[0, 0, 10, 20]], [0.99])
+    assert store.target().track_id == 1
@@ -0,0 +1,236 @@
+import itertools
+import time
+import numpy as np
+
+def box_iou_matrix(a, b):
+    """
+    Intersection over union of every pair of [x, y, w, h] boxes.
+
+    Args:
+        a: (N, 4) array of boxes
+        b: (M, 4) array of boxes
+
+    Returns:
+        (N, M) float32 array of IoU values
+    """
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    ax2, ay2 = a[:, 0] + a[:, 2], a[:, 1] + a[:, 3]
+    bx2, by2 = b[:, 0] + b[:, 2], b[:, 1] + b[:, 3]
+    inter_w = np.minimum(ax2[:, None], bx2[None, :]) - np.maximum(a[:, 0][:, None], b[:, 0][None, :])
+    inter_h = np.minimum(ay2[:, None], by2[None, :]) - np.maximum(a[:, 1][:, None], b[:, 1][None, :])
+    inter = np.clip(inter_w, 0, None) * np.clip(inter_h, 0, None)
+    union = (a[:, 2] * a[:, 3])[:, None] + (b[:, 2] * b[:, 3])[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+class Track:
+    """Snapshot of one track, returned by TrackStore.get()."""
+    __slots__ = ("track_id", "box", "confidence", "hits", "misses")
+
+    def __init__(self, track_id, box, confidence, hits, misses):
+        self.track_id = track_id
+        self.box = box
+        self.confidence = confidence
+        self.hits = hits
+        self.misses = misses
+
+    def __repr__(self):
+        return (f"Track(id={self.track_id}, box={self.box}, confidence={self.confidence:.2f}, "
+                f"hits={self.hits}, misses={self.misses})")
+
+class TrackStore:
+    """
+    State of every person tracked in the scene.
+
+    The tracks live in parallel numpy arrays (one row per track, rows kept
+    contiguous by moving the last row into a removed one) and a dict maps a
+    track id to its row, so looking up the target is O(1) whatever the
+    number of people. Detections are associated to the tracks with one
+    vectorized IoU matrix per frame and a greedy assignment by decreasing IoU.
+
+    The target is the highest-confidence confirmed track when nothing is
+    followed yet (the box the followers used to take), and then stays the
+    same track id for as long as the track lives.
+    """
+    def __init__(self, iou_threshold=0.3, max_misses=5, min_hits=2, capacity=64):
+        """
+        Args:
+            iou_threshold: Minimum IoU for a detection to continue a track
+            max_misses: Frames without a detection before a track is removed
+            min_hits: Detections needed before a track can become the target
+            capacity: Initial number of rows (the arrays grow when needed)
+        """
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.min_hits = min_hits
+        self.ids = np.empty(capacity, np.int64)
+        self.boxes = np.empty((capacity, 4), np.float32)
+        self.confidences = np.empty(capacity, np.float32)
+        self.hits = np.empty(capacity, np.int32)
+        self.misses = np.empty(capacity, np.int32)
+        self.count = 0
+        self.index = {}
+        self.next_id = itertools.count(1)
+        self.target_id = None
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, track_id):
+        return track_id in self.index
+
+    def get(self, track_id):
+        """Return the Track with this id, or None if it is not tracked."""
+        row = self.index.get(track_id)
+        if row is None:
+            return None
+        return Track(track_id, tuple(int(v) for v in self.boxes[row]), float(self.confidences[row]),
+                     int(self.hits[row]), int(self.misses[row]))
+
+    def _grow(self, needed):
+        capacity = max(needed, 2 * len(self.ids))
+        for name in ("ids", "boxes", "confidences", "hits", "misses"):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def _remove(self, rows):
+        """Remove the rows, moving the last rows into the holes (highest rows first)."""
+        for row in sorted(rows, reverse=True):
+            del self.index[int(self.ids[row])]
+            last = self.count - 1
+            if row != last:
+                for array in (self.ids, self.boxes, self.confidences, self.hits, self.misses):
+                    array[row] = array[last]
+                self.index[int(self.ids[row])] = row
+            self.count = last
+
+    def update(self, boxes, confidences):
+        """
+        Associate the detections of a frame with the tracks.
+
+        Args:
+            boxes: List or (M, 4) array of [x, y, w, h] detections
+            confidences: The M detection confidences
+
+        Returns:
+            (M,) int64 array with the track id of each detection
+        """
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        confidences = np.asarray(confidences, dtype=np.float32).reshape(-1)
+        detection_ids = np.zeros(len(boxes), np.int64)
+        matched_rows = np.zeros(self.count, bool)
+        matched_detections = np.zeros(len(boxes), bool)
+
+        if self.count and len(boxes):
+            ious = box_iou_matrix(self.boxes[:self.count], boxes)
+            # Greedy assignment: candidate pairs by decreasing IoU, each row and detection used once
+            rows, cols = np.nonzero(ious >= self.iou_threshold)
+            pairs = []
+            for k in np.argsort(-ious[rows, cols], kind="stable"):
+                row, col = rows[k], cols[k]
+                if matched_rows[row] or matched_detections[col]:
+                    continue
+                matched_rows[row] = matched_detections[col] = True
+                pairs.append((row, col))
+
+            if pairs:
+                rows, cols = np.array(pairs).T
+                self.boxes[rows] = boxes[cols]
+                self.confidences[rows] = confidences[cols]
+                detection_ids[cols] = self.ids[rows]
+
+        hits = self.hits[:self.count]
+        misses = self.misses[:self.count]
+        hits[matched_rows] += 1
+        misses[matched_rows] = 0
+        misses[~matched_rows] += 1
+        expired = np.flatnonzero(misses > self.max_misses)
+        if len(expired):
+            self._remove(expired.tolist())
+
+        new = np.flatnonzero(~matched_detections)
+        if len(new):
+            if self.count + len(new) > len(self.ids):
+                self._grow(self.count + len(new))
+            rows = np.arange(self.count, self.count + len(new))
+            new_ids = np.fromiter(self.next_id, np.int64, count=len(new))
+            self.ids[rows] = new_ids
+            self.boxes[rows] = boxes[new]
+            self.confidences[rows] = confidences[new]
+            self.hits[rows] = 1
+            self.misses[rows] = 0
+            self.index.update(zip(new_ids.tolist(), rows.tolist()))
+            self.count += len(new)
+            detection_ids[new] = new_ids
+
+        if self.target_id is not None and self.target_id not in self.index:
+            print(f"[INFO] Target track {self.target_id} lost")
+            self.target_id = None
+        return detection_ids
+
+    def target(self):
+        """
+        Return the followed Track (None if there is none yet).
+        A new target is chosen only when no track is followed.
+        """
+        if self.target_id is None:
+            confirmed = np.flatnonzero((self.hits[:self.count] >= self.min_hits) & (self.misses[:self.count] == 0))
+            if not len(confirmed):
+                return None
+            best = confirmed[np.argmax(self.confidences[confirmed])]
+            self.target_id = int(self.ids[best])
+            print(f"[INFO] Following track {self.target_id}")
+        return self.get(self.target_id)
+
+    def reset(self):
+        """Forget all the tracks and the target."""
+        self.count = 0
+        self.index.clear()
+        self.target_id = None
+
+def scaling_benchmark(people=(1, 5, 10, 25, 50, 100, 200), frames=200, size=1024, seed=0):
+    """
+    Time TrackStore.update() + target lookup against the number of people in the scene,
+    with synthetic people walking with small random steps. The target lookup is also
+    timed against a linear scan over track objects (what DeepSortFollower used to do).
+
+    Returns:
+        list: (people, update + lookup microseconds per frame,
+               dict lookup microseconds, linear scan microseconds) tuples
+    """
+    rng = np.random.default_rng(seed)
+    results = []
+    for n in people:
+        store = TrackStore()
+        positions = rng.uniform(0, size - 100, (n, 2))
+        sizes = rng.uniform(40, 100, (n, 2)) * [1, 2.5]
+        confidences = rng.uniform(0.5, 1.0, n)
+        elapsed = 0.0
+        for _ in range(frames):
+            positions = np.clip(positions + rng.normal(0, 2, positions.shape), 0, size - 100)
+            boxes = np.hstack((positions, sizes)).astype(int)
+            start = time.perf_counter()
+            store.update(boxes, confidences)
+            store.target()
+            elapsed += time.perf_counter() - start
+
+        # Target lookup alone: dict index versus scanning a list of track objects
+        tracks = [store.get(int(track_id)) for track_id in store.ids[:store.count]]
+        target_id = tracks[-1].track_id
+        start = time.perf_counter()
+        for _ in range(frames):
+            store.boxes[store.index[target_id]]
+        lookup = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(frames):
+            next(t for t in tracks if t.track_id == target_id)
+        scan = time.perf_counter() - start
+        results.append((n, elapsed / frames * 1e6, lookup / frames * 1e6, scan / frames * 1e6))
+    return results
+
+if __name__ == "__main__":
+    print("people   update+target us/frame   dict lookup us   linear scan us")
+    for n, update_us, lookup_us, scan_us in scaling_benchmark():
+        print(f"{n:6d}   {update_us:22.1f}   {lookup_us:14.2f}   {scan_us:14.2f}")